@@ -1,5 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .forms import UserImportForm
+from .importers import get_import_format
+from .models import UserImport
 
 User = get_user_model()
 
@@ -13,3 +22,107 @@ class UserAdmin(admin.ModelAdmin):
     readonly_fields = ("password", "uid", "slug")
     ordering = ("-created_at",)
 
+    def get_urls(self):
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_users_view),
+                name="account_user_import",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_users_view(self, request):
+        """Queue an uploaded CSV / JSONL file for `import_users --pending`"""
+        if not self.has_add_permission(request):
+            return redirect("admin:account_user_changelist")
+
+        form = UserImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            import_format = form.cleaned_data["format"] or get_import_format(
+                upload.name
+            )
+            user_import = UserImport.objects.create(
+                file=upload,
+                name=upload.name,
+                import_format=import_format,
+                created_by=request.user,
+            )
+            self.message_user(
+                request,
+                format_html(
+                    "The users of {} will be imported in the background, "
+                    'see <a href="{}">its report</a> once done.',
+                    upload.name,
+                    reverse("admin:account_userimport_change", args=[user_import.pk]),
+                ),
+                messages.SUCCESS,
+            )
+            return redirect("admin:account_user_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import users",
+            "form": form,
+        }
+        return TemplateResponse(
+            request, "admin/account/user/import_users.html", context
+        )
+
+
+@admin.register(UserImport)
+class UserImportAdmin(admin.ModelAdmin):
+    """Imports are queued from the user import page and only read here"""
+
+    list_display = ["name", "status", "created_by", "created_at", "finished_at"]
+    list_filter = ["status"]
+    fields = [
+        "name",
+        "import_format",
+        "status",
+        "created_by",
+        "created_at",
+        "started_at",
+        "finished_at",
+        "stats",
+        "report_link",
+    ]
+    readonly_fields = fields
+    ordering = ("-id",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:pk>/report/",
+                self.admin_site.admin_view(self.report_view),
+                name="account_userimport_report",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description="Report")
+    def report_link(self, obj):
+        if not obj.report:
+            return "-"
+        url = reverse("admin:account_userimport_report", args=[obj.pk])
+        return format_html('<a href="{}">Download</a>', url)
+
+    def report_view(self, request, pk):
+        user_import = get_object_or_404(UserImport, pk=pk)
+        if not self.has_view_permission(request, user_import):
+            return redirect("admin:index")
+        response = HttpResponse(
+            user_import.report, content_type="text/plain; charset=utf-8"
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="user-import-{user_import.pk}.txt"'
+        )
+        return response
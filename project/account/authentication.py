@@ -0,0 +1,90 @@
+"""
+Token authentication backed by the cache, so most requests skip the DB.
+
+Snapshots are dropped by the signals in account.signals, in the cache named by
+TOKEN_AUTH_CACHE. When that cache is shared by every worker (Redis) a
+deactivated user or a deleted token is rejected everywhere at once. A
+per-process cache (LocMemCache) only drops the snapshot of the process making
+the change: the other workers keep theirs until it expires, so their snapshots
+are kept for TOKEN_AUTH_LOCAL_CACHE_TIMEOUT only, which bounds the revocation
+delay.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from shared.choices import StatusChoices
+
+TOKEN_CACHE_KEY = "auth:token:{key}"
+USER_TOKEN_CACHE_KEY = "auth:user:{user_id}"
+
+
+def get_token_cache():
+    return caches[getattr(settings, "TOKEN_AUTH_CACHE", "default")]
+
+
+def get_token_cache_timeout(cache=None):
+    if cache is None:
+        cache = get_token_cache()
+    if isinstance(cache, LocMemCache):
+        return getattr(settings, "TOKEN_AUTH_LOCAL_CACHE_TIMEOUT", 10)
+    return getattr(settings, "TOKEN_AUTH_CACHE_TIMEOUT", 300)
+
+
+def invalidate_token(key):
+    """Drop the cached snapshot of a single token"""
+    get_token_cache().delete(TOKEN_CACHE_KEY.format(key=key))
+
+
+def invalidate_user_tokens(user_id):
+    """Drop the cached token snapshot of a user, if there is one"""
+    cache = get_token_cache()
+    user_key = USER_TOKEN_CACHE_KEY.format(user_id=user_id)
+    key = cache.get(user_key)
+    if key is not None:
+        cache.delete_many([TOKEN_CACHE_KEY.format(key=key), user_key])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Same contract as DRF's TokenAuthentication, but the token and its user are
+    kept in the cache (Redis when configured, the local memory cache otherwise).
+    The snapshot is dropped by the signals in account.signals whenever the user
+    is saved or the token is deleted/rotated.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cache_key = TOKEN_CACHE_KEY.format(key=key)
+        token = cache.get(cache_key)
+
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related("user").get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+            self.check_user(token.user)
+
+            timeout = get_token_cache_timeout(cache)
+            cache.set_many(
+                {
+                    cache_key: token,
+                    USER_TOKEN_CACHE_KEY.format(user_id=token.user_id): key,
+                },
+                timeout,
+            )
+        else:
+            self.check_user(token.user)
+
+        return (token.user, token)
+
+    def check_user(self, user):
+        if not user.is_active or user.status != StatusChoices.ACTIVE:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class UserImportFormatChoices(models.TextChoices):
+    CSV = "csv", "CSV"
+    JSONL = "jsonl", "JSONL"
+
+
+class UserImportStatusChoices(models.TextChoices):
+    PENDING = "PENDING", "Pending"
+    RUNNING = "RUNNING", "Running"
+    DONE = "DONE", "Done"
+    FAILED = "FAILED", "Failed"
@@ -0,0 +1,12 @@
+from django import forms
+
+from .importers import USER_IMPORT_FORMATS
+
+
+class UserImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or JSONL file")
+    format = forms.ChoiceField(
+        choices=[("", "Guess from file extension")]
+        + [(choice, choice.upper()) for choice in USER_IMPORT_FORMATS],
+        required=False,
+    )
@@ -0,0 +1,320 @@
+"""
+Bulk import of users from CSV / JSONL files.
+
+Rows that can not be imported (unreadable JSON, invalid email or phone) are
+counted and reported with their number, the rest of the file is imported
+anyway. Rows of users created meanwhile, by a registration racing the import,
+are skipped like the existing ones. Hashing the passwords is the bulk of the
+work, so it runs on a process pool.
+
+Files uploaded in the admin are not imported by the web worker: they are
+stored as a pending UserImport, which `manage.py import_users --pending` (run
+by cron like the other maintenance commands) imports one at a time. The report
+is kept on the UserImport, to be downloaded from the admin, and the uploaded
+file is deleted.
+"""
+
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from phonenumber_field.phonenumber import to_python
+
+from rest_framework.authtoken.models import Token
+
+from simple_history.utils import bulk_create_with_history
+
+from shared.choices import StatusChoices
+from shared.slugs import allocate_slugs
+
+from .choices import UserImportFormatChoices, UserImportStatusChoices
+from .models import UserImport
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+USER_IMPORT_FORMATS = tuple(UserImportFormatChoices.values)
+
+# Invalid rows reported with their number, the others are only counted
+MAX_REPORTED_ERRORS = 100
+
+# A running import not finished by then was killed, it no longer holds the queue
+STALE_IMPORT_AGE = datetime.timedelta(hours=6)
+
+
+def init_hasher_process():
+    """Set up Django in pool processes started with the spawn method"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+    django.setup()
+
+
+def get_import_format(filename, default="csv"):
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "csv":
+        return "csv"
+    return default
+
+
+class UnreadableRow:
+    """Stands for a line of a JSONL file that is not a JSON object"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def read_user_rows(stream, import_format):
+    """Yield one dict per user from a text stream, without loading the whole file"""
+    if import_format == "csv":
+        yield from csv.DictReader(stream)
+    elif import_format == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                yield UnreadableRow(f"Invalid JSON: {error}")
+                continue
+            if isinstance(row, dict):
+                yield row
+            else:
+                yield UnreadableRow("Not a JSON object")
+    else:
+        raise ValueError(f"Unknown import format: {import_format}")
+
+
+def get_text(row, key):
+    value = row.get(key)
+    return "" if value is None else str(value).strip()
+
+
+def claim_user_import():
+    """
+    The oldest pending UserImport, marked as running, or None. Imports run one
+    at a time: nothing is claimed while another one is running.
+    """
+    stale = UserImport.objects.filter(
+        status=UserImportStatusChoices.RUNNING,
+        started_at__lt=timezone.now() - STALE_IMPORT_AGE,
+    )
+    stale.update(status=UserImportStatusChoices.FAILED, report="Interrupted.")
+    if UserImport.objects.filter(status=UserImportStatusChoices.RUNNING).exists():
+        return None
+
+    pending = UserImport.objects.filter(status=UserImportStatusChoices.PENDING)
+    for pk in pending.order_by("id").values_list("pk", flat=True)[:1]:
+        # Compare and set, a concurrent run may have claimed it meanwhile
+        claimed = pending.filter(pk=pk).update(
+            status=UserImportStatusChoices.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return UserImport.objects.get(pk=pk)
+    return None
+
+
+def get_report_lines(importer):
+    """What import_users prints once a file is imported"""
+    lines = [f"Row {number}: {error}" for number, error in importer.errors]
+    lines.append(
+        "Created {created} users, skipped {skipped_existing} existing "
+        "and {skipped_invalid} invalid rows.".format(**importer.stats)
+    )
+    return lines
+
+
+def run_user_import(user_import, batch_size=1000, workers=None):
+    """Import the file of a claimed UserImport, then delete it"""
+    importer = UserImporter(batch_size=batch_size, workers=workers)
+    try:
+        with user_import.file.open("rb") as file:
+            stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+            importer.run(read_user_rows(stream, user_import.import_format))
+    except Exception as error:
+        logger.exception("Import of the users of %s failed", user_import)
+        user_import.status = UserImportStatusChoices.FAILED
+        report = get_report_lines(importer) + [f"Import failed: {error}"]
+    else:
+        user_import.status = UserImportStatusChoices.DONE
+        report = get_report_lines(importer)
+    finally:
+        user_import.file.delete(save=False)
+
+    user_import.stats = importer.stats
+    user_import.report = "\n".join(report)
+    user_import.finished_at = timezone.now()
+    user_import.save()
+    return user_import
+
+
+class UserImporter:
+    """
+    Create users (and their auth tokens) in batches.
+
+    Per batch: one query for the existing emails, one for the existing phones,
+    one for the taken slugs, passwords hashed on a process pool, then the users,
+    their history and their tokens are bulk created in one transaction.
+    """
+
+    def __init__(self, batch_size=1000, workers=None):
+        self.batch_size = batch_size
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.seen_emails = set()
+        self.seen_phones = set()
+        self.stats = {"created": 0, "skipped_existing": 0, "skipped_invalid": 0}
+        # [(row number, reason)] of the first MAX_REPORTED_ERRORS invalid rows
+        self.errors = []
+
+    def run(self, rows):
+        rows = enumerate(rows, start=1)
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_hasher_process
+            )
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.import_batch(batch, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.stats
+
+    def add_error(self, number, error):
+        self.stats["skipped_invalid"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, str(error)))
+
+    def clean_row(self, row):
+        """Fields of the user to create from a row, raises ValueError if invalid"""
+        if isinstance(row, UnreadableRow):
+            raise ValueError(row.error)
+
+        # Lowercases the domain only, like the email of users created otherwise
+        email = BaseUserManager.normalize_email(get_text(row, "email"))
+        if "@" not in email:
+            raise ValueError("Invalid email")
+
+        phone = get_text(row, "phone") or None
+        if phone is not None:
+            phone = to_python(phone)
+            if not phone.is_valid():
+                raise ValueError("Invalid phone number")
+
+        password = row.get("password")
+        return {
+            "email": email,
+            "phone": phone,
+            "first_name": get_text(row, "first_name").title()[:50],
+            "last_name": get_text(row, "last_name").title()[:50],
+            "address": get_text(row, "address"),
+            # Users without a password get an unusable one and have to reset it
+            "password": str(password) if password else None,
+        }
+
+    def import_batch(self, batch, executor=None):
+        """Import [(row number, row)]"""
+        cleaned = []
+        for number, row in batch:
+            try:
+                cleaned.append(self.clean_row(row))
+            except ValueError as error:
+                self.add_error(number, error)
+
+        emails = {data["email"] for data in cleaned}
+        phones = {str(data["phone"]) for data in cleaned if data["phone"]}
+        existing_emails = set(
+            User.objects.filter(email__in=emails).values_list("email", flat=True)
+        )
+        existing_phones = set()
+        if phones:
+            existing_phones = {
+                str(phone)
+                for phone in User.objects.filter(phone__in=phones).values_list(
+                    "phone", flat=True
+                )
+            }
+
+        rows = []
+        for data in cleaned:
+            phone = str(data["phone"]) if data["phone"] else None
+            if (
+                data["email"] in existing_emails
+                or data["email"] in self.seen_emails
+                or (phone and (phone in existing_phones or phone in self.seen_phones))
+            ):
+                self.stats["skipped_existing"] += 1
+                continue
+            self.seen_emails.add(data["email"])
+            if phone:
+                self.seen_phones.add(phone)
+            rows.append(data)
+
+        if not rows:
+            return
+
+        passwords = self.hash_passwords(
+            [data.pop("password") for data in rows], executor
+        )
+
+        now = timezone.now()
+        users = [
+            User(
+                password=password,
+                status=StatusChoices.ACTIVE,
+                updated_at=now,
+                **data,
+            )
+            for data, password in zip(rows, passwords)
+        ]
+        self.assign_slugs(users)
+
+        try:
+            self.create_users(users)
+        except IntegrityError:
+            # Taken meanwhile by a user created otherwise, find which one by one
+            for user in users:
+                # Set by the insert rolled back
+                user.pk = None
+                try:
+                    self.create_users([user])
+                except IntegrityError:
+                    self.stats["skipped_existing"] += 1
+
+    def create_users(self, users):
+        with transaction.atomic():
+            # bulk_create skips the post_save signal creating the tokens
+            users = bulk_create_with_history(users, User, batch_size=self.batch_size)
+            Token.objects.bulk_create(
+                [Token(key=Token.generate_key(), user=user) for user in users],
+                batch_size=self.batch_size,
+            )
+        self.stats["created"] += len(users)
+
+    def hash_passwords(self, passwords, executor=None):
+        if executor is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+    def assign_slugs(self, users):
+        """Give every user of the batch a slug not taken in the DB nor in the batch"""
+        allocate_slugs(users)
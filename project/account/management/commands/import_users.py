@@ -0,0 +1,82 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from account.importers import (
+    USER_IMPORT_FORMATS,
+    UserImporter,
+    claim_user_import,
+    get_import_format,
+    get_report_lines,
+    read_user_rows,
+    run_user_import,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV or JSONL file with the columns email, password, "
+        "first_name, last_name, phone and address."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="Path of the CSV / JSONL file")
+        parser.add_argument(
+            "--pending",
+            action="store_true",
+            help="Import the files uploaded in the admin, one at a time",
+        )
+        parser.add_argument(
+            "--format",
+            choices=USER_IMPORT_FORMATS,
+            help="File format, guessed from the file extension by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processes hashing the passwords, defaults to the number of CPUs",
+        )
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Delete the file once imported",
+        )
+
+    def handle(self, *args, **options):
+        if options["pending"]:
+            return self.import_pending(options)
+        if not options["path"]:
+            raise CommandError("Give the path of a file, or --pending.")
+
+        import_format = options["format"] or get_import_format(options["path"])
+        importer = UserImporter(
+            batch_size=options["batch_size"], workers=options["workers"]
+        )
+
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                importer.run(read_user_rows(stream, import_format))
+        except OSError as error:
+            raise CommandError(error)
+        finally:
+            if options["delete"] and os.path.exists(options["path"]):
+                os.remove(options["path"])
+
+        *errors, summary = get_report_lines(importer)
+        for error in errors:
+            self.stdout.write(self.style.WARNING(error))
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def import_pending(self, options):
+        while (user_import := claim_user_import()) is not None:
+            run_user_import(
+                user_import,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+            )
+            self.stdout.write(
+                f"{user_import.name}: {user_import.get_status_display().lower()}, "
+                f"{user_import.stats.get('created', 0)} users created."
+            )
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 13:54
+
+import account.utils
+import shared.slugs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicaluser',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from=account.utils.get_slug_full_name),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from=account.utils.get_slug_full_name, unique=True),
+        ),
+    ]
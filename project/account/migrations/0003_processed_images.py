@@ -0,0 +1,24 @@
+# Generated by Django 5.1 on 2026-10-18 14:00
+
+import shared.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_unique_slug_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='image',
+            field=shared.images.ProcessedImageField(blank=True, null=True, upload_to='profile_images/', variants_field='image_variants'),
+        ),
+    ]
@@ -1,18 +1,24 @@
 """Models related to User Accounts will be stored here"""
 
+import os
+import tempfile
+
+from django.conf import settings
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
+from django.core.files.storage import FileSystemStorage
 from django.db import models
-
-from autoslug import AutoSlugField
+from django.utils import timezone
 
 from phonenumber_field.modelfields import PhoneNumberField
 
-from simple_history.models import HistoricalRecords
-
+from shared.history import BufferedHistoricalRecords
+from shared.images import ProcessedImageField
 from shared.models import BaseModelWithUID
+from shared.slugs import UniqueSlugField
 from shared.choices import StatusChoices
 
+from .choices import UserImportFormatChoices, UserImportStatusChoices
 from .managers import CustomUserManager
 from .utils import get_slug_full_name
 
@@ -20,10 +26,16 @@ from .utils import get_slug_full_name
 class User(AbstractBaseUser, PermissionsMixin, BaseModelWithUID):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
-    slug = AutoSlugField(populate_from=get_slug_full_name, editable=False, unique=True)
+    slug = UniqueSlugField(populate_from=get_slug_full_name, editable=False, unique=True)
     phone = PhoneNumberField(blank=True, null=True)
     email = models.EmailField(unique=True, db_index=True)
-    image = models.ImageField(upload_to="profile_images/", null=True, blank=True)
+    image = ProcessedImageField(
+        upload_to="profile_images/",
+        null=True,
+        blank=True,
+        variants_field="image_variants",
+    )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     address = models.TextField(blank=True, null=True)
     status = models.CharField(
         max_length=20,
@@ -40,8 +52,8 @@ class User(AbstractBaseUser, PermissionsMixin, BaseModelWithUID):
     # Managers
     objects = CustomUserManager()
 
-    # simple history
-    history = HistoricalRecords()
+    # simple history, without the variants generated from the image
+    history = BufferedHistoricalRecords(excluded_fields=["image_variants"])
 
     def __str__(self):
         name = " ".join([self.first_name, self.last_name])
@@ -70,3 +82,55 @@ class User(AbstractBaseUser, PermissionsMixin, BaseModelWithUID):
         self.status = StatusChoices.REMOVED
         self.is_active = False
         self.save_dirty_fields()
+
+
+class UserImportStorage(FileSystemStorage):
+    """
+    Files waiting for import_users, in USER_IMPORT_DIR (a directory of the
+    temporary directory by default): they hold passwords, so never under the
+    served MEDIA_ROOT.
+    """
+
+    @property
+    def base_location(self):
+        return getattr(settings, "USER_IMPORT_DIR", None) or os.path.join(
+            tempfile.gettempdir(), "user-imports"
+        )
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+class UserImport(models.Model):
+    """A file uploaded in the admin, imported by `import_users --pending`"""
+
+    file = models.FileField(upload_to="%Y/%m/", storage=UserImportStorage())
+    # Name of the uploaded file, the stored one is deleted once imported
+    name = models.CharField(max_length=255)
+    import_format = models.CharField(
+        max_length=10, choices=UserImportFormatChoices.choices
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=UserImportStatusChoices.choices,
+        default=UserImportStatusChoices.PENDING,
+        db_index=True,
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Counts of UserImporter.stats
+    stats = models.JSONField(default=dict, blank=True)
+    # What the import_users command prints for a file
+    report = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
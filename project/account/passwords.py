@@ -0,0 +1,118 @@
+"""Password verification off the request thread / event loop"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.db import close_old_connections
+
+
+class PasswordVerifierBusy(Exception):
+    """Raised when too many verifications are already queued"""
+
+
+def verify_password(password, encoded):
+    """
+    Return (is_correct, must_update) like django's check_password, without
+    saving the upgraded hash inline.
+    """
+    if not check_password(password, encoded):
+        return False, False
+
+    preferred = get_hasher("default")
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return True, False
+    must_update = hasher.algorithm != preferred.algorithm or preferred.must_update(
+        encoded
+    )
+    return True, must_update
+
+
+def upgrade_password_hash(user_id, password, encoded):
+    """Rehash with the preferred hasher unless the password changed meanwhile"""
+    try:
+        get_user_model().objects.filter(pk=user_id, password=encoded).update(
+            password=make_password(password)
+        )
+    finally:
+        close_old_connections()
+
+
+class PasswordVerifier:
+    """
+    Runs PBKDF2 & co on a bounded thread pool (hashlib releases the GIL).
+    When more than max_pending verifications (and hash upgrades) are queued new
+    ones are refused, so a login storm sheds load instead of starving every
+    other endpoint.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-verifier"
+        )
+        self.max_pending = max_pending
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise PasswordVerifierBusy()
+            self.pending += 1
+
+    def release(self):
+        with self.lock:
+            self.pending -= 1
+
+    async def run(self, func, *args):
+        self.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.release()
+
+    async def verify(self, password, encoded):
+        return await self.run(verify_password, password, encoded)
+
+    async def burn(self, password):
+        """Hash once for unknown users, so response time does not leak them"""
+        await self.run(make_password, password)
+
+    def schedule_upgrade(self, user_id, password, encoded):
+        """
+        Rehash in the background, counted against max_pending like the
+        verifications. Skipped when busy, the next login upgrades the hash.
+        """
+        try:
+            self.acquire()
+        except PasswordVerifierBusy:
+            return None
+        try:
+            future = self.executor.submit(
+                upgrade_password_hash, user_id, password, encoded
+            )
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(lambda future: self.release())
+        return future
+
+
+@functools.lru_cache(maxsize=None)
+def get_password_verifier():
+    return PasswordVerifier(
+        max_workers=getattr(settings, "LOGIN_PASSWORD_VERIFIER_WORKERS", 4),
+        max_pending=getattr(settings, "LOGIN_PASSWORD_VERIFIER_MAX_PENDING", 64),
+    )
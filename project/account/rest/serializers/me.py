@@ -1,7 +1,7 @@
 import re
 
 from django.contrib.auth.hashers import make_password
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 
 from rest_framework import serializers
 
@@ -13,30 +13,17 @@ User = get_user_model()
 
 
 class UserLoginSerializer(serializers.Serializer):
+    """Login credentials. Checking them is done by the async UserLoginView."""
+
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
-    def validate(self, data):
-        # Get email and password from input data
-        email = data.get("email", None)
-        password = data.get("password", None)
-
-        # Check if email and password is provided
-        if email is None or password is None:
-            raise serializers.ValidationError("Both email and password are required.")
-
-        # Authenticate user
-        user = authenticate(email=email, password=password)
-        if user is None:
-            raise serializers.ValidationError("Invalid credentials.")
 
-        # Check if the account is active or not
-        if not user.is_active:
-            raise serializers.ValidationError("User account is deactivated.")
-
-        # Insert user object in data dictionary
-        data["user"] = user
-        return data
+class UserLoginResponseSerializer(serializers.Serializer):
+    message = serializers.CharField()
+    name = serializers.CharField()
+    email = serializers.EmailField()
+    token = serializers.CharField()
 
 
 class PublicUserRegistrationSerializer(serializers.Serializer):
@@ -0,0 +1,62 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from account.authentication import (
+    TOKEN_CACHE_KEY,
+    get_token_cache,
+    get_token_cache_timeout,
+)
+from shared.tests.factories import make_client, make_user
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    url = reverse("me.order-list")
+
+    def setUp(self):
+        caches["default"].clear()
+        self.user = make_user()
+        self.client = make_client(self.user)
+        self.key = Token.objects.get(user=self.user).key
+
+    def test_second_request_skips_the_token_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertFalse(
+            any("authtoken_token" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_unknown_token_is_rejected(self):
+        client = make_client()
+        client.credentials(HTTP_AUTHORIZATION="Token nope")
+        self.assertEqual(client.get(self.url).status_code, 401)
+
+    def test_deactivated_user_is_rejected_once_cached(self):
+        self.client.get(self.url)
+        self.user.deactivate()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_removed_user_is_rejected(self):
+        self.client.get(self.url)
+        self.user.removed()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deleted_token_is_rejected_once_cached(self):
+        self.client.get(self.url)
+        Token.objects.filter(user=self.user).delete()
+        self.assertIsNone(get_token_cache().get(TOKEN_CACHE_KEY.format(key=self.key)))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    @override_settings(TOKEN_AUTH_LOCAL_CACHE_TIMEOUT=7, TOKEN_AUTH_CACHE_TIMEOUT=300)
+    def test_per_process_cache_uses_the_short_timeout(self):
+        self.assertEqual(get_token_cache_timeout(), 7)
+
+    @override_settings(TOKEN_AUTH_LOCAL_CACHE_TIMEOUT=7, TOKEN_AUTH_CACHE_TIMEOUT=300)
+    def test_shared_cache_uses_the_long_timeout(self):
+        shared_cache = object()  # anything but a per-process LocMemCache
+        self.assertEqual(get_token_cache_timeout(shared_cache), 300)
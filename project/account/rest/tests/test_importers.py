@@ -0,0 +1,290 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from account.choices import UserImportStatusChoices
+from account.importers import (
+    UserImporter,
+    claim_user_import,
+    get_import_format,
+    read_user_rows,
+)
+from account.models import UserImport
+from shared.slugs import allocate_slugs
+from shared.tests.factories import make_user
+
+User = get_user_model()
+
+CSV = """email,password,first_name,last_name,phone,address
+ann@example.com,secret-1,ann,lee,+8801712345678,Road 1
+BOB@Example.COM,,bob,ray,,
+not-an-email,x,bad,row,,
+cat@example.com,x,cat,kim,12,
+ann@example.com,x,ann,again,,
+"""
+
+
+def import_rows(text, import_format="csv", **kwargs):
+    importer = UserImporter(workers=1, **kwargs)
+    importer.run(read_user_rows(io.StringIO(text), import_format))
+    return importer
+
+
+class UserImporterTests(TestCase):
+    def test_csv_import(self):
+        importer = import_rows(CSV)
+        self.assertEqual(
+            importer.stats,
+            {"created": 2, "skipped_existing": 1, "skipped_invalid": 2},
+        )
+        self.assertEqual(
+            importer.errors, [(3, "Invalid email"), (4, "Invalid phone number")]
+        )
+
+        ann = User.objects.get(email="ann@example.com")
+        self.assertEqual((ann.first_name, ann.last_name), ("Ann", "Lee"))
+        self.assertEqual(str(ann.phone), "+8801712345678")
+        self.assertTrue(ann.check_password("secret-1"))
+        self.assertTrue(Token.objects.filter(user=ann).exists())
+        self.assertEqual(ann.history.count(), 1)
+
+        # Only the domain is lowercased, users without password can not log in
+        bob = User.objects.get(email="BOB@example.com")
+        self.assertFalse(bob.has_usable_password())
+
+    def test_existing_users_skipped(self):
+        make_user("ann@example.com")
+        make_user("other@example.com", phone="+8801712345678")
+        importer = import_rows(CSV)
+        self.assertEqual(importer.stats["created"], 1)
+        self.assertEqual(importer.stats["skipped_existing"], 2)
+
+    def test_users_created_meanwhile_skipped(self):
+        def assign_slugs(users):
+            # A registration racing the import, after its existence checks
+            make_user("ann@example.com")
+            allocate_slugs(users)
+
+        importer = UserImporter(workers=1)
+        with mock.patch.object(importer, "assign_slugs", side_effect=assign_slugs):
+            importer.run(read_user_rows(io.StringIO(CSV), "csv"))
+        self.assertEqual(
+            importer.stats,
+            {"created": 1, "skipped_existing": 2, "skipped_invalid": 2},
+        )
+        self.assertTrue(User.objects.filter(email="BOB@example.com").exists())
+
+    def test_unique_slugs_across_batches(self):
+        rows = "".join(
+            f'{{"email": "jo{number}@example.com", "first_name": "Jo", '
+            f'"last_name": "Doe"}}\n'
+            for number in range(5)
+        )
+        import_rows(rows, "jsonl", batch_size=2)
+        slugs = list(User.objects.values_list("slug", flat=True))
+        self.assertEqual(len(slugs), 5)
+        self.assertEqual(len(set(slugs)), 5)
+
+    def test_bad_jsonl_lines_reported_and_skipped(self):
+        rows = "\n".join(
+            [
+                '{"email": "ann@example.com", "password": "secret-1"}',
+                "{not json",
+                '["a", "list"]',
+                "",
+                '{"email": 5}',
+                '{"email": "bob@example.com", "phone": 8801712345678}',
+            ]
+        )
+        importer = import_rows(rows, "jsonl")
+        self.assertEqual(importer.stats["created"], 1)
+        self.assertEqual(importer.stats["skipped_invalid"], 4)
+        self.assertEqual([number for number, _ in importer.errors], [2, 3, 4, 5])
+        self.assertTrue(importer.errors[0][1].startswith("Invalid JSON"))
+        self.assertEqual(importer.errors[1][1], "Not a JSON object")
+        self.assertTrue(User.objects.filter(email="ann@example.com").exists())
+
+    def test_reported_errors_capped(self):
+        rows = "email\n" + "bad\n" * 150
+        with mock.patch("account.importers.MAX_REPORTED_ERRORS", 10):
+            importer = import_rows(rows)
+        self.assertEqual(importer.stats["skipped_invalid"], 150)
+        self.assertEqual(len(importer.errors), 10)
+
+
+class ImportUsersCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_import_and_report(self):
+        path = self.write("users.jsonl", '{"email": "ann@example.com"}\n[1]\n')
+        output = io.StringIO()
+        call_command("import_users", path, "--workers", "1", stdout=output)
+        self.assertIn("Row 2: Not a JSON object", output.getvalue())
+        self.assertIn("Created 1 users", output.getvalue())
+        self.assertTrue(os.path.exists(path))
+
+    def test_delete(self):
+        path = self.write("users.csv", CSV)
+        call_command(
+            "import_users", path, "--workers", "1", "--delete", stdout=io.StringIO()
+        )
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command("import_users", os.path.join(self.directory, "nope.csv"))
+
+
+class UserImportTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        overridden = override_settings(USER_IMPORT_DIR=directory)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.admin = make_user("admin@example.com", is_staff=True, is_superuser=True)
+
+    def make_import(self, text=CSV, name="users.csv", **kwargs):
+        return UserImport.objects.create(
+            file=SimpleUploadedFile(name, text.encode()),
+            name=name,
+            import_format=get_import_format(name),
+            **kwargs,
+        )
+
+
+class PendingUserImportTests(UserImportTestCase):
+    def import_pending(self):
+        output = io.StringIO()
+        call_command("import_users", "--pending", "--workers", "1", stdout=output)
+        return output.getvalue()
+
+    def test_imported_one_at_a_time(self):
+        first = self.make_import()
+        second = self.make_import('{"email": "dan@example.com"}\n', "more.jsonl")
+        path = first.file.path
+        self.assertTrue(os.path.exists(path))
+
+        output = self.import_pending()
+        self.assertIn("users.csv: done, 2 users created.", output)
+        self.assertIn("more.jsonl: done, 1 users created.", output)
+        first.refresh_from_db()
+        self.assertEqual(first.status, UserImportStatusChoices.DONE)
+        self.assertEqual(first.stats["skipped_invalid"], 2)
+        self.assertEqual(
+            first.report.splitlines(),
+            [
+                "Row 3: Invalid email",
+                "Row 4: Invalid phone number",
+                "Created 2 users, skipped 1 existing and 2 invalid rows.",
+            ],
+        )
+        # The uploads are deleted once imported
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.import_pending(), "")
+        second.refresh_from_db()
+        self.assertEqual(second.status, UserImportStatusChoices.DONE)
+
+    def test_nothing_claimed_while_one_is_running(self):
+        running = self.make_import(
+            status=UserImportStatusChoices.RUNNING, started_at=timezone.now()
+        )
+        pending = self.make_import()
+        self.assertIsNone(claim_user_import())
+
+        # Unless it was killed long ago
+        UserImport.objects.filter(pk=running.pk).update(
+            started_at=timezone.now() - datetime.timedelta(days=1)
+        )
+        self.assertEqual(claim_user_import(), pending)
+        running.refresh_from_db()
+        self.assertEqual(running.status, UserImportStatusChoices.FAILED)
+
+    def test_failure_reported(self):
+        user_import = self.make_import()
+        path = user_import.file.path
+        with self.assertLogs("account.importers", "ERROR"), mock.patch(
+            "account.importers.read_user_rows", side_effect=ValueError("broken")
+        ):
+            self.import_pending()
+        user_import.refresh_from_db()
+        self.assertEqual(user_import.status, UserImportStatusChoices.FAILED)
+        self.assertIn("Import failed: broken", user_import.report)
+        self.assertFalse(os.path.exists(path))
+
+    def test_path_or_pending_required(self):
+        with self.assertRaises(CommandError):
+            call_command("import_users")
+
+
+class UserImportAdminTests(UserImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_upload_queued(self):
+        upload = SimpleUploadedFile("users.csv", CSV.encode())
+        response = self.client.post(
+            reverse("admin:account_user_import"), {"file": upload}
+        )
+
+        self.assertRedirects(response, reverse("admin:account_user_changelist"))
+        # Nothing imported within the request
+        self.assertEqual(User.objects.count(), 1)
+        user_import = UserImport.objects.get()
+        self.assertEqual(
+            (user_import.name, user_import.import_format, user_import.created_by),
+            ("users.csv", "csv", self.admin),
+        )
+        self.assertEqual(user_import.status, UserImportStatusChoices.PENDING)
+        with user_import.file.open() as file:
+            self.assertEqual(file.read().decode(), CSV)
+        self.assertTrue(
+            user_import.file.path.startswith(settings.USER_IMPORT_DIR)
+        )
+
+    def test_report_downloaded(self):
+        user_import = self.make_import(report="Created 2 users")
+        response = self.client.get(
+            reverse("admin:account_userimport_change", args=[user_import.pk])
+        )
+        url = reverse("admin:account_userimport_report", args=[user_import.pk])
+        self.assertContains(response, url)
+
+        response = self.client.get(url)
+        self.assertEqual(response.content, b"Created 2 users")
+        self.assertEqual(
+            response["Content-Disposition"],
+            f'attachment; filename="user-import-{user_import.pk}.txt"',
+        )
+
+    def test_add_permission_required(self):
+        self.client.force_login(make_user(is_staff=True))
+        response = self.client.get(reverse("admin:account_user_import"))
+        self.assertRedirects(
+            response,
+            reverse("admin:account_user_changelist"),
+            fetch_redirect_response=False,
+        )
@@ -0,0 +1,178 @@
+from unittest import mock
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.throttling import AnonRateThrottle
+
+from account.models import User
+from account.passwords import PasswordVerifier, PasswordVerifierBusy
+from account.rest.views.me import UserLoginView
+from shared.choices import StatusChoices
+from shared.tests.factories import PASSWORD, make_user
+
+HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.MD5PasswordHasher",
+]
+
+
+class OneLoginPerMinute(AnonRateThrottle):
+    rate = "1/min"
+
+
+class UserLoginTests(TestCase):
+    def setUp(self):
+        self.user = make_user("ann@example.com")
+        self.verifier = PasswordVerifier(max_workers=2, max_pending=8)
+        patcher = mock.patch(
+            "account.rest.views.me.get_password_verifier", return_value=self.verifier
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def login(self, password=PASSWORD, email="ann@example.com", **kwargs):
+        return self.client.post(
+            reverse("login"), {"email": email, "password": password}, **kwargs
+        )
+
+    def test_login(self):
+        response = self.login(format="json")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["token"], Token.objects.get(user=self.user).key)
+        self.assertEqual(body["email"], "ann@example.com")
+        self.assertEqual(body["name"], "Jo Doe")
+
+    def test_form_encoded_login(self):
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_wrong_password(self):
+        response = self.login("wrong")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"non_field_errors": ["Invalid credentials."]}
+        )
+
+    def test_unknown_email_still_hashes(self):
+        with mock.patch.object(self.verifier, "burn", wraps=self.verifier.burn) as burn:
+            response = self.login(email="nobody@example.com")
+        self.assertEqual(response.status_code, 400)
+        burn.assert_called_once_with(PASSWORD)
+
+    def test_deactivated_user(self):
+        self.user.status = StatusChoices.INACTIVE
+        self.user.save()
+        response = self.login()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"non_field_errors": ["User account is deactivated."]}
+        )
+
+    def test_inactive_user_gets_the_generic_error(self):
+        # is_active is not a column of User, as on AbstractBaseUser
+        with mock.patch.object(User, "is_active", False), mock.patch.object(
+            self.verifier, "burn", wraps=self.verifier.burn
+        ) as burn:
+            response = self.login()
+        self.assertEqual(
+            response.json(), {"non_field_errors": ["Invalid credentials."]}
+        )
+        burn.assert_called_once_with(PASSWORD)
+
+    def test_failures_signalled(self):
+        failures = []
+
+        def receiver(sender, credentials=None, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.login("wrong")
+        self.login(email="nobody@example.com")
+        self.login()
+        self.assertEqual(
+            [credentials["email"] for credentials in failures],
+            ["ann@example.com", "nobody@example.com"],
+        )
+        self.assertNotIn("wrong", failures[0]["password"])
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=[
+            "django.contrib.auth.backends.AllowAllUsersModelBackend"
+        ]
+    )
+    def test_other_backends_authenticate(self):
+        with mock.patch.object(User, "is_active", False), mock.patch.object(
+            self.verifier, "verify"
+        ) as verify:
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login("wrong").status_code, 400)
+        verify.assert_not_called()
+
+    def test_invalid_payload(self):
+        response = self.client.post(reverse("login"), {"email": "nope"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {"email", "password"})
+
+    def test_busy_verifier(self):
+        with mock.patch.object(
+            self.verifier, "acquire", side_effect=PasswordVerifierBusy
+        ):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_throttled(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.object(UserLoginView, "throttle_classes", [OneLoginPerMinute]):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_other_methods_not_allowed(self):
+        self.assertEqual(self.client.get(reverse("login")).status_code, 405)
+        self.assertEqual(self.client.options(reverse("login")).status_code, 200)
+
+
+class PasswordVerifierTests(TestCase):
+    def test_upgrades_count_against_the_queue(self):
+        verifier = PasswordVerifier(max_workers=1, max_pending=1)
+        verifier.acquire()
+        with mock.patch("account.passwords.upgrade_password_hash") as upgrade:
+            self.assertIsNone(verifier.schedule_upgrade(1, PASSWORD, "hash"))
+            verifier.release()
+
+            future = verifier.schedule_upgrade(1, PASSWORD, "hash")
+            future.result()
+        upgrade.assert_called_once_with(1, PASSWORD, "hash")
+        verifier.executor.shutdown(wait=True)
+        self.assertEqual(verifier.pending, 0)
+
+
+@override_settings(PASSWORD_HASHERS=HASHERS)
+class PasswordUpgradeTests(TransactionTestCase):
+    def test_outdated_hash_upgraded(self):
+        user = make_user("ann@example.com")
+        user.password = make_password(PASSWORD, hasher="md5")
+        user.save()
+        verifier = PasswordVerifier(max_workers=1, max_pending=8)
+
+        with mock.patch(
+            "account.rest.views.me.get_password_verifier", return_value=verifier
+        ):
+            response = APIClient().post(
+                reverse("login"), {"email": user.email, "password": PASSWORD}
+            )
+        self.assertEqual(response.status_code, 200)
+        verifier.executor.shutdown(wait=True)
+
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, "pbkdf2_sha256")
+        self.assertTrue(user.check_password(PASSWORD))
@@ -1,36 +1,114 @@
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.signals import user_login_failed
+
+from asgiref.sync import sync_to_async
+
+from drf_spectacular.utils import extend_schema
+
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from rest_framework.response import Response
 from rest_framework.generics import CreateAPIView
-from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
-from ..serializers.me import UserLoginSerializer, PublicUserRegistrationSerializer
+from shared.choices import StatusChoices
+from shared.views import AsyncAPIView
 
+from ...passwords import PasswordVerifierBusy, get_password_verifier
+from ..serializers.me import (
+    PublicUserRegistrationSerializer,
+    UserLoginResponseSerializer,
+    UserLoginSerializer,
+)
 
-class UserLoginView(APIView):
-    """Apiview for user login and returning token with success message"""
+User = get_user_model()
 
-    def post(self, request, *args, **kwargs):
+MODEL_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+class UserLoginView(AsyncAPIView):
+    """
+    Async view for user login returning token with success message.
+    The password is verified on a bounded thread pool so the event loop (or
+    the WSGI worker) is never blocked by the hasher. That replaces the check of
+    the default ModelBackend only: with other AUTHENTICATION_BACKENDS the
+    credentials go through authenticate().
+    """
+
+    @extend_schema(
+        request=UserLoginSerializer, responses=UserLoginResponseSerializer
+    )
+    async def post(self, request, *args, **kwargs):
         serializer = UserLoginSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        email = serializer.validated_data["email"]
+        password = serializer.validated_data["password"]
 
-        if serializer.is_valid():
-            # Get user object from validated data
-            user = serializer.validated_data["user"]
-
-            # Get or create token for the user. Although by signal the token was certainly created.
-            token, created = Token.objects.get_or_create(user=user)
-
-            return Response(
-                {
-                    "message": "Successefully Logged In!",
-                    "name": f"{user.first_name} {user.last_name}",
-                    "email": user.email,
-                    "token": token.key,
-                },
-                status=status.HTTP_200_OK,
+        if list(settings.AUTHENTICATION_BACKENDS) == [MODEL_BACKEND]:
+            try:
+                user = await self.verify(request, email, password)
+            except PasswordVerifierBusy:
+                return Response(
+                    {"detail": "Too many login attempts, please retry."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "1"},
+                )
+        else:
+            user = await sync_to_async(authenticate)(
+                request, email=email, password=password
             )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if user is None:
+            return self.error("Invalid credentials.")
+
+        # Only told to whoever knows the password
+        if user.status != StatusChoices.ACTIVE:
+            return self.error("User account is deactivated.")
+
+        # Get or create token for the user. Although by signal the token was certainly created.
+        token, created = await Token.objects.aget_or_create(user=user)
+
+        return Response(
+            {
+                "message": "Successefully Logged In!",
+                "name": f"{user.first_name} {user.last_name}",
+                "email": user.email,
+                "token": token.key,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    async def verify(self, request, email, password):
+        """The user, or None after sending user_login_failed like authenticate()"""
+        verifier = get_password_verifier()
+        user = await User.objects.filter(email=email).afirst()
+        # Inactive users are rejected like unknown ones, after the same work
+        if user is None or not user.is_active:
+            await verifier.burn(password)
+            is_correct = False
+        else:
+            is_correct, must_update = await verifier.verify(password, user.password)
+
+        if not is_correct:
+            await user_login_failed.asend(
+                sender=authenticate.__module__,
+                credentials={"email": email, "password": "********************"},
+                request=request,
+            )
+            return None
+
+        # Outdated hasher or iteration count, rehash without delaying the response
+        if must_update:
+            verifier.schedule_upgrade(user.pk, password, user.password)
+        return user
+
+    def error(self, message):
+        return Response(
+            {"non_field_errors": [message]}, status=status.HTTP_400_BAD_REQUEST
+        )
 
 
 class PublicUserRegistrationView(CreateAPIView):
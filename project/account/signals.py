@@ -1,10 +1,31 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
+from .authentication import invalidate_token, invalidate_user_tokens
+
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
         Token.objects.create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user_token(sender, instance=None, created=False, **kwargs):
+    # Any change on the user (activate, deactivate, removed...) makes the cached snapshot stale
+    if not created:
+        invalidate_user_tokens(instance.pk)
+        # Again once committed, a request may have cached the old row meanwhile
+        transaction.on_commit(lambda: invalidate_user_tokens(instance.pk))
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance=None, **kwargs):
+    # Token rotation is a delete followed by a create with a new key
+    invalidate_token(instance.key)
+    invalidate_user_tokens(instance.user_id)
+    transaction.on_commit(lambda: invalidate_token(instance.key))
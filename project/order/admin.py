@@ -1,3 +1,82 @@
 from django.contrib import admin
 
-# Register your models here.
+from shared.admin import ScalableModelAdmin, register_history
+
+from .models import CustomerFeedback, Order, OrderItem, OutboxEvent, Payment
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ["menu_item", "modifier"]
+    readonly_fields = ["uid"]
+
+
+@admin.register(Order)
+class OrderAdmin(ScalableModelAdmin):
+    list_display = [
+        "uid",
+        "restaurant",
+        "user",
+        "total_price",
+        "order_status",
+        "delivery_status",
+        "order_type",
+        "created_at",
+    ]
+    list_filter = ["order_status", "delivery_status", "order_type"]
+    list_select_related = ["restaurant", "user"]
+    # Exact lookups, backed by the unique indexes
+    search_fields = ["=uid", "=user__email"]
+    raw_id_fields = ["user", "restaurant", "delivery_man"]
+    readonly_fields = ["uid", "created_at"]
+    inlines = [OrderItemInline]
+    # Indexed, and old orders are moved to ArchivedOrder by archive_orders
+    date_hierarchy = "created_at"
+
+
+@admin.register(Payment)
+class PaymentAdmin(ScalableModelAdmin):
+    list_display = [
+        "uid",
+        "order_uid",
+        "amount",
+        "payment_method",
+        "payment_status",
+        "created_at",
+    ]
+    list_filter = ["payment_status", "payment_method"]
+    list_select_related = ["order"]
+    search_fields = ["=uid", "=order__uid"]
+    raw_id_fields = ["order"]
+    readonly_fields = ["uid", "created_at"]
+
+    @admin.display(description="Order", ordering="order__uid")
+    def order_uid(self, obj):
+        return obj.order.uid
+
+
+@admin.register(CustomerFeedback)
+class CustomerFeedbackAdmin(ScalableModelAdmin):
+    list_display = ["title", "customer", "restaurant", "menu_item", "rating"]
+    list_filter = ["rating"]
+    list_select_related = ["customer", "restaurant", "menu_item"]
+    search_fields = ["=uid", "=customer__email"]
+    raw_id_fields = ["customer", "menu_item", "order", "restaurant"]
+    readonly_fields = ["uid", "slug", "created_at"]
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(ScalableModelAdmin):
+    list_display = ["id", "event_type", "aggregate_uid", "created_at"]
+    list_filter = ["event_type"]
+    search_fields = ["=aggregate_uid"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+register_history(Order, Payment)
@@ -0,0 +1,182 @@
+"""
+Hot / cold archival of terminal orders.
+
+archive_orders() moves the orders in a terminal status created more than
+ORDER_ARCHIVE["MIN_AGE_DAYS"] ago out of the hot tables, oldest first, in
+chunks of CHUNK_SIZE orders. Each order becomes one ArchivedOrder row holding
+its detail as the API served it, its payment and the history rows of both.
+The order, its items, payment and history rows are then deleted with plain
+DELETEs: archiving is no change of the order, so no history row, outbox event
+or rollup update is written for it, and rebuild_sales_rollups() counts the
+archived orders along with the hot ones. Feedback on an archived order is kept,
+without its order.
+
+ArchivedOrder lives in ORDER_ARCHIVE["DATABASE"] (see order.routers). Every
+chunk is written to the archive before the hot rows are deleted, in the
+transaction deleting them, and the archive insert ignores orders it already
+holds. An interrupted run therefore loses nothing and the next one resumes
+where it stopped, since it starts again from the oldest order left.
+
+get_order_detail() serves the detail of an order from the hot tables, falling
+back to the archive when its uid is not there anymore.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, CustomerFeedback, Order, OrderItem, Payment
+from .rest.serializers.me import UserOrderDetailSerializer
+from .routers import get_archive_database
+from .utils import TERMINAL_ORDER_STATUSES
+
+ORDER_ARCHIVE_DEFAULTS = {
+    "DATABASE": DEFAULT_DB_ALIAS,
+    "MIN_AGE_DAYS": 180,
+    "CHUNK_SIZE": 500,
+}
+
+
+def get_archive_settings():
+    return {**ORDER_ARCHIVE_DEFAULTS, **getattr(settings, "ORDER_ARCHIVE", {})}
+
+
+def get_archivable_orders(min_age_days):
+    cutoff = timezone.now() - datetime.timedelta(days=min_age_days)
+    return Order.objects.filter(
+        created_at__lt=cutoff, order_status__in=TERMINAL_ORDER_STATUSES
+    ).order_by("created_at", "id")
+
+
+def get_history_rows(model, ids):
+    """{object id: [history rows]} of the history of model"""
+    rows = {}
+    history = model.history.model.objects.filter(id__in=ids).order_by("history_id")
+    for row in history.values():
+        rows.setdefault(row["id"], []).append(row)
+    return rows
+
+
+def build_archived_orders(orders):
+    """ArchivedOrder rows of orders, in a fixed number of queries"""
+    order_ids = [order.id for order in orders]
+    details = UserOrderDetailSerializer(
+        Order.objects.filter(id__in=order_ids)
+        .select_related("restaurant")
+        .prefetch_related("order_items__menu_item", "order_items__modifier")
+        .order_by("id"),
+        many=True,
+    ).data
+    payments = {
+        payment["order_id"]: payment
+        for payment in Payment.objects.filter(order_id__in=order_ids).values()
+    }
+    order_history = get_history_rows(Order, order_ids)
+    payment_history = get_history_rows(
+        Payment, [payment["id"] for payment in payments.values()]
+    )
+    feedbacks = {}
+    for order_id, uid in CustomerFeedback.objects.filter(
+        order_id__in=order_ids
+    ).values_list("order_id", "uid"):
+        feedbacks.setdefault(order_id, []).append(uid)
+
+    archived_orders = []
+    for order, detail in zip(sorted(orders, key=lambda order: order.id), details):
+        payment = payments.get(order.id)
+        archived_orders.append(
+            ArchivedOrder(
+                uid=order.uid,
+                user_id=order.user_id,
+                restaurant_id=order.restaurant_id,
+                order_status=order.order_status,
+                order_type=order.order_type,
+                total_price=order.total_price,
+                created_at=order.created_at,
+                data={
+                    "detail": detail,
+                    "payment": payment,
+                    "order_history": order_history.get(order.id, []),
+                    "payment_history": (
+                        payment_history.get(payment["id"], []) if payment else []
+                    ),
+                    "feedback_uids": feedbacks.get(order.id, []),
+                },
+            )
+        )
+    return archived_orders
+
+
+def delete_hot_rows(order_ids):
+    """Delete the orders and what belongs to them, without any signal"""
+    payment_ids = list(
+        Payment.objects.filter(order_id__in=order_ids).values_list("id", flat=True)
+    )
+    CustomerFeedback.objects.filter(order_id__in=order_ids).update(order=None)
+    # _raw_delete is what Django's own deletion uses for signal-free deletes
+    querysets = [
+        Payment.history.model.objects.filter(id__in=payment_ids),
+        Order.history.model.objects.filter(id__in=order_ids),
+        OrderItem.objects.filter(order_id__in=order_ids),
+        Payment.objects.filter(id__in=payment_ids),
+        Order.objects.filter(id__in=order_ids),
+    ]
+    for queryset in querysets:
+        queryset._raw_delete(queryset.db)
+
+
+def archive_chunk(min_age_days, chunk_size):
+    """Archive the oldest chunk of archivable orders. Returns how many."""
+    with transaction.atomic():
+        orders = get_archivable_orders(min_age_days).select_for_update(
+            skip_locked=True
+        )
+        orders = list(orders[:chunk_size])
+        if not orders:
+            return 0
+
+        # Committed before the hot rows are deleted, when in another database
+        with transaction.atomic(using=get_archive_database()):
+            ArchivedOrder.objects.bulk_create(
+                build_archived_orders(orders), ignore_conflicts=True
+            )
+        delete_hot_rows([order.id for order in orders])
+    return len(orders)
+
+
+def archive_orders(min_age_days=None, chunk_size=None, max_chunks=None):
+    """Archive chunks until none is left or max_chunks were done"""
+    config = get_archive_settings()
+    if min_age_days is None:
+        min_age_days = config["MIN_AGE_DAYS"]
+    chunk_size = chunk_size or config["CHUNK_SIZE"]
+
+    archived = chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        count = archive_chunk(min_age_days, chunk_size)
+        archived += count
+        chunks += 1
+        if count < chunk_size:
+            break
+    return archived
+
+
+def get_order_detail(user, uid):
+    """Serialized detail of an order of the user, hot or archived, or None"""
+    order = (
+        Order.objects.filter(user=user, uid=uid)
+        .select_related("restaurant")
+        .prefetch_related("order_items__menu_item", "order_items__modifier")
+        .first()
+    )
+    if order is not None:
+        return UserOrderDetailSerializer(order).data
+
+    archived_order = (
+        ArchivedOrder.objects.filter(user_id=user.pk, uid=uid).only("data").first()
+    )
+    if archived_order is not None:
+        return archived_order.data["detail"]
+    return None
@@ -0,0 +1,538 @@
+"""
+Storage of the live carts.
+
+Carts change far more often than they are checked out and most of them are
+abandoned, so the live carts can be kept out of the database:
+
+- DatabaseCartStore writes every change to Cart/CartItem, as before.
+- LocMemCartStore keeps the carts in the memory of the process, for tests and
+  single process development servers.
+- RedisCartStore keeps them in Redis, one hash per cart.
+
+The live stores keep the total of each cart up to date on every change, and
+only write Cart/CartItem rows for carts idle for longer than `expire_after`
+seconds (`manage.py flush_expired_carts`). Such a persisted cart is loaded back
+into the store the next time its user touches the cart. At checkout the lines
+are taken out of the store and turned into order items without ever being
+written as CartItem rows.
+"""
+
+import contextlib
+import functools
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from restaurant.models import MenuItem, Modifier
+
+from .models import Cart, CartItem
+
+CENTS = Decimal("0.01")
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(CENTS)
+
+
+def get_line_key(menu_item_id, modifier_id=None):
+    return f"{menu_item_id}:{modifier_id or 0}"
+
+
+def parse_line_key(key):
+    menu_item_id, modifier_id = (int(part) for part in key.split(":"))
+    return menu_item_id, modifier_id or None
+
+
+def get_empty_cart_state():
+    return {"lines": {}, "total": 0}
+
+
+def get_cart_payload(state):
+    """{items, total, item_count} from {lines: {key: (quantity, cents)}, total}"""
+    items = []
+    for key, (quantity, unit_cents) in sorted(state["lines"].items()):
+        menu_item_id, modifier_id = parse_line_key(key)
+        items.append(
+            {
+                "menu_item": menu_item_id,
+                "modifier": modifier_id,
+                "quantity": quantity,
+                "unit_price": from_cents(unit_cents),
+            }
+        )
+    return {
+        "items": items,
+        "total": from_cents(state["total"]),
+        "item_count": sum(item["quantity"] for item in items),
+    }
+
+
+class BaseCartStore:
+    def get_cart(self, user_id):
+        raise NotImplementedError
+
+    def add_item(self, user_id, menu_item_id, modifier_id, quantity, unit_price):
+        """Add quantity to a line, creating it if needed. Returns the cart."""
+        raise NotImplementedError
+
+    def set_quantity(self, user_id, menu_item_id, modifier_id, quantity, unit_price):
+        """Set the quantity of a line, 0 removes it. Returns the cart."""
+        raise NotImplementedError
+
+    def clear(self, user_id):
+        raise NotImplementedError
+
+    def take(self, user_id):
+        """
+        Context manager yielding the items of the cart and emptying it, unless
+        the block raises.
+        """
+        raise NotImplementedError
+
+    def get_expired_user_ids(self):
+        return []
+
+    def flush_expired(self):
+        return 0
+
+
+class DatabaseCartStore(BaseCartStore):
+    """Every change is a write to Cart/CartItem"""
+
+    def get_cart_items(self, user_id):
+        return CartItem.objects.filter(cart__user_id=user_id)
+
+    def get_cart(self, user_id):
+        lines = {}
+        total = 0
+        for cart_item in self.get_cart_items(user_id):
+            unit_cents = to_cents(cart_item.price)
+            key = get_line_key(cart_item.menu_item_id, cart_item.modifier_id)
+            lines[key] = (cart_item.quantity, unit_cents)
+            total += cart_item.quantity * unit_cents
+        return get_cart_payload({"lines": lines, "total": total})
+
+    def save_line(
+        self, user_id, menu_item_id, modifier_id, quantity, unit_price, relative
+    ):
+        with transaction.atomic():
+            # The locked cart row serializes the changes to the lines of a cart
+            cart, created = Cart.objects.select_for_update().get_or_create(
+                user_id=user_id
+            )
+            cart_item = cart.cart_items.filter(
+                menu_item_id=menu_item_id, modifier_id=modifier_id
+            ).first()
+            if relative and cart_item is not None:
+                quantity += cart_item.quantity
+            if quantity <= 0:
+                if cart_item is not None:
+                    cart_item.delete()
+            elif cart_item is None:
+                CartItem.objects.create(
+                    cart=cart,
+                    menu_item_id=menu_item_id,
+                    modifier_id=modifier_id,
+                    quantity=quantity,
+                    price=unit_price,
+                )
+            else:
+                cart_item.quantity = quantity
+                cart_item.price = unit_price
+                cart_item.save()
+        return self.get_cart(user_id)
+
+    def add_item(self, user_id, menu_item_id, modifier_id, quantity, unit_price):
+        return self.save_line(
+            user_id, menu_item_id, modifier_id, quantity, unit_price, relative=True
+        )
+
+    def set_quantity(self, user_id, menu_item_id, modifier_id, quantity, unit_price):
+        return self.save_line(
+            user_id, menu_item_id, modifier_id, quantity, unit_price, relative=False
+        )
+
+    def clear(self, user_id):
+        self.get_cart_items(user_id).delete()
+
+    @contextlib.contextmanager
+    def take(self, user_id):
+        with transaction.atomic():
+            cart = Cart.objects.select_for_update().filter(user_id=user_id).first()
+            if cart is None:
+                yield []
+                return
+            cart_items = list(cart.cart_items.order_by("id"))
+            yield cart_items
+            CartItem.objects.filter(cart=cart).delete()
+
+
+class LiveCartStore(BaseCartStore):
+    """
+    Base of the stores keeping the carts outside of the database. Subclasses
+    provide atomic primitives over a cart state
+    {"lines": {line key: (quantity, unit price in cents)}, "total": cents}.
+    """
+
+    def __init__(self, expire_after=24 * 60 * 60):
+        self.expire_after = expire_after
+
+    def load(self, user_id):
+        """Cart state, None when the store has no cart for the user"""
+        raise NotImplementedError
+
+    def update_line(self, user_id, key, quantity, unit_cents, relative):
+        """Update one line and the total, returns (state, created)"""
+        raise NotImplementedError
+
+    def pop(self, user_id, touched_before=None):
+        """Remove and return the cart state, only if idle when touched_before"""
+        raise NotImplementedError
+
+    def get_expired_user_ids(self):
+        raise NotImplementedError
+
+    def restore(self, user_id):
+        """Load back the cart persisted when it expired, if any"""
+        with transaction.atomic():
+            # Concurrent restores wait on the cart row and then find no items,
+            # and a failing store rolls the deletion back
+            cart = Cart.objects.select_for_update().filter(user_id=user_id).first()
+            if cart is None:
+                return None
+            cart_items = list(cart.cart_items.all())
+            if not cart_items:
+                return None
+            CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+            for cart_item in cart_items:
+                state, created = self.update_line(
+                    user_id,
+                    get_line_key(cart_item.menu_item_id, cart_item.modifier_id),
+                    cart_item.quantity,
+                    to_cents(cart_item.price),
+                    relative=True,
+                )
+        return state
+
+    def change_line(
+        self, user_id, menu_item_id, modifier_id, quantity, unit_price, relative
+    ):
+        key = get_line_key(menu_item_id, modifier_id)
+        unit_cents = to_cents(unit_price)
+        state, created = self.update_line(user_id, key, quantity, unit_cents, relative)
+        if created:
+            restored = self.restore(user_id)
+            if restored is not None:
+                state = restored
+                # The restored line was added on top of the new quantity
+                if not relative:
+                    state, _ = self.update_line(
+                        user_id, key, quantity, unit_cents, relative=False
+                    )
+        return get_cart_payload(state)
+
+    def get_cart(self, user_id):
+        state = self.load(user_id)
+        if state is None:
+            state = self.restore(user_id) or get_empty_cart_state()
+        return get_cart_payload(state)
+
+    def add_item(self, user_id, menu_item_id, modifier_id, quantity, unit_price):
+        return self.change_line(
+            user_id, menu_item_id, modifier_id, quantity, unit_price, relative=True
+        )
+
+    def set_quantity(self, user_id, menu_item_id, modifier_id, quantity, unit_price):
+        return self.change_line(
+            user_id, menu_item_id, modifier_id, quantity, unit_price, relative=False
+        )
+
+    def clear(self, user_id):
+        self.pop(user_id)
+        CartItem.objects.filter(cart__user_id=user_id).delete()
+
+    @contextlib.contextmanager
+    def take(self, user_id):
+        state = self.pop(user_id)
+        if state is None and self.restore(user_id) is not None:
+            state = self.pop(user_id)
+        state = state or get_empty_cart_state()
+
+        cart_items = []
+        for key, (quantity, unit_cents) in sorted(state["lines"].items()):
+            menu_item_id, modifier_id = parse_line_key(key)
+            cart_items.append(
+                CartItem(
+                    menu_item_id=menu_item_id,
+                    modifier_id=modifier_id,
+                    quantity=quantity,
+                    price=from_cents(unit_cents),
+                )
+            )
+
+        try:
+            yield cart_items
+        except BaseException:
+            # Put the lines back, merged with whatever was added meanwhile
+            for key, (quantity, unit_cents) in state["lines"].items():
+                self.update_line(user_id, key, quantity, unit_cents, relative=True)
+            raise
+
+    def persist(self, user_id, state):
+        """Write the cart state as Cart/CartItem rows"""
+        lines = {
+            parse_line_key(key): value for key, value in state["lines"].items()
+        }
+        menu_item_ids = set(
+            MenuItem.objects.filter(
+                pk__in={menu_item_id for menu_item_id, _ in lines}
+            ).values_list("pk", flat=True)
+        )
+        modifier_ids = set(
+            Modifier.objects.filter(
+                pk__in={modifier_id for _, modifier_id in lines if modifier_id}
+            ).values_list("pk", flat=True)
+        )
+
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user_id=user_id)
+            CartItem.objects.filter(cart=cart).delete()
+            # bulk_create skips save(), so updated_at has to be stamped here
+            now = timezone.now()
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(
+                        cart=cart,
+                        menu_item_id=menu_item_id,
+                        modifier_id=modifier_id,
+                        quantity=quantity,
+                        price=from_cents(unit_cents),
+                        updated_at=now,
+                    )
+                    for (menu_item_id, modifier_id), (quantity, unit_cents) in (
+                        lines.items()
+                    )
+                    # Lines of deleted menu items or modifiers are dropped
+                    if menu_item_id in menu_item_ids
+                    and (modifier_id is None or modifier_id in modifier_ids)
+                ]
+            )
+
+    def flush_expired(self):
+        """Persist and evict the carts idle for longer than expire_after"""
+        touched_before = time.time() - self.expire_after
+        count = 0
+        for user_id in self.get_expired_user_ids():
+            state = self.pop(user_id, touched_before=touched_before)
+            if state is None:
+                continue
+            try:
+                self.persist(user_id, state)
+            except BaseException:
+                for key, (quantity, unit_cents) in state["lines"].items():
+                    self.update_line(user_id, key, quantity, unit_cents, relative=True)
+                raise
+            count += 1
+        return count
+
+
+class LocMemCartStore(LiveCartStore):
+    def __init__(self, expire_after=24 * 60 * 60):
+        super().__init__(expire_after=expire_after)
+        self.carts = {}
+        self.touched = {}
+        self.lock = threading.Lock()
+
+    def copy_state(self, state):
+        return {"lines": dict(state["lines"]), "total": state["total"]}
+
+    def load(self, user_id):
+        with self.lock:
+            state = self.carts.get(user_id)
+            return self.copy_state(state) if state is not None else None
+
+    def update_line(self, user_id, key, quantity, unit_cents, relative):
+        with self.lock:
+            created = user_id not in self.carts
+            state = self.carts.setdefault(user_id, get_empty_cart_state())
+            old_quantity, old_cents = state["lines"].get(key, (0, 0))
+            if relative:
+                quantity += old_quantity
+            quantity = max(quantity, 0)
+
+            state["total"] += quantity * unit_cents - old_quantity * old_cents
+            if quantity:
+                state["lines"][key] = (quantity, unit_cents)
+            else:
+                state["lines"].pop(key, None)
+            self.touched[user_id] = time.time()
+            return self.copy_state(state), created
+
+    def pop(self, user_id, touched_before=None):
+        with self.lock:
+            if touched_before is not None:
+                if self.touched.get(user_id, touched_before) > touched_before:
+                    return None
+            self.touched.pop(user_id, None)
+            return self.carts.pop(user_id, None)
+
+    def get_expired_user_ids(self):
+        touched_before = time.time() - self.expire_after
+        with self.lock:
+            return [
+                user_id
+                for user_id, touched in self.touched.items()
+                if touched <= touched_before
+            ]
+
+
+# KEYS: cart, touched index. ARGV: line key, quantity, unit cents, relative,
+# ttl, now, user id. Returns [created, field, value, ...]
+UPDATE_LINE_SCRIPT = """
+local created = redis.call("EXISTS", KEYS[1]) == 0 and 1 or 0
+local quantity_field = "q:" .. ARGV[1]
+local price_field = "p:" .. ARGV[1]
+local old_quantity = tonumber(redis.call("HGET", KEYS[1], quantity_field) or "0")
+local old_price = tonumber(redis.call("HGET", KEYS[1], price_field) or "0")
+local quantity = tonumber(ARGV[2])
+local price = tonumber(ARGV[3])
+if ARGV[4] == "1" then
+    quantity = quantity + old_quantity
+end
+if quantity < 0 then
+    quantity = 0
+end
+redis.call("HINCRBY", KEYS[1], "total", quantity * price - old_quantity * old_price)
+if quantity > 0 then
+    redis.call("HSET", KEYS[1], quantity_field, quantity, price_field, price)
+else
+    redis.call("HDEL", KEYS[1], quantity_field, price_field)
+end
+redis.call("EXPIRE", KEYS[1], ARGV[5])
+redis.call("ZADD", KEYS[2], ARGV[6], ARGV[7])
+local result = redis.call("HGETALL", KEYS[1])
+table.insert(result, 1, created)
+return result
+"""
+
+# KEYS: cart, touched index. ARGV: user id, touched before ("" for any).
+POP_SCRIPT = """
+if ARGV[2] ~= "" then
+    local touched = redis.call("ZSCORE", KEYS[2], ARGV[1])
+    if touched and tonumber(touched) > tonumber(ARGV[2]) then
+        return false
+    end
+end
+local cart = redis.call("HGETALL", KEYS[1])
+redis.call("DEL", KEYS[1])
+redis.call("ZREM", KEYS[2], ARGV[1])
+if #cart == 0 then
+    return false
+end
+return cart
+"""
+
+
+class RedisCartStore(LiveCartStore):
+    """
+    One hash per cart: "total" in cents plus "q:<line>" / "p:<line>" for the
+    quantity and unit price of each line. Updates are Lua scripts, so the
+    total never drifts from the lines. Carts are also indexed by the time they
+    were last touched, for the expiry.
+    """
+
+    key_prefix = "cart:"
+    touched_key = "cart:touched"
+
+    def __init__(self, url, expire_after=24 * 60 * 60):
+        super().__init__(expire_after=expire_after)
+        self.url = url
+        self.client = None
+        self.scripts = {}
+
+    def get_client(self):
+        if self.client is None:
+            import redis
+
+            self.client = redis.Redis.from_url(self.url, decode_responses=True)
+            self.scripts = {
+                "update_line": self.client.register_script(UPDATE_LINE_SCRIPT),
+                "pop": self.client.register_script(POP_SCRIPT),
+            }
+        return self.client
+
+    def get_key(self, user_id):
+        return f"{self.key_prefix}{user_id}"
+
+    def run_script(self, name, user_id, args):
+        self.get_client()
+        return self.scripts[name](
+            keys=[self.get_key(user_id), self.touched_key], args=args
+        )
+
+    def parse_state(self, fields):
+        values = dict(zip(fields[::2], fields[1::2]))
+        lines = {
+            field[2:]: (int(quantity), int(values[f"p:{field[2:]}"]))
+            for field, quantity in values.items()
+            if field.startswith("q:")
+        }
+        return {"lines": lines, "total": int(values.get("total", 0))}
+
+    def load(self, user_id):
+        fields = self.get_client().hgetall(self.get_key(user_id))
+        if not fields:
+            return None
+        return self.parse_state([item for pair in fields.items() for item in pair])
+
+    def update_line(self, user_id, key, quantity, unit_cents, relative):
+        result = self.run_script(
+            "update_line",
+            user_id,
+            [
+                key,
+                quantity,
+                unit_cents,
+                "1" if relative else "0",
+                # Kept well past expire_after, in case flushing falls behind
+                self.expire_after * 2,
+                time.time(),
+                user_id,
+            ],
+        )
+        return self.parse_state(result[1:]), bool(int(result[0]))
+
+    def pop(self, user_id, touched_before=None):
+        fields = self.run_script(
+            "pop", user_id, [user_id, "" if touched_before is None else touched_before]
+        )
+        if not fields:
+            return None
+        return self.parse_state(fields)
+
+    def get_expired_user_ids(self):
+        touched_before = time.time() - self.expire_after
+        return [
+            int(user_id)
+            for user_id in self.get_client().zrangebyscore(
+                self.touched_key, "-inf", touched_before
+            )
+        ]
+
+
+@functools.lru_cache(maxsize=None)
+def get_cart_store():
+    config = getattr(settings, "CART_STORE", {})
+    backend = import_string(
+        config.get("BACKEND", "order.cart_store.DatabaseCartStore")
+    )
+    return backend(**config.get("OPTIONS", {}))
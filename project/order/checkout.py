@@ -0,0 +1,132 @@
+"""Conversion of a user's cart into an Order"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+
+from restaurant.models import MenuItem, Modifier
+
+from shared.choices import StatusChoices
+
+from .cart_store import get_cart_store
+from .choices import OrderTypeChoices
+from .models import Order, OrderItem
+from .outbox import record_events
+
+
+def get_order_total_expression():
+    """Sum of price * quantity of the order items, computed by the database"""
+    line_totals = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(total=Sum(F("price") * F("quantity")))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(line_totals),
+        Value(Decimal("0.00")),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def get_unit_price(cart_item):
+    """Current price of a cart item, menu item price plus its modifier"""
+    price = cart_item.menu_item.price
+    if cart_item.modifier is not None:
+        price += cart_item.modifier.price
+    return price
+
+
+def attach_menu_objects(cart_items):
+    """
+    Set menu_item (with its category and restaurant) and modifier on the cart
+    items in two queries. Items whose menu item was deleted are dropped.
+    """
+    menu_items = MenuItem.objects.select_related("menu_category__restaurant").in_bulk(
+        {cart_item.menu_item_id for cart_item in cart_items}
+    )
+    modifiers = Modifier.objects.in_bulk(
+        {cart_item.modifier_id for cart_item in cart_items if cart_item.modifier_id}
+    )
+
+    attached = []
+    for cart_item in cart_items:
+        if cart_item.menu_item_id not in menu_items:
+            continue
+        cart_item.menu_item = menu_items[cart_item.menu_item_id]
+        cart_item.modifier = modifiers.get(cart_item.modifier_id)
+        attached.append(cart_item)
+    return attached
+
+
+def validate_cart_items(cart_items, order_type):
+    if not cart_items:
+        raise ValidationError("Cart is empty.")
+
+    restaurant = cart_items[0].menu_item.menu_category.restaurant
+    for cart_item in cart_items:
+        menu_item = cart_item.menu_item
+        if menu_item.menu_category.restaurant_id != restaurant.pk:
+            raise ValidationError("All cart items must be from the same restaurant.")
+        if not menu_item.is_available:
+            raise ValidationError(f"{menu_item.name} is not available anymore.")
+        modifier = cart_item.modifier
+        if modifier is not None and modifier.menu_item_id != menu_item.pk:
+            raise ValidationError(f"Invalid modifier for {menu_item.name}.")
+
+    if restaurant.status != StatusChoices.ACTIVE:
+        raise ValidationError("Restaurant is not accepting orders.")
+    if order_type == OrderTypeChoices.DELIVERY and not restaurant.delivery:
+        raise ValidationError("Restaurant does not deliver.")
+    if order_type == OrderTypeChoices.TAKEAWAY and not restaurant.takeaway:
+        raise ValidationError("Restaurant does not offer takeaway.")
+
+    return restaurant
+
+
+def checkout_cart(user, order_type, delivery_address=""):
+    """
+    Create an Order from the cart of the user in one transaction, with the same
+    number of queries whatever the size of the cart.
+    Items are re-priced against the current MenuItem/Modifier prices.
+    The cart is emptied once the order is saved and left untouched otherwise.
+    """
+    with get_cart_store().take(user.pk) as cart_items, transaction.atomic():
+        cart_items = attach_menu_objects(cart_items)
+        restaurant = validate_cart_items(cart_items, order_type)
+
+        order = Order.objects.create(
+            user=user,
+            restaurant=restaurant,
+            order_type=order_type,
+            delivery_address=delivery_address,
+        )
+
+        # bulk_create skips save(), so updated_at has to be stamped here
+        now = timezone.now()
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    menu_item=cart_item.menu_item,
+                    modifier=cart_item.modifier,
+                    quantity=cart_item.quantity,
+                    price=get_unit_price(cart_item),
+                    updated_at=now,
+                )
+                for cart_item in cart_items
+            ]
+        )
+
+        Order.objects.filter(pk=order.pk).update(
+            total_price=get_order_total_expression()
+        )
+        order.refresh_from_db(fields=["total_price"])
+        record_events([order], "updated", ["total_price"])
+
+    return order
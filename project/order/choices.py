@@ -32,3 +32,12 @@ class OrderStatusChoices(models.TextChoices):
 class OrderTypeChoices(models.TextChoices):
     DELIVERY = "DELIVERY", "Delivery"
     TAKEAWAY = "TAKEAWAY", "Takeaway"
+
+
+class OutboxEventTypeChoices(models.TextChoices):
+    ORDER_CREATED = "order.created", "Order created"
+    ORDER_UPDATED = "order.updated", "Order updated"
+    ORDER_DELETED = "order.deleted", "Order deleted"
+    PAYMENT_CREATED = "payment.created", "Payment created"
+    PAYMENT_UPDATED = "payment.updated", "Payment updated"
+    PAYMENT_DELETED = "payment.deleted", "Payment deleted"
@@ -0,0 +1,336 @@
+"""
+Batch assignment of couriers to delivery orders.
+
+Every run of dispatch() takes up to DISPATCH["BATCH_SIZE"] of the oldest delivery
+orders still waiting for a courier (PENDING, read through the partial index
+order_dispatch_queue_idx) whose restaurant has a located address, and the
+couriers with free capacity: active
+RestaurantStaff with the DELIVERY role, holding fewer than
+MAX_ORDERS_PER_COURIER undelivered orders. A courier with room for k more
+orders takes k columns of the matrix.
+
+The cost of a pair is the distance between the address of the order's
+restaurant (pickup) and the address of the courier's restaurant. Distances are
+computed once per pair of addresses, vectorized with numpy when installed.
+Pairs further apart than MAX_DISTANCE_KM are never matched.
+
+MATCHER picks the solver:
+
+- "greedy": closest pairs first, oldest order first on ties. Fast, and close to
+  optimal as long as couriers are not scarce.
+- "hungarian": minimum total distance with scipy's linear_sum_assignment
+  (scipy required).
+
+Assignments are written with one bulk UPDATE per batch (plus the history rows
+and outbox events), inside a transaction locking the batch and the couriers
+with SKIP LOCKED where the database supports it, so dispatchers can run side by
+side: a courier is only counted and assigned by the dispatcher holding its
+row, so concurrent batches never take a courier past MAX_ORDERS_PER_COURIER.
+Orders and couriers left out wait for the next run.
+
+dispatch_all() walks the queue with a (created_at, id) cursor, each batch
+starting after the last order of the previous one: orders no courier is in range
+of stay waiting without holding back the newer orders behind them.
+"""
+
+import math
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from simple_history.utils import bulk_update_with_history
+
+from restaurant.geo import EARTH_RADIUS_KM, haversine_km
+from restaurant.models import RestaurantAddress, RestaurantStaff
+from shared.choices import StaffRoleChoices, StatusChoices
+
+from .choices import DeliveryStatusChoices, OrderStatusChoices, OrderTypeChoices
+from .models import Order
+from .outbox import record_events
+
+try:
+    import numpy
+except ImportError:  # the cost matrix is built in pure Python then
+    numpy = None
+
+DISPATCH_DEFAULTS = {
+    "MATCHER": "greedy",
+    "BATCH_SIZE": 1000,
+    "MAX_DISTANCE_KM": 15.0,
+    "MAX_ORDERS_PER_COURIER": 1,
+}
+
+# Delivery statuses of the orders a courier still has to deliver
+ACTIVE_DELIVERY_STATUSES = [
+    DeliveryStatusChoices.PENDING,
+    DeliveryStatusChoices.OUT_FOR_DELIVERY,
+]
+
+
+def get_dispatch_settings():
+    return {**DISPATCH_DEFAULTS, **getattr(settings, "DISPATCH", {})}
+
+
+def get_waiting_orders(batch_size, after=None):
+    """
+    Oldest delivery orders without a courier and with a located restaurant,
+    after the (created_at, id) cursor, locked for the transaction
+    """
+    located = RestaurantAddress.objects.filter(
+        restaurant_id=OuterRef("restaurant_id"),
+        latitude__isnull=False,
+        longitude__isnull=False,
+    )
+    orders = Order.objects.filter(
+        Exists(located),
+        delivery_man__isnull=True,
+        delivery_status=DeliveryStatusChoices.PENDING,
+        order_status=OrderStatusChoices.PENDING,
+        order_type=OrderTypeChoices.DELIVERY,
+    )
+    if after is not None:
+        created_at, pk = after
+        orders = orders.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+    orders = orders.select_for_update(skip_locked=True).order_by("created_at", "id")
+    return list(orders[:batch_size])
+
+
+def get_restaurant_locations(restaurant_ids):
+    """{restaurant id: (latitude, longitude)} of the first located address"""
+    locations = {}
+    addresses = (
+        RestaurantAddress.objects.filter(
+            restaurant_id__in=restaurant_ids,
+            latitude__isnull=False,
+            longitude__isnull=False,
+        )
+        .order_by("restaurant_id", "id")
+        .values_list("restaurant_id", "latitude", "longitude")
+    )
+    for restaurant_id, latitude, longitude in addresses:
+        locations.setdefault(restaurant_id, (float(latitude), float(longitude)))
+    return locations
+
+
+def lock_couriers(user_ids):
+    """Ids of the couriers locked for the transaction, skipping locked ones"""
+    return set(
+        get_user_model()
+        .objects.filter(pk__in=user_ids)
+        .select_for_update(skip_locked=True)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def get_courier_slots(max_orders):
+    """[(courier id, restaurant id)], once per order each courier can still take"""
+    # A courier working for several restaurants starts from the default one
+    restaurants = {}
+    staff = (
+        RestaurantStaff.objects.filter(
+            role=StaffRoleChoices.DELIVERY,
+            status=StatusChoices.ACTIVE,
+            user__status=StatusChoices.ACTIVE,
+        )
+        .order_by("user_id", "-is_default", "id")
+        .values_list("user_id", "restaurant_id")
+    )
+    for user_id, restaurant_id in staff:
+        restaurants.setdefault(user_id, restaurant_id)
+
+    # Loads are read once the couriers are locked, so they include the orders
+    # committed by a dispatcher that held them before
+    locked = lock_couriers(restaurants)
+    restaurants = {
+        user_id: restaurant_id
+        for user_id, restaurant_id in restaurants.items()
+        if user_id in locked
+    }
+    loads = dict(
+        Order.objects.filter(
+            delivery_man__in=restaurants,
+            delivery_status__in=ACTIVE_DELIVERY_STATUSES,
+            order_status=OrderStatusChoices.PENDING,
+        )
+        .values("delivery_man")
+        .annotate(count=Count("id"))
+        .values_list("delivery_man", "count")
+    )
+    return [
+        (user_id, restaurant_id)
+        for user_id, restaurant_id in restaurants.items()
+        for _ in range(max_orders - loads.get(user_id, 0))
+    ]
+
+
+def get_distance_matrix(origins, destinations):
+    """Haversine distances in km, origins x destinations"""
+    if numpy is not None:
+        origins = numpy.radians(numpy.array(origins, dtype=float).reshape(-1, 2))
+        destinations = numpy.radians(
+            numpy.array(destinations, dtype=float).reshape(-1, 2)
+        )
+        lat1, lng1 = origins[:, 0, None], origins[:, 1, None]
+        lat2, lng2 = destinations[None, :, 0], destinations[None, :, 1]
+        a = (
+            numpy.sin((lat2 - lat1) / 2) ** 2
+            + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lng2 - lng1) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0, 1)))
+
+    return [
+        [haversine_km(*origin, *destination) for destination in destinations]
+        for origin in origins
+    ]
+
+
+def get_cost_matrix(order_locations, slot_locations):
+    """
+    Orders x courier slots distances. Both lists hold the (latitude, longitude)
+    of few distinct addresses, so distances are computed per unique pair.
+    """
+    origins = {
+        location: index for index, location in enumerate(dict.fromkeys(order_locations))
+    }
+    destinations = {
+        location: index for index, location in enumerate(dict.fromkeys(slot_locations))
+    }
+    rows = [origins[location] for location in order_locations]
+    columns = [destinations[location] for location in slot_locations]
+    distances = get_distance_matrix(list(origins), list(destinations))
+
+    if numpy is not None:
+        return distances[numpy.ix_(rows, columns)]
+    return [[distances[row][column] for column in columns] for row in rows]
+
+
+def match_greedy(costs, max_cost):
+    """[(row, column)], repeatedly taking the cheapest pair still free"""
+    if numpy is not None:
+        costs = numpy.asarray(costs)
+        rows, columns = numpy.nonzero(costs <= max_cost)
+        # Stable, so ties go to the oldest order (lowest row)
+        by_cost = numpy.argsort(costs[rows, columns], kind="stable")
+        candidates = zip(rows[by_cost].tolist(), columns[by_cost].tolist())
+    else:
+        candidates = sorted(
+            (cost, row, column)
+            for row, row_costs in enumerate(costs)
+            for column, cost in enumerate(row_costs)
+            if cost <= max_cost
+        )
+        candidates = ((row, column) for _, row, column in candidates)
+
+    row_count = len(costs)
+    column_count = len(costs[0]) if row_count else 0
+    pair_limit = min(row_count, column_count)
+    matched_rows, matched_columns, pairs = set(), set(), []
+    for row, column in candidates:
+        if row in matched_rows or column in matched_columns:
+            continue
+        matched_rows.add(row)
+        matched_columns.add(column)
+        pairs.append((row, column))
+        if len(pairs) == pair_limit:
+            break
+    return pairs
+
+
+def match_hungarian(costs, max_cost):
+    """[(row, column)] of the minimum total cost assignment"""
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        raise ImproperlyConfigured('DISPATCH["MATCHER"] "hungarian" requires scipy.')
+
+    costs = numpy.asarray(costs, dtype=float)
+    feasible = costs <= max_cost
+    # Out of range pairs are allowed in the solve but never kept
+    penalty = (costs[feasible].sum() + 1) * 2
+    rows, columns = linear_sum_assignment(numpy.where(feasible, costs, penalty))
+    return [
+        (row, column)
+        for row, column in zip(rows.tolist(), columns.tolist())
+        if feasible[row, column]
+    ]
+
+
+MATCHERS = {"greedy": match_greedy, "hungarian": match_hungarian}
+
+
+def dispatch(batch_size=None, matcher=None, after=None):
+    """
+    Assign couriers to one batch of waiting orders, after the (created_at, id)
+    cursor. Returns the batch stats, with the cursor of its last order.
+    """
+    config = get_dispatch_settings()
+    batch_size = batch_size or config["BATCH_SIZE"]
+    match = MATCHERS[matcher or config["MATCHER"]]
+    stats = {"orders": 0, "couriers": 0, "assigned": 0, "last": None}
+
+    with transaction.atomic():
+        orders = get_waiting_orders(batch_size, after)
+        slots = get_courier_slots(config["MAX_ORDERS_PER_COURIER"]) if orders else []
+        stats["orders"] = len(orders)
+        stats["couriers"] = len({courier_id for courier_id, _ in slots})
+        if orders:
+            stats["last"] = (orders[-1].created_at, orders[-1].id)
+
+        locations = get_restaurant_locations(
+            {order.restaurant_id for order in orders}
+            | {restaurant_id for _, restaurant_id in slots}
+        )
+        slots = [slot for slot in slots if slot[1] in locations]
+        if not orders or not slots:
+            return stats
+
+        costs = get_cost_matrix(
+            [locations[order.restaurant_id] for order in orders],
+            [locations[restaurant_id] for _, restaurant_id in slots],
+        )
+        max_cost = config["MAX_DISTANCE_KM"]
+        if max_cost is None:
+            max_cost = math.inf
+
+        now = timezone.now()
+        assigned = []
+        for row, column in match(costs, max_cost):
+            order = orders[row]
+            order.delivery_man_id = slots[column][0]
+            order.updated_at = now
+            assigned.append(order)
+
+        if assigned:
+            bulk_update_with_history(
+                assigned,
+                Order,
+                ["delivery_man", "updated_at"],
+                batch_size=500,
+                default_date=now,
+            )
+            record_events(assigned, "updated", ["delivery_man"])
+        stats["assigned"] = len(assigned)
+    return stats
+
+
+def dispatch_all(batch_size=None, matcher=None):
+    """Dispatch batches through the whole queue, or until no courier is free"""
+    batch_size = batch_size or get_dispatch_settings()["BATCH_SIZE"]
+    totals = {"batches": 0, "assigned": 0}
+    after = None
+    while True:
+        stats = dispatch(batch_size, matcher, after)
+        totals["batches"] += 1
+        totals["assigned"] += stats["assigned"]
+        # A short batch was the end of the queue
+        if stats["orders"] < batch_size or not stats["couriers"]:
+            return totals
+        # Past the orders left unmatched, they wait for the next run
+        after = stats["last"]
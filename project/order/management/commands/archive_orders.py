@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from order.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move terminal orders older than the archive age, with their items, "
+        "payment and history, to the archive. Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age-days", type=int, default=None)
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--max-chunks",
+            type=int,
+            default=None,
+            help="Stop after that many chunks, the next run continues.",
+        )
+
+    def handle(self, *args, **options):
+        count = archive_orders(
+            options["min_age_days"], options["chunk_size"], options["max_chunks"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"{count} orders archived."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from order.outbox import compact_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the outbox events acknowledged by every consumer and older "
+        "than the retention."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-hours", type=float, default=None)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = compact_outbox(options["retention_hours"], options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"{count} outbox events deleted."))
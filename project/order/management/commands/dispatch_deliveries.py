@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.dispatch import MATCHERS, dispatch_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Assign couriers to the delivery orders waiting for one, in batches. "
+        "Runs once, or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--matcher", choices=sorted(MATCHERS), default=None)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Keep dispatching, waiting that many seconds between runs.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            totals = dispatch_all(options["batch_size"], options["matcher"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{totals['assigned']} orders assigned in {totals['batches']} "
+                    f"batches ({time.perf_counter() - started:.2f}s)."
+                )
+            )
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from order.cart_store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Persist the carts idle for longer than the expiry of the cart store "
+        "as Cart/CartItem rows and evict them from the store."
+    )
+
+    def handle(self, *args, **options):
+        count = get_cart_store().flush_expired()
+        self.stdout.write(self.style.SUCCESS(f"{count} expired carts persisted."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from order.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating aggregates of restaurants and menu items from scratch."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS("Rating aggregates rebuilt."))
@@ -0,0 +1,30 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from order.sales import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily and hourly sales rollups from the orders, for all "
+        "or some restaurants, optionally from a date on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, action="append", dest="ids")
+        parser.add_argument(
+            "--since",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="First day to rebuild, YYYY-MM-DD.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_sales_rollups(
+                options["ids"], options["since"], batch_size=options["batch_size"]
+            )
+        self.stdout.write(self.style.SUCCESS("Sales rollups rebuilt."))
@@ -0,0 +1,40 @@
+# Generated by Django 5.1 on 2026-10-18 13:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0001_initial'),
+        ('restaurant', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerfeedback',
+            index=models.Index(fields=['created_at', 'id'], name='feedback_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerfeedback',
+            index=models.Index(fields=['customer', 'created_at', 'id'], name='feedback_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerfeedback',
+            index=models.Index(fields=['restaurant', 'created_at', 'id'], name='feedback_rest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['created_at', 'id'], name='payment_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_keyset_pagination_indexes'),
+        ('restaurant', '0002_restaurantaddress_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cartitem',
+            name='menu_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='restaurant.menuitem'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='menu_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='restaurant.menuitem'),
+        ),
+    ]
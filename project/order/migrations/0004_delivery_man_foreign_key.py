@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 13:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0003_menu_item_foreign_keys'),
+        ('restaurant', '0005_open_hours'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='delivery_man',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deliveries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('delivery_man__isnull', True), ('delivery_status', 'PENDING'), ('order_status', 'PENDING'), ('order_type', 'DELIVERY')), fields=['created_at', 'id'], name='order_dispatch_queue_idx'),
+        ),
+    ]
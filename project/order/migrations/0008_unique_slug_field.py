@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-18 13:54
+
+import shared.slugs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0007_archived_order'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerfeedback',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='title', unique=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
+
+
+def backfill_order_types(apps, schema_editor):
+    # The order detail archived with every order holds its order_type
+    ArchivedOrder = apps.get_model("order", "ArchivedOrder")
+    ArchivedOrder.objects.using(schema_editor.connection.alias).filter(
+        data__detail__order_type__isnull=False
+    ).update(order_type=KeyTextTransform("order_type", KeyTransform("detail", "data")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_unique_slug_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorder',
+            name='order_type',
+            field=models.CharField(choices=[('DELIVERY', 'Delivery'), ('TAKEAWAY', 'Takeaway')], default='DELIVERY', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            backfill_order_types,
+            migrations.RunPython.noop,
+            hints={"model_name": "archivedorder"},
+        ),
+    ]
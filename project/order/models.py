@@ -1,20 +1,29 @@
 from decimal import Decimal
 
-from autoslug import AutoSlugField
-
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-from simple_history.models import HistoricalRecords
-
+from shared.history import BufferedHistoricalRecords
 from shared.models import BaseModelWithUID
+from shared.slugs import UniqueSlugField
 
 from .choices import *
 
 User = get_user_model()
 
 
-class Order(BaseModelWithUID):
+class OutboxModelMixin:
+    """Saves in a transaction, which the outbox event of the change joins"""
+
+    def save(self, *args, **kwargs):
+        # No savepoint: the event is written by post_save, see order.outbox
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Order(OutboxModelMixin, BaseModelWithUID):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     restaurant = models.ForeignKey(
         "restaurant.Restaurant", on_delete=models.CASCADE, related_name="orders"
@@ -40,11 +49,37 @@ class Order(BaseModelWithUID):
         db_index=True,
         default=OrderTypeChoices.DELIVERY,
     )
-    delivery_man = models.OneToOneField(User, on_delete=models.SET_NULL, null=True)
+    delivery_man = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="deliveries",
+    )
     delivery_address = models.CharField(max_length=255)
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
+
+    class Meta:
+        # Composite indexes backing the keyset pagination on (created_at, id)
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            models.Index(
+                fields=["user", "created_at", "id"], name="order_user_created_id_idx"
+            ),
+            # Queue of delivery orders waiting for a courier, see order.dispatch
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(
+                    delivery_man__isnull=True,
+                    delivery_status=DeliveryStatusChoices.PENDING,
+                    order_status=OrderStatusChoices.PENDING,
+                    order_type=OrderTypeChoices.DELIVERY,
+                ),
+                name="order_dispatch_queue_idx",
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -56,7 +91,9 @@ class OrderItem(BaseModelWithUID):
     order = models.ForeignKey(
         Order, on_delete=models.CASCADE, related_name="order_items"
     )
-    menu_item = models.OneToOneField("restaurant.MenuItem", on_delete=models.CASCADE)
+    menu_item = models.ForeignKey(
+        "restaurant.MenuItem", on_delete=models.CASCADE, related_name="order_items"
+    )
     modifier = models.ForeignKey(
         "restaurant.Modifier",
         on_delete=models.SET_NULL,
@@ -80,7 +117,9 @@ class Cart(BaseModelWithUID):
 
 class CartItem(BaseModelWithUID):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="cart_items")
-    menu_item = models.OneToOneField("restaurant.MenuItem", on_delete=models.CASCADE)
+    menu_item = models.ForeignKey(
+        "restaurant.MenuItem", on_delete=models.CASCADE, related_name="cart_items"
+    )
     modifier = models.ForeignKey(
         "restaurant.Modifier",
         on_delete=models.SET_NULL,
@@ -95,7 +134,7 @@ class CartItem(BaseModelWithUID):
         return f"{self.menu_item.name} (x{self.quantity})"
 
 
-class Payment(BaseModelWithUID):
+class Payment(OutboxModelMixin, BaseModelWithUID):
     order = models.OneToOneField(Order, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(
@@ -109,7 +148,12 @@ class Payment(BaseModelWithUID):
     )
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="payment_created_id_idx"),
+        ]
 
     def __str__(self):
         return f"Payment for order uid - {self.order.uid}"
@@ -117,7 +161,7 @@ class Payment(BaseModelWithUID):
 
 # Model for storing the feedback of customers on various aspects
 class CustomerFeedback(BaseModelWithUID):
-    slug = AutoSlugField(populate_from="title", unique=True, always_update=False)
+    slug = UniqueSlugField(populate_from="title", unique=True, always_update=False)
     title = models.CharField(max_length=30)
     customer = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="feedbacks"
@@ -142,5 +186,124 @@ class CustomerFeedback(BaseModelWithUID):
     rating = models.PositiveIntegerField(null=True, blank=True)
     comment = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="feedback_created_id_idx"),
+            models.Index(
+                fields=["customer", "created_at", "id"],
+                name="feedback_customer_created_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "created_at", "id"],
+                name="feedback_rest_created_idx",
+            ),
+        ]
+
+    def __str__(self):
+        subject = self.menu_item or self.restaurant
+        return f"Feedback from {self.customer.get_name()} on {subject}"
+
+
+class OutboxEvent(models.Model):
+    """Committed change of an Order or Payment, read in id order by consumers"""
+
+    event_type = models.CharField(max_length=50, choices=OutboxEventTypeChoices.choices)
+    aggregate_uid = models.UUIDField()
+    # Snapshot of the row after the change (before it, on delete)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    changed_fields = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.pk} {self.event_type} {self.aggregate_uid}"
+
+
+class OutboxConsumer(models.Model):
+    """High-water mark of a reader of the outbox"""
+
+    name = models.CharField(max_length=100, unique=True)
+    # Id of the last event the consumer acknowledged
+    position = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at {self.position}"
+
+
+class SalesRollup(models.Model):
+    """Terminal orders of a restaurant in a period, see order.sales"""
+
+    # Indexed first by the unique key of the rollup
+    restaurant = models.ForeignKey(
+        "restaurant.Restaurant",
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+    )
+    order_type = models.CharField(max_length=50, choices=OrderTypeChoices.choices)
+    order_status = models.CharField(max_length=50, choices=OrderStatusChoices.choices)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
+    )
+
+    class Meta:
+        abstract = True
+
+
+class DailySalesRollup(SalesRollup):
+    # Day of the orders' created_at, in TIME_ZONE
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "date", "order_type", "order_status"],
+                name="daily_sales_rollup_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} {self.date} {self.order_type} {self.order_status}"
+
+
+class HourlySalesRollup(SalesRollup):
+    # Start of the hour of the orders' created_at
+    hour = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "hour", "order_type", "order_status"],
+                name="hourly_sales_rollup_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant_id} {self.hour} {self.order_type} {self.order_status}"
+
+
+class ArchivedOrder(models.Model):
+    """Terminal order moved out of the hot tables, see order.archive"""
+
+    uid = models.UUIDField(unique=True)
+    # No foreign keys: the archive can live in another database
+    user_id = models.BigIntegerField()
+    restaurant_id = models.BigIntegerField()
+    order_status = models.CharField(max_length=50, choices=OrderStatusChoices.choices)
+    order_type = models.CharField(max_length=50, choices=OrderTypeChoices.choices)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    # Order detail as served when archived, payment and history rows
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user_id", "created_at"], name="archived_order_user_idx"
+            ),
+        ]
+
     def __str__(self):
-        return f"Feedback from {self.user.get_name()} on {self.menu_item.name}"
+        return f"Archived order uid - {self.uid}"
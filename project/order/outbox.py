@@ -0,0 +1,195 @@
+"""
+Transactional outbox of Order and Payment changes.
+
+Every create, update and delete of an Order or Payment inserts an OutboxEvent
+in the transaction of the change: saves of both models are atomic
+(OutboxModelMixin) and the event is written from their post_save / post_delete
+signals, so an event exists exactly when its change was committed. Bulk writes
+skipping save() (dispatch, checkout totals) call record_events themselves.
+
+Consumers read the events in id order through OutboxReader, which keeps the id
+of the last acknowledged event per consumer name in OutboxConsumer:
+
+    reader = OutboxReader("kitchen-display")
+    for events in reader.batches():
+        forward(events)  # acknowledged when the next batch is requested
+
+Delivery is at least once: a consumer stopping before its acknowledgement gets
+the batch again. Ids are allocated at insert, not at commit, so on PostgreSQL a
+transaction still running can commit an id lower than one already read;
+readers stop each batch at the first event younger than
+OUTBOX["SETTLE_SECONDS"] to make that window harmless for any transaction
+shorter than it. Events are stamped before their transaction commits, so a low
+id still settling holds back the higher ids behind it.
+
+compact_outbox() deletes the events every consumer acknowledged, once older
+than OUTBOX["RETENTION_HOURS"]. A consumer that is gone holds compaction back
+until its OutboxConsumer row is deleted.
+"""
+
+import datetime
+import time
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from .choices import OutboxEventTypeChoices
+from .models import Order, OutboxConsumer, OutboxEvent, Payment
+
+OUTBOX_DEFAULTS = {
+    "BATCH_SIZE": 500,
+    "SETTLE_SECONDS": 2,
+    "RETENTION_HOURS": 24,
+}
+
+ORDER_PAYLOAD_FIELDS = (
+    "id",
+    "uid",
+    "user_id",
+    "restaurant_id",
+    "order_status",
+    "delivery_status",
+    "order_type",
+    "total_price",
+    "delivery_man_id",
+    "delivery_address",
+    "created_at",
+    "updated_at",
+)
+PAYMENT_PAYLOAD_FIELDS = (
+    "id",
+    "uid",
+    "order_id",
+    "amount",
+    "payment_method",
+    "payment_status",
+    "created_at",
+    "updated_at",
+)
+
+# model: (payload fields, {action: event type})
+OUTBOX_MODELS = {
+    Order: (
+        ORDER_PAYLOAD_FIELDS,
+        {
+            "created": OutboxEventTypeChoices.ORDER_CREATED,
+            "updated": OutboxEventTypeChoices.ORDER_UPDATED,
+            "deleted": OutboxEventTypeChoices.ORDER_DELETED,
+        },
+    ),
+    Payment: (
+        PAYMENT_PAYLOAD_FIELDS,
+        {
+            "created": OutboxEventTypeChoices.PAYMENT_CREATED,
+            "updated": OutboxEventTypeChoices.PAYMENT_UPDATED,
+            "deleted": OutboxEventTypeChoices.PAYMENT_DELETED,
+        },
+    ),
+}
+
+# Stamped on every save, not a change of its own
+IGNORED_FIELDS = {"updated_at"}
+
+
+def get_outbox_settings():
+    return {**OUTBOX_DEFAULTS, **getattr(settings, "OUTBOX", {})}
+
+
+def get_changed_fields(instance):
+    """Names of the fields changed since the instance was loaded, before saving"""
+    dirty_fields = instance.get_dirty_fields(check_relationship=True)
+    return sorted(name for name in dirty_fields if name not in IGNORED_FIELDS)
+
+
+def get_payload(instance):
+    fields, _ = OUTBOX_MODELS[type(instance)]
+    return {field: getattr(instance, field) for field in fields}
+
+
+def build_event(instance, action, changed_fields=()):
+    _, event_types = OUTBOX_MODELS[type(instance)]
+    return OutboxEvent(
+        event_type=event_types[action],
+        aggregate_uid=instance.uid,
+        payload=get_payload(instance),
+        changed_fields=list(changed_fields),
+    )
+
+
+def record_events(instances, action, changed_fields=()):
+    """Write the events of instances, in the transaction of the caller"""
+    return OutboxEvent.objects.bulk_create(
+        [build_event(instance, action, changed_fields) for instance in instances]
+    )
+
+
+class OutboxReader:
+    def __init__(self, consumer, batch_size=None):
+        config = get_outbox_settings()
+        self.consumer = consumer
+        self.batch_size = batch_size or config["BATCH_SIZE"]
+        self.settle_seconds = config["SETTLE_SECONDS"]
+
+    def get_position(self):
+        consumer, _ = OutboxConsumer.objects.get_or_create(name=self.consumer)
+        return consumer.position
+
+    def read(self, position=None):
+        """Next batch of settled events after position (the acknowledged one)"""
+        if position is None:
+            position = self.get_position()
+        settled = timezone.now() - datetime.timedelta(seconds=self.settle_seconds)
+        events = OutboxEvent.objects.filter(id__gt=position).order_by("id")
+        # Cut at the first unsettled event: reading on past it would move the
+        # position beyond an id its transaction may still commit
+        batch = []
+        for event in events[: self.batch_size]:
+            if event.created_at > settled:
+                break
+            batch.append(event)
+        return batch
+
+    def acknowledge(self, event_id):
+        """Move the high-water mark forward to event_id, never back"""
+        OutboxConsumer.objects.filter(
+            name=self.consumer, position__lt=event_id
+        ).update(position=event_id, updated_at=timezone.now())
+
+    def batches(self, poll_interval=None):
+        """
+        Yield batches of events, acknowledging each one when the next is
+        requested. Stops once caught up, or polls every poll_interval seconds.
+        """
+        position = self.get_position()
+        while True:
+            events = self.read(position)
+            if not events:
+                if poll_interval is None:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            yield events
+            position = events[-1].id
+            self.acknowledge(position)
+
+
+def compact_outbox(retention_hours=None, chunk_size=5000):
+    """Delete the events acknowledged by every consumer. Returns the count."""
+    if retention_hours is None:
+        retention_hours = get_outbox_settings()["RETENTION_HOURS"]
+    delivered = OutboxConsumer.objects.aggregate(position=Min("position"))["position"]
+    if not delivered:
+        return 0
+
+    cutoff = timezone.now() - datetime.timedelta(hours=retention_hours)
+    events = OutboxEvent.objects.filter(id__lte=delivered, created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        # Short deletes by primary key range, so writers are never held long
+        ids = list(events.order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        count, _ = OutboxEvent.objects.filter(id__gte=ids[0], id__lte=ids[-1]).delete()
+        deleted += count
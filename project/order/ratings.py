@@ -0,0 +1,125 @@
+"""
+Incremental maintenance of the rating aggregates of Restaurant and MenuItem.
+
+Every CustomerFeedback create/update/delete applies a delta to rating_count
+and rating_sum with a single UPDATE ... SET x = x + delta, which also derives
+rating_average, so "top rated" lists only read an indexed column.
+
+A full save() of a Restaurant or MenuItem loaded before such an UPDATE would
+write its stale aggregates back, so they are reloaded from the row just
+before it is saved.
+"""
+
+from django.db.models import (
+    Count,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from restaurant.models import RATING_FIELDS, MenuItem, Restaurant
+
+from .models import CustomerFeedback
+
+# Target model of the aggregates -> foreign key of CustomerFeedback pointing to it
+RATED_MODELS = {Restaurant: "restaurant", MenuItem: "menu_item"}
+
+
+def get_average_expression(count, total):
+    return Coalesce(
+        Cast(total, FloatField()) / NullIf(count, Value(0)),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_delta(model, pk, count_delta, sum_delta):
+    if pk is None or (count_delta == 0 and sum_delta == 0):
+        return
+    count = F("rating_count") + count_delta
+    total = F("rating_sum") + sum_delta
+    model.objects.filter(pk=pk).update(
+        rating_count=count,
+        rating_sum=total,
+        rating_average=get_average_expression(count, total),
+    )
+
+
+def refresh_rating_aggregates(instance, update_fields=None, using=None):
+    """Load the saved aggregates into an instance about to be saved"""
+    if instance._state.adding or update_fields is not None:
+        # Nothing saved yet, or only the fields the caller asked for
+        return
+    deferred = instance.get_deferred_fields()
+    fields = [field for field in RATING_FIELDS if field not in deferred]
+    if not fields:
+        return
+    saved = (
+        type(instance)
+        ._base_manager.using(using or instance._state.db)
+        .filter(pk=instance.pk)
+        .values(*fields)
+        .first()
+    )
+    # A deleted row is inserted again with the values of the instance
+    if saved is not None:
+        for field, value in saved.items():
+            setattr(instance, field, value)
+
+
+def get_rating_contributions(targets, rating):
+    """{(model, pk): rating} a feedback contributes to the aggregates"""
+    if rating is None:
+        return {}
+    return {
+        (model, pk): rating
+        for model, pk in zip(RATED_MODELS, targets)
+        if pk is not None
+    }
+
+
+def get_feedback_targets(feedback):
+    return tuple(
+        getattr(feedback, f"{field}_id") for field in RATED_MODELS.values()
+    )
+
+
+def update_ratings(old_contributions, new_contributions):
+    for key in old_contributions.keys() | new_contributions.keys():
+        old_rating = old_contributions.get(key)
+        new_rating = new_contributions.get(key)
+        model, pk = key
+        apply_rating_delta(
+            model,
+            pk,
+            count_delta=(new_rating is not None) - (old_rating is not None),
+            sum_delta=(new_rating or 0) - (old_rating or 0),
+        )
+
+
+def rebuild_ratings():
+    """Recompute all the aggregates from the feedback table, one UPDATE per model"""
+    for model, field in RATED_MODELS.items():
+        rated = CustomerFeedback.objects.filter(
+            **{field: OuterRef("pk")}, rating__isnull=False
+        ).values(field)
+        count = Coalesce(
+            Subquery(rated.annotate(count=Count("pk")).values("count")),
+            Value(0),
+            output_field=IntegerField(),
+        )
+        total = Coalesce(
+            Subquery(rated.annotate(total=Sum("rating")).values("total")),
+            Value(0),
+            output_field=IntegerField(),
+        )
+        model.objects.update(
+            rating_count=count,
+            rating_sum=total,
+            rating_average=get_average_expression(count, total),
+        )
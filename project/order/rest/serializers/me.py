@@ -0,0 +1,167 @@
+from rest_framework import serializers
+
+from restaurant.models import MenuItem, Modifier
+
+from ...checkout import get_unit_price
+from ...choices import OrderTypeChoices
+from ...models import CartItem, CustomerFeedback, Order, OrderItem, Payment
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    menu_item_uid = serializers.UUIDField(source="menu_item.uid", read_only=True)
+    menu_item_name = serializers.CharField(source="menu_item.name", read_only=True)
+    modifier_name = serializers.CharField(
+        source="modifier.name", read_only=True, default=None
+    )
+
+    class Meta:
+        model = OrderItem
+        fields = [
+            "uid",
+            "menu_item_uid",
+            "menu_item_name",
+            "modifier_name",
+            "quantity",
+            "price",
+        ]
+
+
+class UserOrderListSerializer(serializers.ModelSerializer):
+    restaurant_name = serializers.CharField(source="restaurant.name", read_only=True)
+    restaurant_slug = serializers.CharField(source="restaurant.slug", read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "uid",
+            "restaurant_name",
+            "restaurant_slug",
+            "total_price",
+            "delivery_status",
+            "order_status",
+            "order_type",
+            "delivery_address",
+            "created_at",
+        ]
+
+
+class UserOrderDetailSerializer(UserOrderListSerializer):
+    order_items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta(UserOrderListSerializer.Meta):
+        fields = UserOrderListSerializer.Meta.fields + ["order_items"]
+
+
+class UserPaymentSerializer(serializers.ModelSerializer):
+    order_uid = serializers.UUIDField(source="order.uid", read_only=True)
+
+    class Meta:
+        model = Payment
+        fields = [
+            "uid",
+            "order_uid",
+            "amount",
+            "payment_method",
+            "payment_status",
+            "created_at",
+        ]
+
+
+class UserFeedbackSerializer(serializers.ModelSerializer):
+    restaurant_name = serializers.CharField(
+        source="restaurant.name", read_only=True, default=None
+    )
+    menu_item_name = serializers.CharField(
+        source="menu_item.name", read_only=True, default=None
+    )
+
+    class Meta:
+        model = CustomerFeedback
+        fields = [
+            "uid",
+            "slug",
+            "title",
+            "restaurant_name",
+            "menu_item_name",
+            "rating",
+            "comment",
+            "created_at",
+        ]
+
+
+class CheckoutSerializer(serializers.Serializer):
+    order_type = serializers.ChoiceField(
+        choices=OrderTypeChoices.choices, default=OrderTypeChoices.DELIVERY
+    )
+    delivery_address = serializers.CharField(
+        max_length=255, allow_blank=True, required=False
+    )
+
+    def validate(self, data):
+        # Fall back to the address of the user for deliveries
+        if data["order_type"] == OrderTypeChoices.DELIVERY:
+            user = self.context["request"].user
+            address = data.get("delivery_address") or user.address
+            if not address:
+                raise serializers.ValidationError(
+                    {"delivery_address": "Delivery address is required."}
+                )
+            data["delivery_address"] = address[:255]
+        return data
+
+
+class CartItemWriteSerializer(serializers.Serializer):
+    menu_item = serializers.SlugRelatedField(
+        slug_field="uid", queryset=MenuItem.objects.all()
+    )
+    modifier = serializers.SlugRelatedField(
+        slug_field="uid",
+        queryset=Modifier.objects.all(),
+        required=False,
+        allow_null=True,
+    )
+    quantity = serializers.IntegerField(min_value=1, max_value=99, default=1)
+
+    def validate(self, data):
+        menu_item = data["menu_item"]
+        modifier = data.get("modifier")
+        if modifier is not None and modifier.menu_item_id != menu_item.pk:
+            raise serializers.ValidationError(
+                {"modifier": f"Invalid modifier for {menu_item.name}."}
+            )
+        if not menu_item.is_available and data["quantity"]:
+            raise serializers.ValidationError(
+                {"menu_item": f"{menu_item.name} is not available."}
+            )
+        data["modifier"] = modifier
+        data["unit_price"] = get_unit_price(
+            CartItem(menu_item=menu_item, modifier=modifier)
+        )
+        return data
+
+
+class CartItemQuantitySerializer(CartItemWriteSerializer):
+    """Setting the quantity to 0 removes the item"""
+
+    quantity = serializers.IntegerField(min_value=0, max_value=99)
+
+
+class CartLineSerializer(serializers.Serializer):
+    menu_item_uid = serializers.UUIDField(source="menu_item.uid")
+    menu_item_name = serializers.CharField(source="menu_item.name")
+    modifier_uid = serializers.UUIDField(source="modifier.uid", default=None)
+    modifier_name = serializers.CharField(source="modifier.name", default=None)
+    quantity = serializers.IntegerField()
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class CartSerializer(serializers.Serializer):
+    items = CartLineSerializer(many=True)
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+    item_count = serializers.IntegerField()
+
+
+class OrderStreamTokenSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    expires_in = serializers.IntegerField(help_text="Seconds")
@@ -0,0 +1,63 @@
+import datetime
+
+from django.utils import timezone
+
+from rest_framework import serializers
+
+from ...choices import OrderTypeChoices
+
+# Longest range of a report, in days, per grain
+MAX_REPORT_DAYS = {"day": 366, "hour": 31}
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False, help_text="Defaults to 30 days ago")
+    end = serializers.DateField(required=False, help_text="Defaults to today")
+    grain = serializers.ChoiceField(choices=list(MAX_REPORT_DAYS), default="day")
+    order_type = serializers.ChoiceField(
+        choices=OrderTypeChoices.choices, required=False
+    )
+
+    def validate(self, data):
+        data.setdefault("end", timezone.localdate())
+        data.setdefault("start", data["end"] - datetime.timedelta(days=29))
+        if data["start"] > data["end"]:
+            raise serializers.ValidationError("start must be before end.")
+        days = (data["end"] - data["start"]).days + 1
+        if days > MAX_REPORT_DAYS[data["grain"]]:
+            raise serializers.ValidationError(
+                f"Reports per {data['grain']} cover at most "
+                f"{MAX_REPORT_DAYS[data['grain']]} days."
+            )
+        return data
+
+
+class SalesSplitSerializer(serializers.Serializer):
+    order_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesSummarySerializer(serializers.Serializer):
+    order_count = serializers.IntegerField()
+    completed_order_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    average_basket = serializers.DecimalField(max_digits=14, decimal_places=2)
+    by_order_type = serializers.DictField(child=SalesSplitSerializer())
+    by_order_status = serializers.DictField(child=SalesSplitSerializer())
+
+
+class SalesPeriodSerializer(SalesSummarySerializer):
+    # A date for daily reports, the start of the hour for hourly ones
+    period = serializers.SerializerMethodField()
+
+    def get_period(self, data) -> str:
+        return data["period"].isoformat()
+
+
+class SalesReportSerializer(serializers.Serializer):
+    restaurant_slug = serializers.CharField()
+    grain = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    totals = SalesSummarySerializer()
+    periods = SalesPeriodSerializer(many=True)
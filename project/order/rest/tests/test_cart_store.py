@@ -0,0 +1,266 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from order.cart_store import (
+    DatabaseCartStore,
+    LocMemCartStore,
+    get_cart_store,
+    get_line_key,
+)
+from order.models import Cart, CartItem
+from restaurant.models import Modifier
+from shared.tests.factories import make_client, make_menu_item, make_user
+
+
+class CartStoreTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        # Hashing the password is the slowest part of the setup
+        cls.user = make_user()
+
+    def setUp(self):
+        self.burger = make_menu_item(name="Burger", price="5.00")
+        self.cheese = Modifier.objects.create(
+            name="Cheese", menu_item=self.burger, price=1
+        )
+        self.store = self.make_store()
+
+    def add(self, quantity, modifier=None, price="5.00"):
+        return self.store.add_item(
+            self.user.pk, self.burger.pk, modifier, quantity, Decimal(price)
+        )
+
+    def set(self, quantity, modifier=None, price="5.00"):
+        return self.store.set_quantity(
+            self.user.pk, self.burger.pk, modifier, quantity, Decimal(price)
+        )
+
+    def test_add_and_set_quantity(self):
+        self.add(2)
+        cart = self.add(1, self.cheese.pk, "6.00")
+        self.assertEqual(cart["item_count"], 3)
+        self.assertEqual(cart["total"], Decimal("16.00"))
+
+        cart = self.add(2)
+        self.assertEqual(cart["items"][0]["quantity"], 4)
+        self.assertEqual(cart["total"], Decimal("26.00"))
+
+        cart = self.set(1, price="4.50")
+        self.assertEqual(cart["items"][0]["unit_price"], Decimal("4.50"))
+        self.assertEqual(cart["total"], Decimal("10.50"))
+        self.assertEqual(self.store.get_cart(self.user.pk), cart)
+
+    def test_zero_quantity_removes_line(self):
+        self.add(2)
+        cart = self.set(0)
+        self.assertEqual(cart, {"items": [], "total": Decimal("0.00"), "item_count": 0})
+        self.assertEqual(self.set(0)["items"], [])
+
+    def test_clear(self):
+        self.add(2)
+        self.store.clear(self.user.pk)
+        self.assertEqual(self.store.get_cart(self.user.pk)["items"], [])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_take(self):
+        self.add(2)
+        with self.store.take(self.user.pk) as cart_items:
+            self.assertEqual(
+                [(item.menu_item_id, item.quantity) for item in cart_items],
+                [(self.burger.pk, 2)],
+            )
+        self.assertEqual(self.store.get_cart(self.user.pk)["items"], [])
+
+    def test_take_keeps_lines_when_failing(self):
+        self.add(2)
+        with self.assertRaises(RuntimeError):
+            with self.store.take(self.user.pk):
+                raise RuntimeError
+        self.assertEqual(self.store.get_cart(self.user.pk)["item_count"], 2)
+
+
+class DatabaseCartStoreTests(CartStoreTestMixin, TestCase):
+    def make_store(self):
+        return DatabaseCartStore()
+
+    def test_lines_written_as_rows(self):
+        self.add(2)
+        self.add(3)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+        self.assertEqual(Cart.objects.count(), 1)
+
+    def test_flush_is_a_no_op(self):
+        self.add(2)
+        self.assertEqual(self.store.flush_expired(), 0)
+
+
+class LocMemCartStoreTests(CartStoreTestMixin, TestCase):
+    def make_store(self):
+        return LocMemCartStore(expire_after=0)
+
+    def expire(self):
+        self.assertEqual(self.store.flush_expired(), 1)
+
+    def test_no_rows_for_live_carts(self):
+        self.store.expire_after = 60
+        self.add(2)
+        self.assertEqual(self.store.flush_expired(), 0)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_expired_cart_persisted_and_restored(self):
+        self.add(2)
+        self.add(1, self.cheese.pk, "6.00")
+        self.expire()
+        self.assertEqual(self.store.carts, {})
+        self.assertEqual(CartItem.objects.count(), 2)
+
+        cart = self.store.get_cart(self.user.pk)
+        self.assertEqual(cart["total"], Decimal("16.00"))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_add_to_expired_cart_merges(self):
+        self.add(2)
+        self.expire()
+        cart = self.add(1)
+        self.assertEqual(cart["item_count"], 3)
+        self.assertEqual(cart["total"], Decimal("15.00"))
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_set_quantity_on_expired_cart(self):
+        self.add(2)
+        self.add(1, self.cheese.pk, "6.00")
+        self.expire()
+        cart = self.set(5)
+        self.assertEqual(
+            [(item["modifier"], item["quantity"]) for item in cart["items"]],
+            [(None, 5), (self.cheese.pk, 1)],
+        )
+        self.assertEqual(cart["total"], Decimal("31.00"))
+        self.assertEqual(self.store.get_cart(self.user.pk), cart)
+
+    def test_remove_line_of_expired_cart(self):
+        self.add(2)
+        self.expire()
+        cart = self.set(0)
+        self.assertEqual(cart["items"], [])
+        self.assertEqual(cart["total"], Decimal("0.00"))
+
+    def test_take_expired_cart(self):
+        self.add(2)
+        self.expire()
+        with self.store.take(self.user.pk) as cart_items:
+            self.assertEqual([item.quantity for item in cart_items], [2])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_restored_only_once(self):
+        self.add(2)
+        self.expire()
+        self.assertIsNotNone(self.store.restore(self.user.pk))
+        self.assertIsNone(self.store.restore(self.user.pk))
+        self.assertEqual(self.store.get_cart(self.user.pk)["item_count"], 2)
+
+    def test_failed_restore_keeps_rows(self):
+        self.add(2)
+        self.expire()
+        with mock.patch.object(
+            self.store, "update_line", side_effect=ConnectionError
+        ), self.assertRaises(ConnectionError):
+            self.store.restore(self.user.pk)
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+
+    def test_deleted_menu_items_dropped_when_persisted(self):
+        fries = make_menu_item(self.burger.menu_category.restaurant, "Fries")
+        self.add(2)
+        self.store.add_item(self.user.pk, fries.pk, None, 1, Decimal("2.00"))
+        fries.delete()
+        self.expire()
+        self.assertEqual(CartItem.objects.get().menu_item, self.burger)
+
+    def test_failed_persist_keeps_cart_in_store(self):
+        self.add(2)
+        with mock.patch.object(
+            self.store, "persist", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.store.flush_expired()
+        self.assertEqual(self.store.load(self.user.pk)["total"], 1000)
+
+    def test_recently_touched_cart_not_popped(self):
+        self.add(2)
+        self.assertIsNone(self.store.pop(self.user.pk, touched_before=0))
+        key = get_line_key(self.burger.pk)
+        self.assertEqual(self.store.load(self.user.pk)["lines"], {key: (2, 500)})
+
+    def test_clear_removes_persisted_rows(self):
+        self.add(2)
+        self.expire()
+        self.store.clear(self.user.pk)
+        self.assertEqual(self.store.get_cart(self.user.pk)["items"], [])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_flush_command(self):
+        self.add(2)
+        out = StringIO()
+        with mock.patch(
+            "order.management.commands.flush_expired_carts.get_cart_store",
+            return_value=self.store,
+        ):
+            call_command("flush_expired_carts", stdout=out)
+        self.assertIn("1 expired carts persisted.", out.getvalue())
+
+
+class GetCartStoreTests(TestCase):
+    def tearDown(self):
+        get_cart_store.cache_clear()
+
+    @override_settings(
+        CART_STORE={
+            "BACKEND": "order.cart_store.LocMemCartStore",
+            "OPTIONS": {"expire_after": 5},
+        }
+    )
+    def test_configured_store(self):
+        get_cart_store.cache_clear()
+        store = get_cart_store()
+        self.assertIsInstance(store, LocMemCartStore)
+        self.assertEqual(store.expire_after, 5)
+        self.assertIs(get_cart_store(), store)
+
+
+class UserCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+
+    def setUp(self):
+        self.burger = make_menu_item(name="Burger", price="5.00")
+        self.client = make_client(self.user)
+
+    def test_cart_endpoints(self):
+        url = reverse("me.cart-items")
+        response = self.client.post(url, {"menu_item": self.burger.uid, "quantity": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], "10.00")
+
+        response = self.client.put(url, {"menu_item": self.burger.uid, "quantity": 3})
+        body = response.json()
+        self.assertEqual(body["item_count"], 3)
+        self.assertEqual(body["items"][0]["line_total"], "15.00")
+        self.assertEqual(body["items"][0]["menu_item_name"], "Burger")
+
+        self.assertEqual(self.client.get(reverse("me.cart")).json(), body)
+        self.assertEqual(self.client.delete(reverse("me.cart")).status_code, 204)
+        self.assertEqual(self.client.get(reverse("me.cart")).json()["items"], [])
+
+    def test_invalid_quantity(self):
+        response = self.client.post(
+            reverse("me.cart-items"), {"menu_item": self.burger.uid, "quantity": 0}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_authentication_required(self):
+        self.assertEqual(make_client().get(reverse("me.cart")).status_code, 401)
@@ -0,0 +1,173 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.exceptions import ValidationError
+
+from order.cart_store import DatabaseCartStore, LocMemCartStore
+from order.checkout import checkout_cart
+from order.choices import OrderTypeChoices
+from order.models import CartItem, Order
+from restaurant.models import MenuItem, Modifier
+from shared.choices import StatusChoices
+from shared.tests.factories import (
+    make_client,
+    make_menu_item,
+    make_restaurant,
+    make_user,
+)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = make_user(address="Road 7")
+        self.client = make_client(self.user)
+        self.restaurant = make_restaurant(delivery=True)
+        self.burger = make_menu_item(self.restaurant, "Burger", "5.00")
+        self.cheese = Modifier.objects.create(
+            name="Cheese", menu_item=self.burger, price=Decimal("1.00")
+        )
+        self.fries = make_menu_item(self.restaurant, "Fries", "2.50")
+
+    def add(self, menu_item, quantity=1, modifier=None):
+        response = self.client.post(
+            reverse("me.cart-items"),
+            {
+                "menu_item": str(menu_item.uid),
+                "modifier": str(modifier.uid) if modifier else None,
+                "quantity": quantity,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def checkout(self, **data):
+        return self.client.post(reverse("me.checkout"), data, format="json")
+
+    def test_order_created_and_cart_emptied(self):
+        self.add(self.burger, 2, self.cheese)
+        self.add(self.fries, 3)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201, response.content)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.restaurant, self.restaurant)
+        self.assertEqual(order.delivery_address, "Road 7")
+        self.assertEqual(order.total_price, Decimal("19.50"))
+        self.assertEqual(
+            sorted(order.order_items.values_list("quantity", "price")),
+            [(2, Decimal("6.00")), (3, Decimal("2.50"))],
+        )
+        self.assertEqual(response.json()["uid"], str(order.uid))
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+
+    def test_items_repriced_at_checkout(self):
+        self.add(self.burger, 2, self.cheese)
+        MenuItem.objects.filter(pk=self.burger.pk).update(price=Decimal("7.00"))
+        Modifier.objects.filter(pk=self.cheese.pk).update(price=Decimal("1.50"))
+
+        self.assertEqual(self.checkout().status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.total_price, Decimal("17.00"))
+        self.assertEqual(order.order_items.get().price, Decimal("8.50"))
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        def count_checkout_queries(menu_items):
+            for menu_item in menu_items:
+                self.add(menu_item, 2)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.checkout().status_code, 201)
+            return len(queries)
+
+        small = count_checkout_queries([self.burger])
+        more = [
+            make_menu_item(self.restaurant, f"Item {number}", "1.00")
+            for number in range(10)
+        ]
+        self.assertEqual(count_checkout_queries(more), small)
+
+    def test_empty_cart(self):
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_invalid_cart_left_untouched(self):
+        other = make_menu_item(make_restaurant("Pizza Place", delivery=True), "Pizza")
+        self.add(self.burger)
+        self.add(other)
+
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart__user=self.user).count(), 2)
+
+    def test_unavailable_item(self):
+        self.add(self.burger)
+        MenuItem.objects.filter(pk=self.burger.pk).update(is_available=False)
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_restaurant_not_accepting_the_order_type(self):
+        self.add(self.burger)
+        self.assertEqual(self.checkout(order_type="TAKEAWAY").status_code, 400)
+
+        self.restaurant.status = StatusChoices.INACTIVE
+        self.restaurant.save()
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_delivery_needs_an_address(self):
+        self.user.address = ""
+        self.user.save()
+        self.add(self.burger)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("delivery_address", response.json())
+
+    def test_items_deleted_from_the_menu_dropped(self):
+        store = LocMemCartStore()
+        store.add_item(self.user.pk, self.burger.pk, None, 1, self.burger.price)
+        store.add_item(self.user.pk, self.fries.pk, None, 2, self.fries.price)
+        self.fries.delete()
+
+        with mock.patch("order.checkout.get_cart_store", return_value=store):
+            order = checkout_cart(self.user, OrderTypeChoices.DELIVERY, "Road 7")
+        self.assertEqual(order.total_price, Decimal("5.00"))
+        self.assertEqual(order.order_items.get().menu_item, self.burger)
+
+
+class LiveStoreCheckoutTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.restaurant = make_restaurant(delivery=True)
+        self.burger = make_menu_item(self.restaurant, "Burger", "5.00")
+        self.store = LocMemCartStore()
+        patcher = mock.patch("order.checkout.get_cart_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lines_taken_out_of_the_store(self):
+        self.store.add_item(self.user.pk, self.burger.pk, None, 3, Decimal("5.00"))
+        order = checkout_cart(self.user, OrderTypeChoices.DELIVERY, "Road 1")
+        self.assertEqual(order.total_price, Decimal("15.00"))
+        self.assertEqual(self.store.get_cart(self.user.pk)["items"], [])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_lines_put_back_when_checkout_fails(self):
+        self.store.add_item(self.user.pk, self.burger.pk, None, 3, Decimal("5.00"))
+        with self.assertRaises(ValidationError):
+            checkout_cart(self.user, OrderTypeChoices.TAKEAWAY)
+        cart = self.store.get_cart(self.user.pk)
+        self.assertEqual(cart["item_count"], 3)
+        self.assertEqual(cart["total"], Decimal("15.00"))
+        self.assertFalse(Order.objects.exists())
+
+
+class DatabaseStoreTakeTests(TestCase):
+    def test_take_without_a_cart(self):
+        with DatabaseCartStore().take(make_user().pk) as cart_items:
+            self.assertEqual(cart_items, [])
@@ -0,0 +1,249 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from order.choices import DeliveryStatusChoices, OrderStatusChoices, OrderTypeChoices
+from order.dispatch import (
+    dispatch,
+    dispatch_all,
+    get_waiting_orders,
+    get_cost_matrix,
+    match_greedy,
+    match_hungarian,
+)
+from order.models import Order, OutboxEvent
+from restaurant.models import RestaurantAddress, RestaurantStaff
+from shared.choices import StaffRoleChoices, StatusChoices
+from shared.tests.factories import make_order, make_restaurant, make_user
+
+# About 1.1 km apart on a meridian
+NORTH = (Decimal("23.810000"), Decimal("90.400000"))
+SOUTH = (Decimal("23.800000"), Decimal("90.400000"))
+FAR = (Decimal("24.500000"), Decimal("90.400000"))
+
+
+def make_located_restaurant(location):
+    restaurant = make_restaurant(delivery=True)
+    RestaurantAddress.objects.create(
+        restaurant=restaurant,
+        street="Road 1",
+        city="Dhaka",
+        country="Bangladesh",
+        latitude=location[0],
+        longitude=location[1],
+    )
+    return restaurant
+
+
+class DispatchTests(TestCase):
+    def setUp(self):
+        self.north = make_located_restaurant(NORTH)
+        self.south = make_located_restaurant(SOUTH)
+        self.customer = make_user()
+
+    def make_courier(self, restaurant, **kwargs):
+        courier = make_user()
+        RestaurantStaff.objects.create(
+            restaurant=restaurant,
+            user=courier,
+            role=StaffRoleChoices.DELIVERY,
+            **kwargs,
+        )
+        return courier
+
+    def make_delivery(self, restaurant, **kwargs):
+        return make_order(
+            self.customer, restaurant, order_type=OrderTypeChoices.DELIVERY, **kwargs
+        )
+
+    def get_courier(self, order):
+        order.refresh_from_db()
+        return order.delivery_man
+
+    def test_closest_courier_assigned(self):
+        north_courier = self.make_courier(self.north)
+        south_courier = self.make_courier(self.south)
+        south_order = self.make_delivery(self.south)
+        north_order = self.make_delivery(self.north)
+
+        stats = dispatch()
+        self.assertEqual(
+            stats,
+            {
+                "orders": 2,
+                "couriers": 2,
+                "assigned": 2,
+                "last": (north_order.created_at, north_order.id),
+            },
+        )
+        self.assertEqual(self.get_courier(north_order), north_courier)
+        self.assertEqual(self.get_courier(south_order), south_courier)
+        self.assertEqual(north_order.history.first().delivery_man, north_courier)
+        self.assertTrue(
+            OutboxEvent.objects.filter(
+                aggregate_uid=north_order.uid, changed_fields=["delivery_man"]
+            ).exists()
+        )
+
+    def test_oldest_order_first_when_couriers_are_scarce(self):
+        self.make_courier(self.north)
+        oldest = self.make_delivery(self.north)
+        newest = self.make_delivery(self.north)
+        self.assertEqual(dispatch()["assigned"], 1)
+        self.assertIsNotNone(self.get_courier(oldest))
+        self.assertIsNone(self.get_courier(newest))
+
+    def test_courier_capacity(self):
+        courier = self.make_courier(self.north)
+        self.make_delivery(self.north, delivery_man=courier)
+        waiting = self.make_delivery(self.north)
+        self.assertEqual(dispatch()["couriers"], 0)
+        self.assertIsNone(self.get_courier(waiting))
+
+        with override_settings(DISPATCH={"MAX_ORDERS_PER_COURIER": 3}):
+            others = [self.make_delivery(self.north) for _ in range(2)]
+            self.assertEqual(dispatch()["assigned"], 2)
+        self.assertEqual(Order.objects.filter(delivery_man=courier).count(), 3)
+        self.assertIsNone(self.get_courier(others[1]))
+
+    def test_delivered_orders_free_the_courier(self):
+        courier = self.make_courier(self.north)
+        self.make_delivery(
+            self.north,
+            delivery_man=courier,
+            delivery_status=DeliveryStatusChoices.DELIVERED,
+        )
+        waiting = self.make_delivery(self.north)
+        dispatch()
+        self.assertEqual(self.get_courier(waiting), courier)
+
+    def test_couriers_locked_by_another_dispatcher_skipped(self):
+        self.make_courier(self.north)
+        waiting = self.make_delivery(self.north)
+        with mock.patch("order.dispatch.lock_couriers", return_value=set()):
+            self.assertEqual(dispatch()["couriers"], 0)
+        self.assertIsNone(self.get_courier(waiting))
+
+    def test_only_active_couriers(self):
+        self.make_courier(self.south, status=StatusChoices.INACTIVE)
+        inactive_user = self.make_courier(self.south)
+        inactive_user.status = StatusChoices.INACTIVE
+        inactive_user.save()
+        RestaurantStaff.objects.create(
+            restaurant=self.south, user=make_user(), role=StaffRoleChoices.CHEF
+        )
+        north_courier = self.make_courier(self.north)
+        waiting = self.make_delivery(self.south)
+        self.assertEqual(dispatch(matcher="greedy")["couriers"], 1)
+        self.assertEqual(self.get_courier(waiting), north_courier)
+
+    def test_default_restaurant_of_a_courier(self):
+        courier = self.make_courier(self.north)
+        RestaurantStaff.objects.create(
+            restaurant=self.south,
+            user=courier,
+            role=StaffRoleChoices.DELIVERY,
+            is_default=True,
+        )
+        far = make_located_restaurant(FAR)
+        self.make_delivery(far)
+        self.assertEqual(dispatch()["assigned"], 0)
+
+    def test_orders_out_of_range_wait(self):
+        self.make_courier(self.north)
+        far_order = self.make_delivery(make_located_restaurant(FAR))
+        self.assertEqual(dispatch()["assigned"], 0)
+        with override_settings(DISPATCH={"MAX_DISTANCE_KM": None}):
+            self.assertEqual(dispatch()["assigned"], 1)
+        self.assertIsNotNone(self.get_courier(far_order))
+
+    def test_only_waiting_delivery_orders(self):
+        self.make_courier(self.north)
+        self.make_delivery(self.north, order_status=OrderStatusChoices.CANCELLED)
+        make_order(self.customer, self.north, order_type=OrderTypeChoices.TAKEAWAY)
+        waiting = self.make_delivery(self.north)
+        self.assertEqual(get_waiting_orders(10), [waiting])
+
+    def test_restaurants_without_location_left_out(self):
+        self.make_courier(self.north)
+        unlocated = make_restaurant()
+        RestaurantAddress.objects.create(
+            restaurant=unlocated, street="Road 2", city="Dhaka", country="Bangladesh"
+        )
+        self.make_delivery(unlocated)
+        self.make_delivery(make_restaurant())
+        located = self.make_delivery(self.north)
+        # Left out by the query itself, so they never fill a batch
+        self.assertEqual(get_waiting_orders(1), [located])
+
+    def test_waiting_orders_after_the_cursor(self):
+        first, second, third = [self.make_delivery(self.north) for _ in range(3)]
+        Order.objects.filter(pk=third.pk).update(created_at=second.created_at)
+        third.refresh_from_db()
+        after = (second.created_at, second.id)
+        self.assertEqual(get_waiting_orders(10, after), [third])
+        self.assertEqual(
+            get_waiting_orders(10, (first.created_at, first.id)), [second, third]
+        )
+
+    def test_dispatch_all(self):
+        for _ in range(3):
+            self.make_courier(self.north)
+        for _ in range(5):
+            self.make_delivery(self.north)
+        self.assertEqual(dispatch_all(batch_size=2), {"batches": 3, "assigned": 3})
+        self.assertEqual(Order.objects.filter(delivery_man=None).count(), 2)
+
+    def test_unmatchable_orders_do_not_block_the_queue(self):
+        self.make_courier(self.north)
+        self.make_courier(self.north)
+        far = make_located_restaurant(FAR)
+        stuck = [self.make_delivery(far) for _ in range(2)]
+        waiting = [self.make_delivery(self.north) for _ in range(2)]
+
+        # The whole first batch is out of range of every courier
+        self.assertEqual(dispatch(batch_size=2)["assigned"], 0)
+        self.assertEqual(dispatch_all(batch_size=2), {"batches": 3, "assigned": 2})
+        for order in waiting:
+            self.assertIsNotNone(self.get_courier(order))
+        for order in stuck:
+            self.assertIsNone(self.get_courier(order))
+
+    def test_dispatch_all_stops_without_free_couriers(self):
+        self.make_courier(self.north)
+        for _ in range(5):
+            self.make_delivery(self.north)
+        self.assertEqual(dispatch_all(batch_size=2), {"batches": 2, "assigned": 1})
+
+    def test_command(self):
+        self.make_courier(self.north)
+        self.make_delivery(self.north)
+        out = StringIO()
+        call_command("dispatch_deliveries", "--batch-size", "10", stdout=out)
+        self.assertIn("1 orders assigned in 1 batches", out.getvalue())
+
+
+class MatcherTests(SimpleTestCase):
+    def test_greedy(self):
+        costs = [[1.0, 2.0], [1.5, 9.0], [0.5, 0.7]]
+        self.assertEqual(sorted(match_greedy(costs, 10)), [(0, 1), (2, 0)])
+        self.assertEqual(match_greedy(costs, 0.6), [(2, 0)])
+        self.assertEqual(match_greedy([], 10), [])
+
+    def test_greedy_ties_go_to_the_oldest_order(self):
+        self.assertEqual(match_greedy([[1.0], [1.0]], 10), [(0, 0)])
+
+    def test_cost_matrix(self):
+        here, north = (23.8, 90.4), (24.8, 90.4)
+        costs = get_cost_matrix([here, here], [here, north])
+        self.assertEqual(costs[0][0], 0)
+        self.assertAlmostEqual(costs[1][1], 111.19, places=1)
+
+    def test_hungarian_needs_scipy(self):
+        with mock.patch.dict("sys.modules", {"scipy.optimize": None}):
+            with self.assertRaises(ImproperlyConfigured):
+                match_hungarian([[1.0]], 10)
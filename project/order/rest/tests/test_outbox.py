@@ -0,0 +1,126 @@
+import datetime
+import uuid
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from order.choices import OrderStatusChoices, OutboxEventTypeChoices
+from order.models import OutboxConsumer, OutboxEvent, Payment
+from order.outbox import OutboxReader, compact_outbox
+from shared.tests.factories import make_order
+
+
+def make_event(age_seconds=60):
+    return OutboxEvent.objects.create(
+        event_type=OutboxEventTypeChoices.ORDER_UPDATED,
+        aggregate_uid=uuid.uuid4(),
+        payload={},
+        created_at=timezone.now() - datetime.timedelta(seconds=age_seconds),
+    )
+
+
+class OutboxEventTests(TestCase):
+    def get_events(self, instance):
+        return list(
+            OutboxEvent.objects.filter(aggregate_uid=instance.uid)
+            .order_by("id")
+            .values_list("event_type", "changed_fields")
+        )
+
+    def test_order_changes(self):
+        order = make_order()
+        order.order_status = OrderStatusChoices.COMPLETED
+        order.save()
+        # Saving without a change writes no event
+        order.save()
+        payload = OutboxEvent.objects.latest("id").payload
+        order.delete()
+
+        self.assertEqual(
+            self.get_events(order),
+            [
+                (OutboxEventTypeChoices.ORDER_CREATED, []),
+                (OutboxEventTypeChoices.ORDER_UPDATED, ["order_status"]),
+                (OutboxEventTypeChoices.ORDER_DELETED, []),
+            ],
+        )
+        self.assertEqual(payload["uid"], str(order.uid))
+        self.assertEqual(payload["order_status"], OrderStatusChoices.COMPLETED)
+
+    def test_payment_changes(self):
+        payment = Payment.objects.create(
+            order=make_order(), amount=10, payment_method="CASH"
+        )
+        self.assertEqual(
+            self.get_events(payment), [(OutboxEventTypeChoices.PAYMENT_CREATED, [])]
+        )
+
+
+@override_settings(OUTBOX={"BATCH_SIZE": 2, "SETTLE_SECONDS": 5})
+class OutboxReaderTests(TestCase):
+    def setUp(self):
+        self.reader = OutboxReader("kitchen-display")
+
+    def test_read_in_id_order(self):
+        events = [make_event() for _ in range(3)]
+        self.assertEqual(self.reader.read(), events[:2])
+        self.assertEqual(self.reader.read(events[1].id), events[2:])
+        self.assertEqual(self.reader.read(events[2].id), [])
+        self.assertEqual(OutboxReader("other", batch_size=5).read(), events)
+
+    def test_unsettled_events_wait(self):
+        settled = make_event()
+        make_event(age_seconds=0)
+        self.assertEqual(self.reader.read(), [settled])
+
+    def test_batch_cut_at_the_first_unsettled_event(self):
+        # A lower id committed after a higher one: the higher one waits too, or
+        # acknowledging it would skip the lower one for good
+        late = make_event(age_seconds=0)
+        early = make_event()
+        self.assertEqual(self.reader.read(), [])
+
+        OutboxEvent.objects.filter(pk=late.pk).update(created_at=early.created_at)
+        self.assertEqual(self.reader.read(), [late, early])
+
+    def test_batches_acknowledged(self):
+        events = [make_event() for _ in range(3)]
+        batches = self.reader.batches()
+        self.assertEqual(next(batches), events[:2])
+        self.assertEqual(self.reader.get_position(), 0)
+        self.assertEqual(next(batches), events[2:])
+        self.assertEqual(self.reader.get_position(), events[1].id)
+        self.assertEqual(list(batches), [])
+        self.assertEqual(self.reader.get_position(), events[2].id)
+
+    def test_acknowledge_never_moves_back(self):
+        self.reader.get_position()
+        self.reader.acknowledge(10)
+        self.reader.acknowledge(5)
+        self.assertEqual(self.reader.get_position(), 10)
+
+
+class CompactOutboxTests(TestCase):
+    def setUp(self):
+        self.old = [make_event(age_seconds=7200) for _ in range(3)]
+        self.new = make_event()
+
+    def test_without_consumers(self):
+        self.assertEqual(compact_outbox(retention_hours=1), 0)
+
+    def test_acknowledged_by_every_consumer(self):
+        OutboxConsumer.objects.create(name="a", position=self.new.id)
+        OutboxConsumer.objects.create(name="b", position=self.old[1].id)
+        self.assertEqual(compact_outbox(retention_hours=1, chunk_size=1), 2)
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by("id")), [self.old[2], self.new]
+        )
+
+    def test_command(self):
+        OutboxConsumer.objects.create(name="a", position=self.new.id)
+        out = StringIO()
+        call_command("compact_outbox", "--retention-hours", "1", stdout=out)
+        self.assertIn("3 outbox events deleted.", out.getvalue())
+        self.assertEqual(list(OutboxEvent.objects.all()), [self.new])
@@ -0,0 +1,117 @@
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.generics import ListAPIView
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from order.models import Order
+from order.rest.serializers.me import UserOrderListSerializer
+from shared.pagination import KeysetPagination
+from shared.tests.factories import make_client, make_order, make_restaurant, make_user
+
+
+class KeysetPaginationTests(TestCase):
+    url = reverse("me.order-list")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        restaurant = make_restaurant()
+        now = timezone.now()
+        cls.orders = []
+        for index in range(5):
+            order = make_order(cls.user, restaurant, total_price=f"{index + 1}.00")
+            cls.orders.append(order)
+        # Two orders share created_at, the id breaks the tie
+        Order.objects.filter(pk=cls.orders[1].pk).update(created_at=now)
+        Order.objects.filter(pk=cls.orders[2].pk).update(created_at=now)
+        for index, order in enumerate(cls.orders):
+            if index not in (1, 2):
+                Order.objects.filter(pk=order.pk).update(
+                    created_at=now + datetime.timedelta(minutes=index - 2)
+                )
+        make_order(make_user(), restaurant)  # someone else's order
+
+    def setUp(self):
+        self.client = make_client(self.user)
+
+    def get_uids(self, response):
+        return [row["uid"] for row in response.json()["results"]]
+
+    def expected_uids(self):
+        return [
+            str(uid)
+            for uid in Order.objects.filter(user=self.user)
+            .order_by("-created_at", "-id")
+            .values_list("uid", flat=True)
+        ]
+
+    def test_pages_walk_forward_and_back_without_gaps(self):
+        response = self.client.get(self.url, {"page_size": 2})
+        body = response.json()
+        self.assertNotIn("count", body)
+        self.assertIsNone(body["previous"])
+        seen = self.get_uids(response)
+        pages = [response]
+        while body["next"]:
+            response = self.client.get(body["next"])
+            body = response.json()
+            seen += self.get_uids(response)
+            pages.append(response)
+        self.assertEqual(seen, self.expected_uids())
+
+        previous = self.client.get(pages[-1].json()["previous"])
+        self.assertEqual(self.get_uids(previous), self.get_uids(pages[-2]))
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {"page_size": 1000})
+        self.assertEqual(len(self.get_uids(response)), 5)
+
+    def test_client_ordering_ignored_without_ordering_fields(self):
+        response = self.client.get(self.url, {"ordering": "total_price"})
+        body = response.json()
+        self.assertNotIn("count", body)
+        self.assertEqual(self.get_uids(response), self.expected_uids())
+
+    def get_ordered_list(self, query=None, **attrs):
+        class OrderedList(ListAPIView):
+            serializer_class = UserOrderListSerializer
+            pagination_class = KeysetPagination
+
+            def get_queryset(self):
+                return Order.objects.filter(user=self.request.user)
+
+        for name, value in attrs.items():
+            setattr(OrderedList, name, value)
+        request = APIRequestFactory().get("/", query)
+        force_authenticate(request, user=self.user)
+        return OrderedList.as_view()(request).data
+
+    def test_client_ordering_falls_back_to_page_numbers(self):
+        body = self.get_ordered_list(
+            {"ordering": "total_price"}, ordering_fields=["total_price"]
+        )
+        self.assertEqual(body["count"], 5)
+        prices = [row["total_price"] for row in body["results"]]
+        self.assertEqual(prices, sorted(prices, key=float))
+
+    def test_other_client_ordering_keeps_the_keyset(self):
+        for ordering in ("uid", "not_a_field", ""):
+            body = self.get_ordered_list(
+                {"ordering": ordering}, ordering_fields=["total_price"]
+            )
+            self.assertNotIn("count", body)
+            uids = [str(row["uid"]) for row in body["results"]]
+            self.assertEqual(uids, self.expected_uids())
+
+    def test_view_ordering_falls_back_to_page_numbers(self):
+        body = self.get_ordered_list(ordering=["total_price"])
+        self.assertEqual(body["count"], 5)
+        self.assertEqual(body["results"][0]["total_price"], "1.00")
@@ -0,0 +1,121 @@
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.urls import reverse
+
+from order.models import CustomerFeedback
+from order.ratings import rebuild_ratings
+from restaurant.models import MenuItem, Restaurant
+from shared.tests.factories import make_client, make_menu_item, make_user
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.burger = make_menu_item(name="Burger")
+        self.restaurant = self.burger.menu_category.restaurant
+
+    def rate(self, rating, menu_item=None, restaurant=None):
+        return CustomerFeedback.objects.create(
+            title="Feedback",
+            customer=self.user,
+            restaurant=restaurant or self.restaurant,
+            menu_item=menu_item,
+            rating=rating,
+        )
+
+    def assertRating(self, instance, count, total):
+        instance.refresh_from_db()
+        self.assertEqual((instance.rating_count, instance.rating_sum), (count, total))
+        self.assertAlmostEqual(instance.rating_average, total / count if count else 0)
+
+    def test_feedback_applies_deltas(self):
+        first = self.rate(4, self.burger)
+        self.rate(5)
+        self.assertRating(self.restaurant, 2, 9)
+        self.assertRating(self.burger, 1, 4)
+
+        first.rating = 2
+        first.save()
+        self.assertRating(self.restaurant, 2, 7)
+        self.assertRating(self.burger, 1, 2)
+
+        first.delete()
+        self.assertRating(self.restaurant, 1, 5)
+        self.assertRating(self.burger, 0, 0)
+
+    def test_feedback_without_rating_not_counted(self):
+        feedback = self.rate(None, self.burger)
+        self.assertRating(self.restaurant, 0, 0)
+
+        feedback.rating = 3
+        feedback.save()
+        self.assertRating(self.burger, 1, 3)
+
+    def test_full_save_of_stale_instance_keeps_aggregates(self):
+        restaurant = Restaurant.objects.get(pk=self.restaurant.pk)
+        burger = MenuItem.objects.get(pk=self.burger.pk)
+        self.rate(5, self.burger)
+
+        restaurant.name = "Renamed"
+        restaurant.save()
+        burger.price = 7
+        burger.save()
+
+        self.assertRating(restaurant, 1, 5)
+        self.assertEqual(restaurant.name, "Renamed")
+        self.assertRating(burger, 1, 5)
+        self.assertEqual(burger.price, 7)
+
+    def test_save_of_deferred_instance(self):
+        restaurant = Restaurant.objects.only("name").get(pk=self.restaurant.pk)
+        self.rate(5)
+        restaurant.name = "Renamed"
+        restaurant.save()
+        self.assertRating(restaurant, 1, 5)
+        self.assertEqual(restaurant.name, "Renamed")
+
+    def test_full_save_stays_a_full_save(self):
+        self.rate(5)
+        received = []
+
+        def receiver(sender, update_fields=None, **kwargs):
+            received.append(update_fields)
+
+        post_save.connect(receiver, sender=Restaurant)
+        self.addCleanup(post_save.disconnect, receiver, sender=Restaurant)
+        self.restaurant.save()
+        self.assertEqual(received, [None])
+        self.assertRating(self.restaurant, 1, 5)
+
+    def test_save_of_deleted_row_inserts_it_again(self):
+        restaurant = Restaurant.objects.get(pk=self.restaurant.pk)
+        Restaurant.objects.filter(pk=restaurant.pk).delete()
+        restaurant.save()
+        self.assertTrue(Restaurant.objects.filter(pk=restaurant.pk).exists())
+
+    def test_explicit_update_fields_still_written(self):
+        self.restaurant.rating_count = 3
+        self.restaurant.rating_sum = 12
+        self.restaurant.save(update_fields=["rating_count", "rating_sum"])
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.rating_count, 3)
+
+    def test_rebuild(self):
+        self.rate(4, self.burger)
+        self.rate(2)
+        Restaurant.objects.update(rating_count=0, rating_sum=0, rating_average=0)
+        MenuItem.objects.update(rating_count=9, rating_sum=1, rating_average=0)
+
+        rebuild_ratings()
+        self.assertRating(self.restaurant, 2, 6)
+        self.assertRating(self.burger, 1, 4)
+
+    def test_top_rated(self):
+        fries = make_menu_item(self.restaurant, "Fries")
+        self.rate(3, self.burger)
+        self.rate(5, fries)
+        response = make_client().get(
+            reverse("restaurant.menu-item.top-rated"), {"min_ratings": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.json()], ["Fries", "Burger"])
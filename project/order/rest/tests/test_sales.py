@@ -0,0 +1,313 @@
+import datetime
+import importlib
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from order.archive import archive_orders
+from order.choices import OrderStatusChoices, OrderTypeChoices
+from order.models import ArchivedOrder, DailySalesRollup, HourlySalesRollup
+from order.sales import get_sales_report, rebuild_sales_rollups
+from restaurant.models import RestaurantStaff
+from shared.choices import StaffRoleChoices
+from shared.tests.factories import make_client, make_order, make_restaurant, make_user
+
+COMPLETED = OrderStatusChoices.COMPLETED
+CANCELLED = OrderStatusChoices.CANCELLED
+DAY = datetime.date(2026, 3, 10)
+NOON = timezone.make_aware(datetime.datetime(2026, 3, 10, 12, 30))
+
+
+def get_rollups(model=DailySalesRollup, **filters):
+    period = "date" if model is DailySalesRollup else "hour"
+    return list(
+        model.objects.filter(**filters)
+        .order_by(period, "order_type", "order_status")
+        .values_list(period, "order_type", "order_status", "order_count", "revenue")
+    )
+
+
+class SalesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+
+    def setUp(self):
+        self.restaurant = make_restaurant()
+
+    def make_order(self, total_price="10.00", created_at=NOON, **kwargs):
+        kwargs.setdefault("restaurant", self.restaurant)
+        return make_order(
+            self.user, total_price=total_price, created_at=created_at, **kwargs
+        )
+
+
+class SalesRollupTests(SalesTestCase):
+    def test_terminal_orders_counted(self):
+        self.make_order(order_status=COMPLETED)
+        self.make_order("5.50", order_status=COMPLETED)
+        self.make_order("3.00", order_status=CANCELLED)
+        self.make_order("99.00")
+
+        self.assertEqual(
+            get_rollups(),
+            [
+                (DAY, "DELIVERY", CANCELLED, 1, Decimal("3.00")),
+                (DAY, "DELIVERY", COMPLETED, 2, Decimal("15.50")),
+            ],
+        )
+        self.assertEqual(
+            get_rollups(HourlySalesRollup),
+            [
+                (NOON.replace(minute=0), "DELIVERY", CANCELLED, 1, Decimal("3.00")),
+                (NOON.replace(minute=0), "DELIVERY", COMPLETED, 2, Decimal("15.50")),
+            ],
+        )
+
+    def test_status_changes_move_the_order(self):
+        order = self.make_order()
+        self.assertEqual(get_rollups(), [])
+
+        order.order_status = COMPLETED
+        order.save()
+        self.assertEqual(get_rollups(), [(DAY, "DELIVERY", COMPLETED, 1, 10)])
+
+        # Refunded as cancelled, the completed row keeps an empty count
+        order.order_status = CANCELLED
+        order.save()
+        self.assertEqual(
+            get_rollups(),
+            [
+                (DAY, "DELIVERY", CANCELLED, 1, 10),
+                (DAY, "DELIVERY", COMPLETED, 0, 0),
+            ],
+        )
+
+    def test_counted_fields_changed(self):
+        order = self.make_order(order_status=COMPLETED)
+        order.total_price = Decimal("12.00")
+        order.order_type = OrderTypeChoices.TAKEAWAY
+        order.save()
+        self.assertEqual(
+            get_rollups(),
+            [
+                (DAY, "DELIVERY", COMPLETED, 0, 0),
+                (DAY, "TAKEAWAY", COMPLETED, 1, 12),
+            ],
+        )
+
+    def test_other_changes_ignored(self):
+        order = self.make_order(order_status=COMPLETED)
+        with self.assertNumQueries(3):
+            # The save, its history row and outbox event
+            order.delivery_address = "Road 2"
+            order.save()
+        self.assertEqual(get_rollups(), [(DAY, "DELIVERY", COMPLETED, 1, 10)])
+
+    def test_deleted_order_removed(self):
+        self.make_order(order_status=COMPLETED).delete()
+        self.make_order().delete()
+        self.assertEqual(get_rollups(), [(DAY, "DELIVERY", COMPLETED, 0, 0)])
+
+    @override_settings(TIME_ZONE="Asia/Dhaka")
+    def test_periods_in_the_time_zone(self):
+        # 20:00 UTC is 02:00 the next day in Dhaka
+        late = timezone.make_aware(
+            datetime.datetime(2026, 3, 10, 20), datetime.timezone.utc
+        )
+        self.make_order(created_at=late, order_status=COMPLETED)
+        next_day = DAY + datetime.timedelta(days=1)
+        self.assertEqual(get_rollups(), [(next_day, "DELIVERY", COMPLETED, 1, 10)])
+        [(hour, *_)] = get_rollups(HourlySalesRollup)
+        self.assertEqual(hour, late)
+
+        rebuild_sales_rollups()
+        self.assertEqual(get_rollups(), [(next_day, "DELIVERY", COMPLETED, 1, 10)])
+
+
+class RebuildSalesRollupsTests(SalesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = make_restaurant()
+        for day in range(3):
+            created_at = NOON + datetime.timedelta(days=day)
+            self.make_order(created_at=created_at, order_status=COMPLETED)
+            self.make_order(
+                "4.00",
+                created_at=created_at,
+                restaurant=self.other,
+                order_status=CANCELLED,
+            )
+        self.make_order()
+        self.daily, self.hourly = get_rollups(), get_rollups(HourlySalesRollup)
+
+    def test_same_as_incremental(self):
+        DailySalesRollup.objects.update(order_count=7)
+        HourlySalesRollup.objects.all().delete()
+        rebuild_sales_rollups(batch_size=2)
+        self.assertEqual(get_rollups(), self.daily)
+        self.assertEqual(get_rollups(HourlySalesRollup), self.hourly)
+
+    def test_restaurants_and_since(self):
+        DailySalesRollup.objects.update(order_count=7)
+        since = DAY + datetime.timedelta(days=1)
+        rebuild_sales_rollups([self.restaurant.pk], since=since)
+
+        counts = DailySalesRollup.objects.filter(restaurant=self.restaurant)
+        self.assertEqual(
+            list(counts.order_by("date").values_list("order_count", flat=True)),
+            [7, 1, 1],
+        )
+        self.assertFalse(
+            DailySalesRollup.objects.filter(restaurant=self.other)
+            .exclude(order_count=7)
+            .exists()
+        )
+
+    def test_command(self):
+        DailySalesRollup.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_sales_rollups", stdout=out)
+        self.assertIn("Sales rollups rebuilt.", out.getvalue())
+        self.assertEqual(get_rollups(), self.daily)
+
+
+class ArchivedSalesTests(SalesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_order(order_status=COMPLETED)
+        self.make_order("6.00", order_status=CANCELLED)
+        self.make_order(
+            "3.00", order_status=COMPLETED, order_type=OrderTypeChoices.TAKEAWAY
+        )
+        self.recent = self.make_order(
+            "20.00", created_at=timezone.now(), order_status=COMPLETED
+        )
+        self.daily, self.hourly = get_rollups(), get_rollups(HourlySalesRollup)
+        self.assertEqual(archive_orders(min_age_days=30), 3)
+
+    def test_archiving_keeps_the_rollups(self):
+        self.assertEqual(get_rollups(), self.daily)
+        self.assertEqual(ArchivedOrder.objects.filter(order_type="TAKEAWAY").count(), 1)
+
+    def test_rebuild_counts_archived_orders(self):
+        rebuild_sales_rollups()
+        self.assertEqual(get_rollups(), self.daily)
+        self.assertEqual(get_rollups(HourlySalesRollup), self.hourly)
+
+    def test_rebuild_with_filters(self):
+        rebuild_sales_rollups([self.restaurant.pk], since=DAY)
+        self.assertEqual(get_rollups(), self.daily)
+        rebuild_sales_rollups([make_restaurant().pk])
+        self.assertEqual(get_rollups(), self.daily)
+        rebuild_sales_rollups(since=DAY + datetime.timedelta(days=1))
+        self.assertEqual(get_rollups(), self.daily)
+
+    def test_hot_and_archived_orders_of_a_period_summed(self):
+        self.make_order("2.00", order_status=COMPLETED)
+        self.daily = get_rollups()
+        rebuild_sales_rollups()
+        self.assertEqual(get_rollups(), self.daily)
+        self.assertIn((DAY, "DELIVERY", COMPLETED, 2, 12), self.daily)
+
+    def test_order_types_backfilled(self):
+        migration = importlib.import_module(
+            "order.migrations.0009_archivedorder_order_type"
+        )
+        ArchivedOrder.objects.update(order_type="DELIVERY")
+        migration.backfill_order_types(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(ArchivedOrder.objects.filter(order_type="TAKEAWAY").count(), 1)
+
+    def test_deleted_restaurant_skipped(self):
+        make_restaurant().delete()
+        ArchivedOrder.objects.update(restaurant_id=self.restaurant.pk + 100)
+        rebuild_sales_rollups()
+        self.assertEqual(get_rollups(date=DAY), [])
+
+
+class SalesReportTests(SalesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_order("10.00", order_status=COMPLETED)
+        self.make_order(
+            "5.00", order_status=COMPLETED, order_type=OrderTypeChoices.TAKEAWAY
+        )
+        self.make_order("8.00", order_status=CANCELLED)
+        self.make_order(
+            "20.00",
+            created_at=NOON + datetime.timedelta(days=1),
+            order_status=COMPLETED,
+        )
+
+    def test_daily(self):
+        end = DAY + datetime.timedelta(days=1)
+        report = get_sales_report(self.restaurant, DAY, end)
+        totals = report["totals"]
+        self.assertEqual(totals["order_count"], 4)
+        self.assertEqual(totals["completed_order_count"], 3)
+        # Cancelled orders bring no revenue
+        self.assertEqual(totals["revenue"], Decimal("35.00"))
+        self.assertEqual(totals["average_basket"], Decimal("11.67"))
+        self.assertEqual(totals["by_order_type"]["TAKEAWAY"]["order_count"], 1)
+        self.assertEqual(totals["by_order_status"][CANCELLED]["revenue"], 8)
+        self.assertEqual([period["period"] for period in report["periods"]], [DAY, end])
+        self.assertEqual(report["periods"][0]["revenue"], Decimal("15.00"))
+
+    def test_hourly_and_order_type(self):
+        report = get_sales_report(
+            self.restaurant, DAY, DAY, grain="hour", order_type="TAKEAWAY"
+        )
+        [period] = report["periods"]
+        self.assertEqual(period["period"], NOON.replace(minute=0))
+        self.assertEqual(report["totals"]["revenue"], Decimal("5.00"))
+
+    def test_empty(self):
+        report = get_sales_report(make_restaurant(), DAY, DAY)
+        self.assertEqual(report["periods"], [])
+        self.assertEqual(report["totals"]["average_basket"], Decimal("0.00"))
+
+
+class SalesReportEndpointTests(SalesTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.manager = make_user()
+
+    def setUp(self):
+        super().setUp()
+        self.make_order(order_status=COMPLETED)
+        self.url = reverse("restaurant.sales", args=[self.restaurant.slug])
+        RestaurantStaff.objects.create(
+            restaurant=self.restaurant, user=self.manager, role=StaffRoleChoices.MANAGER
+        )
+
+    def test_report(self):
+        response = make_client(self.manager).get(
+            self.url, {"start": DAY, "end": DAY, "grain": "hour"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["restaurant_slug"], self.restaurant.slug)
+        self.assertEqual(response.data["totals"]["revenue"], "10.00")
+        self.assertEqual(
+            response.data["periods"][0]["period"], NOON.replace(minute=0).isoformat()
+        )
+
+    def test_managers_only(self):
+        self.assertEqual(make_client().get(self.url).status_code, 401)
+        self.assertEqual(make_client(self.user).get(self.url).status_code, 403)
+
+    def test_invalid_range(self):
+        client = make_client(self.manager)
+        end = DAY - datetime.timedelta(days=1)
+        response = client.get(self.url, {"start": DAY, "end": end})
+        self.assertEqual(response.status_code, 400)
+        start = DAY - datetime.timedelta(days=31)
+        response = client.get(self.url, {"start": start, "end": DAY, "grain": "hour"})
+        self.assertContains(response, "at most 31 days", status_code=400)
@@ -0,0 +1,228 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from order.choices import OrderStatusChoices
+from order.utils import get_user_orders_channel, make_order_stream_token
+from shared.choices import StatusChoices
+from shared.pubsub import RedisBroker, get_broker
+from shared.tests.factories import make_client, make_order, make_user
+
+
+def parse_event(chunk):
+    event, data = chunk.decode().strip().split("\n")
+    return event, json.loads(data.removeprefix("data: "))
+
+
+@override_settings(ORDER_STREAM_HEARTBEAT=0.05)
+class OrderStatusStreamTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.order = make_order(self.user)
+        make_order(self.user, order_status=OrderStatusChoices.COMPLETED)
+        self.url = reverse("me.order-stream")
+
+    async def open_stream(self, **kwargs):
+        response = await self.async_client.get(self.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return response.streaming_content
+
+    async def get_token_key(self):
+        token, _ = await Token.objects.aget_or_create(user=self.user)
+        return token.key
+
+    async def test_snapshot_then_transitions(self):
+        key = await self.get_token_key()
+        stream = await self.open_stream(headers={"Authorization": f"Token {key}"})
+        try:
+            event, payload = parse_event(await anext(stream))
+            self.assertEqual(event, "event: order_status")
+            self.assertEqual(payload["uid"], str(self.order.uid))
+
+            self.assertEqual(await anext(stream), b": keep-alive\n\n")
+
+            get_broker().publish(
+                get_user_orders_channel(self.user.pk),
+                {"uid": str(self.order.uid), "order_status": "PREPARING"},
+            )
+            _, payload = parse_event(await anext(stream))
+            self.assertEqual(payload["order_status"], "PREPARING")
+        finally:
+            await stream.aclose()
+
+    async def test_stream_token(self):
+        stream_token = make_order_stream_token(self.user)
+        stream = await self.open_stream(QUERY_STRING=f"stream_token={stream_token}")
+        try:
+            _, payload = parse_event(await anext(stream))
+            self.assertEqual(payload["uid"], str(self.order.uid))
+        finally:
+            await stream.aclose()
+
+    async def test_auth_token_not_accepted_in_the_url(self):
+        key = await self.get_token_key()
+        response = await self.async_client.get(self.url, {"token": key})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(self.url, {"stream_token": key})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_expired_stream_token(self):
+        stream_token = make_order_stream_token(self.user)
+        with mock.patch("django.core.signing.time.time", return_value=2**40):
+            response = await self.async_client.get(
+                self.url, {"stream_token": stream_token}
+            )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_inactive_user(self):
+        stream_token = make_order_stream_token(self.user)
+        self.user.status = StatusChoices.INACTIVE
+        await sync_to_async(self.user.save)()
+        response = await self.async_client.get(self.url, {"stream_token": stream_token})
+        self.assertEqual(response.status_code, 401)
+
+    def test_not_served_under_wsgi(self):
+        response = make_client(self.user).get(self.url)
+        self.assertEqual(response.status_code, 501)
+
+
+class OrderStreamTokenTests(TestCase):
+    def test_token(self):
+        user = make_user()
+        response = make_client(user).post(reverse("me.order-stream-token"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["expires_in"], 60)
+        self.assertTrue(response.json()["token"].startswith(str(user.uid)))
+
+    def test_authentication_required(self):
+        response = make_client().post(reverse("me.order-stream-token"))
+        self.assertEqual(response.status_code, 401)
+
+
+class PublishOrderStatusTests(TestCase):
+    def test_published_on_commit(self):
+        order = make_order()
+        order.order_status = OrderStatusChoices.COMPLETED
+        with mock.patch("order.signals.get_broker") as get_broker_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                order.save()
+        channel, payload = get_broker_mock.return_value.publish.call_args.args
+        self.assertEqual(channel, get_user_orders_channel(order.user_id))
+        self.assertEqual(payload["order_status"], OrderStatusChoices.COMPLETED)
+
+    def test_broker_errors_logged(self):
+        order = make_order()
+        order.order_status = OrderStatusChoices.COMPLETED
+        later = mock.Mock()
+        with mock.patch("order.signals.get_broker") as get_broker_mock:
+            get_broker_mock.return_value.publish.side_effect = ConnectionError("down")
+            with self.assertLogs(level="ERROR") as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    order.save()
+                    transaction.on_commit(later)
+        self.assertIn("down", logs.output[0])
+        # The callbacks registered after it still run
+        later.assert_called_once_with()
+        order.refresh_from_db()
+        self.assertEqual(order.order_status, OrderStatusChoices.COMPLETED)
+
+
+class FakePubSub:
+    """Replays messages (or raises exceptions) given to it, then idles"""
+
+    def __init__(self, *messages, fail_subscribe=False):
+        self.messages = list(messages)
+        self.fail_subscribe = fail_subscribe
+        self.channels = set()
+        self.closed = False
+
+    async def subscribe(self, *channels):
+        if self.fail_subscribe:
+            raise ConnectionError("down")
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=None):
+        if self.messages:
+            message = self.messages.pop(0)
+            if isinstance(message, Exception):
+                raise message
+            return message
+        await asyncio.sleep(0.01)
+        return None
+
+    async def reset(self):
+        self.closed = True
+
+
+class FakeRedisBroker(RedisBroker):
+    def __init__(self, *pubsubs):
+        super().__init__("redis://fake", retry_delay=0.01, max_retry_delay=0.04)
+        self.pubsubs = list(pubsubs)
+
+    async def get_pubsub(self):
+        if self.pubsub is None:
+            self.pubsub = self.pubsubs.pop(0)
+        return self.pubsub
+
+
+def make_message(channel, data):
+    return {"type": "message", "channel": channel.encode(), "data": data}
+
+
+class RedisBrokerTests(SimpleTestCase):
+    async def receive(self, subscription):
+        return await asyncio.wait_for(subscription.get(), timeout=2)
+
+    async def test_listener_reconnects_after_redis_errors(self):
+        first = FakePubSub(ConnectionError("gone"))
+        second = FakePubSub(ConnectionError("still gone"))
+        third = FakePubSub(make_message("orders", '{"status": "ready"}'))
+        broker = FakeRedisBroker(first, second, third)
+
+        with self.assertLogs("shared.pubsub", "WARNING") as logs:
+            async with broker.subscribe("orders") as subscription:
+                message = await self.receive(subscription)
+        self.assertEqual(message, {"status": "ready"})
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("reconnecting in 0.02s", logs.output[1])
+        self.assertTrue(first.closed)
+        self.assertTrue(second.closed)
+        self.assertFalse(third.closed)
+        self.assertFalse(broker.listener.done())
+        broker.listener.cancel()
+
+    async def test_subscribe_while_redis_is_down(self):
+        broker = FakeRedisBroker(
+            FakePubSub(fail_subscribe=True),
+            FakePubSub(make_message("orders", '{"status": "ready"}')),
+        )
+        with self.assertLogs("shared.pubsub", "WARNING"):
+            async with broker.subscribe("orders") as subscription:
+                message = await self.receive(subscription)
+        self.assertEqual(message, {"status": "ready"})
+        broker.listener.cancel()
+
+    async def test_malformed_message_skipped(self):
+        broker = FakeRedisBroker(
+            FakePubSub(
+                make_message("orders", "{not json"),
+                make_message("orders", '{"status": "ready"}'),
+            )
+        )
+        with self.assertLogs("shared.pubsub", "WARNING"):
+            async with broker.subscribe("orders") as subscription:
+                message = await self.receive(subscription)
+        self.assertEqual(message, {"status": "ready"})
+        broker.listener.cancel()
@@ -0,0 +1,30 @@
+from django.urls import path
+
+from order.rest.views.me import (
+    UserCart,
+    UserCartItems,
+    UserCheckout,
+    UserFeedbackList,
+    UserOrderDetail,
+    UserOrderList,
+    UserPaymentList,
+)
+from order.rest.views.stream import UserOrderStatusStream, UserOrderStreamToken
+
+urlpatterns = [
+    path("orders", UserOrderList.as_view(), name="me.order-list"),
+    path(
+        "orders/stream", UserOrderStatusStream.as_view(), name="me.order-stream"
+    ),
+    path(
+        "orders/stream/token",
+        UserOrderStreamToken.as_view(),
+        name="me.order-stream-token",
+    ),
+    path("orders/<uuid:uid>", UserOrderDetail.as_view(), name="me.order-detail"),
+    path("cart", UserCart.as_view(), name="me.cart"),
+    path("cart/items", UserCartItems.as_view(), name="me.cart-items"),
+    path("checkout", UserCheckout.as_view(), name="me.checkout"),
+    path("payments", UserPaymentList.as_view(), name="me.payment-list"),
+    path("feedbacks", UserFeedbackList.as_view(), name="me.feedback-list"),
+]
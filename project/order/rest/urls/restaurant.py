@@ -0,0 +1,7 @@
+from django.urls import path
+
+from order.rest.views.sales import RestaurantSalesReport
+
+urlpatterns = [
+    path("<slug:slug>/sales", RestaurantSalesReport.as_view(), name="restaurant.sales"),
+]
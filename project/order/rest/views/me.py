@@ -0,0 +1,173 @@
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from restaurant.models import MenuItem, Modifier
+
+from ...archive import get_order_detail
+from ...cart_store import get_cart_store
+from ...checkout import checkout_cart
+from ...models import CustomerFeedback, Order, Payment
+
+from ..serializers.me import (
+    CartItemQuantitySerializer,
+    CartItemWriteSerializer,
+    CartSerializer,
+    CheckoutSerializer,
+    UserFeedbackSerializer,
+    UserOrderDetailSerializer,
+    UserOrderListSerializer,
+    UserPaymentSerializer,
+)
+
+
+class UserOrderList(ListAPIView):
+    """List of the orders of the logged in user, newest first"""
+
+    serializer_class = UserOrderListSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).select_related(
+            "restaurant"
+        )
+
+
+class UserOrderDetail(RetrieveAPIView):
+    """Details of a single order of the logged in user, archived ones included"""
+
+    serializer_class = UserOrderDetailSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = "uid"
+
+    def retrieve(self, request, *args, **kwargs):
+        detail = get_order_detail(request.user, kwargs["uid"])
+        if detail is None:
+            raise NotFound()
+        return Response(detail)
+
+
+def get_cart_data(cart):
+    """Serialized cart, with the names of its items fetched in two queries"""
+    menu_items = MenuItem.objects.only("uid", "name").in_bulk(
+        {item["menu_item"] for item in cart["items"]}
+    )
+    modifiers = Modifier.objects.only("uid", "name").in_bulk(
+        {item["modifier"] for item in cart["items"] if item["modifier"]}
+    )
+
+    lines = []
+    for item in cart["items"]:
+        # Items deleted from the menu meanwhile are dropped at checkout
+        if item["menu_item"] not in menu_items:
+            continue
+        lines.append(
+            {
+                **item,
+                "menu_item": menu_items[item["menu_item"]],
+                "modifier": modifiers.get(item["modifier"]),
+                "line_total": item["unit_price"] * item["quantity"],
+            }
+        )
+    return CartSerializer({**cart, "items": lines}).data
+
+
+class UserCart(APIView):
+    """Cart of the logged in user, kept in the configured cart store"""
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses=CartSerializer)
+    def get(self, request, *args, **kwargs):
+        return Response(get_cart_data(get_cart_store().get_cart(request.user.pk)))
+
+    def delete(self, request, *args, **kwargs):
+        get_cart_store().clear(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UserCartItems(APIView):
+    """Add an item to the cart (POST) or set its quantity (PUT)"""
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=CartItemWriteSerializer, responses=CartSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = CartItemWriteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = get_cart_store().add_item(
+            request.user.pk, **self.get_line(serializer.validated_data)
+        )
+        return Response(get_cart_data(cart))
+
+    @extend_schema(request=CartItemQuantitySerializer, responses=CartSerializer)
+    def put(self, request, *args, **kwargs):
+        serializer = CartItemQuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = get_cart_store().set_quantity(
+            request.user.pk, **self.get_line(serializer.validated_data)
+        )
+        return Response(get_cart_data(cart))
+
+    def get_line(self, data):
+        return {
+            "menu_item_id": data["menu_item"].pk,
+            "modifier_id": data["modifier"].pk if data["modifier"] else None,
+            "quantity": data["quantity"],
+            "unit_price": data["unit_price"],
+        }
+
+
+class UserCheckout(APIView):
+    """Place an order from the cart of the logged in user"""
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=CheckoutSerializer, responses=UserOrderDetailSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = CheckoutSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+
+        order = checkout_cart(
+            request.user,
+            order_type=serializer.validated_data["order_type"],
+            delivery_address=serializer.validated_data.get("delivery_address", ""),
+        )
+
+        order = (
+            Order.objects.select_related("restaurant")
+            .prefetch_related("order_items__menu_item", "order_items__modifier")
+            .get(pk=order.pk)
+        )
+        return Response(
+            UserOrderDetailSerializer(order).data, status=status.HTTP_201_CREATED
+        )
+
+
+class UserPaymentList(ListAPIView):
+    """List of the payments of the logged in user, newest first"""
+
+    serializer_class = UserPaymentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Payment.objects.filter(order__user=self.request.user).select_related(
+            "order"
+        )
+
+
+class UserFeedbackList(ListAPIView):
+    """List of the feedbacks given by the logged in user, newest first"""
+
+    serializer_class = UserFeedbackSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return CustomerFeedback.objects.filter(
+            customer=self.request.user
+        ).select_related("restaurant", "menu_item")
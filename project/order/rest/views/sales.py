@@ -0,0 +1,37 @@
+from django.shortcuts import get_object_or_404
+
+from drf_spectacular.utils import extend_schema
+
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from restaurant.models import Restaurant
+from restaurant.permissions import IsRestaurantManager
+
+from ...sales import get_sales_report
+from ..serializers.sales import SalesReportQuerySerializer, SalesReportSerializer
+
+
+class RestaurantSalesReport(APIView):
+    """Revenue, order counts and average basket of a restaurant per day or hour"""
+
+    permission_classes = [IsRestaurantManager]
+
+    @extend_schema(
+        parameters=[SalesReportQuerySerializer],
+        responses=SalesReportSerializer,
+    )
+    def get(self, request, slug, *args, **kwargs):
+        query = SalesReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        restaurant = get_object_or_404(Restaurant.objects.only("id", "slug"), slug=slug)
+        report = get_sales_report(
+            restaurant,
+            query.validated_data["start"],
+            query.validated_data["end"],
+            grain=query.validated_data["grain"],
+            order_type=query.validated_data.get("order_type"),
+        )
+        report["restaurant_slug"] = restaurant.slug
+        return Response(SalesReportSerializer(report).data)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import exceptions, status
+from rest_framework.authentication import get_authorization_header
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from account.authentication import CachedTokenAuthentication
+
+from shared.pubsub import get_broker
+
+from ...models import Order
+from ...utils import (
+    TERMINAL_ORDER_STATUSES,
+    get_order_status_payload,
+    get_order_stream_token_max_age,
+    get_order_stream_token_user_uid,
+    get_user_orders_channel,
+    make_order_stream_token,
+)
+from ..serializers.me import OrderStreamTokenSerializer
+
+User = get_user_model()
+
+
+class UserOrderStreamToken(APIView):
+    """Short lived token opening the order status stream of the logged in user"""
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=None, responses=OrderStreamTokenSerializer)
+    def post(self, request, *args, **kwargs):
+        data = {
+            "token": make_order_stream_token(request.user),
+            "expires_in": get_order_stream_token_max_age(),
+        }
+        return Response(OrderStreamTokenSerializer(data).data)
+
+
+class UserOrderStatusStream(View):
+    """
+    Server-sent events stream of the status changes of the active orders of the
+    logged in user. Meant to be served by the ASGI application, where an idle
+    connection is only a suspended coroutine.
+
+    EventSource can not send headers, so instead of the auth token it may pass
+    a stream token (see UserOrderStreamToken) as the `stream_token` query
+    parameter, keeping the auth token out of URLs and access logs.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        # Under WSGI every open stream would hold a worker thread until the
+        # client goes away
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"detail": "Order status streams are served by the ASGI application."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        try:
+            user = await self.authenticate(request)
+        except exceptions.AuthenticationFailed as error:
+            return JsonResponse(
+                {"detail": str(error.detail)}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        response = StreamingHttpResponse(
+            self.stream(user), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) == 2 and auth[0].lower() == b"token":
+            user, token = await sync_to_async(
+                CachedTokenAuthentication().authenticate_credentials
+            )(auth[1].decode(errors="replace"))
+            return user
+
+        stream_token = request.GET.get("stream_token")
+        if not stream_token:
+            raise exceptions.AuthenticationFailed(
+                "Authentication credentials were not provided."
+            )
+        try:
+            uid = get_order_stream_token_user_uid(stream_token)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed("Invalid or expired stream token.")
+
+        user = await User.objects.filter(uid=uid).afirst()
+        if user is None:
+            raise exceptions.AuthenticationFailed("Invalid or expired stream token.")
+        CachedTokenAuthentication().check_user(user)
+        return user
+
+    async def stream(self, user):
+        heartbeat = getattr(settings, "ORDER_STREAM_HEARTBEAT", 15)
+
+        # Subscribe first, so no transition is lost between snapshot and stream
+        async with get_broker().subscribe(get_user_orders_channel(user.pk)) as events:
+            active_orders = Order.objects.filter(user=user).exclude(
+                order_status__in=TERMINAL_ORDER_STATUSES
+            )
+            async for order in active_orders.only(
+                "uid", "order_status", "delivery_status", "updated_at"
+            ):
+                yield self.format_event(get_order_status_payload(order))
+
+            while True:
+                try:
+                    payload = await asyncio.wait_for(events.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield self.format_event(payload)
+
+    def format_event(self, payload):
+        return f"event: order_status\ndata: {json.dumps(payload)}\n\n"
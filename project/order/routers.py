@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Tables of order.archive, kept in ORDER_ARCHIVE["DATABASE"]
+ARCHIVE_MODELS = {"archivedorder"}
+
+
+def get_archive_database():
+    return getattr(settings, "ORDER_ARCHIVE", {}).get("DATABASE", DEFAULT_DB_ALIAS)
+
+
+def is_archive_model(app_label, model_name):
+    return app_label == "order" and model_name in ARCHIVE_MODELS
+
+
+class OrderArchiveRouter:
+    """Routes the archive tables, everything else is left to the next router"""
+
+    def get_database(self, model):
+        if is_archive_model(model._meta.app_label, model._meta.model_name):
+            return get_archive_database()
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self.get_database(model)
+
+    def db_for_write(self, model, **hints):
+        return self.get_database(model)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archive_database = get_archive_database()
+        if archive_database == DEFAULT_DB_ALIAS:
+            return None
+        if is_archive_model(app_label, model_name):
+            return db == archive_database
+        # A separate archive database only holds the archive tables
+        if db == archive_database:
+            return False
+        return None
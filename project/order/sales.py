@@ -0,0 +1,257 @@
+"""
+Daily and hourly sales rollups per restaurant.
+
+An order is counted once it reaches a terminal status (TERMINAL_ORDER_STATUSES),
+in the DailySalesRollup / HourlySalesRollup row of its restaurant, order_type,
+order_status and the day / hour of its created_at (in TIME_ZONE). Like
+order.ratings, every save of an Order removes the contribution it had and adds
+the new one with UPDATE ... SET x = x + delta in the transaction of the save,
+so a completed order later refunded as cancelled moves between rows.
+
+Reports read only the rollups: a month of a restaurant is at most
+30 x 2 order types x 3 statuses daily rows. rebuild_sales_rollups() recomputes
+them with one GROUP BY per grain over the orders and one over the
+ArchivedOrder rows: archiving moves terminal orders out of the hot tables
+without touching the rollups (see order.archive), so their revenue has to be
+counted from the archive. The archive can live in another database, so both
+are summed in Python. An order archived to another database by a run
+interrupted before deleting its hot row is counted twice until archive_orders
+runs again.
+"""
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from restaurant.models import Restaurant
+
+from .choices import OrderStatusChoices
+from .models import ArchivedOrder, DailySalesRollup, HourlySalesRollup, Order
+from .utils import TERMINAL_ORDER_STATUSES
+
+# Order fields the rollups depend on
+SALES_FIELDS = ("restaurant", "order_type", "order_status", "total_price", "created_at")
+
+
+def get_sales_contribution(order, previous_values=None):
+    """
+    (restaurant id, created_at, order_type, order_status, total_price) counted
+    for the order, or None. previous_values maps changed fields to the values
+    they had before the save, as returned by get_dirty_fields.
+    """
+    values = {
+        field: getattr(order, order._meta.get_field(field).attname)
+        for field in SALES_FIELDS
+    }
+    values.update(
+        (field, value)
+        for field, value in (previous_values or {}).items()
+        if field in values
+    )
+    if values["order_status"] not in TERMINAL_ORDER_STATUSES:
+        return None
+    return (
+        values["restaurant"],
+        values["created_at"],
+        values["order_type"],
+        values["order_status"],
+        Decimal(values["total_price"]),
+    )
+
+
+def get_rollup_keys(created_at):
+    """{rollup model: period lookup} of an order created at created_at"""
+    created_at = timezone.localtime(created_at)
+    return {
+        DailySalesRollup: {"date": created_at.date()},
+        HourlySalesRollup: {
+            "hour": created_at.replace(minute=0, second=0, microsecond=0)
+        },
+    }
+
+
+def apply_sales_delta(contribution, sign):
+    restaurant_id, created_at, order_type, order_status, total_price = contribution
+    for model, period in get_rollup_keys(created_at).items():
+        key = {
+            "restaurant_id": restaurant_id,
+            "order_type": order_type,
+            "order_status": order_status,
+            **period,
+        }
+        updated = model.objects.filter(**key).update(
+            order_count=F("order_count") + sign,
+            revenue=F("revenue") + sign * total_price,
+        )
+        # Nothing to take away from a row that does not exist
+        if updated or sign < 0:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**key, order_count=1, revenue=total_price)
+        except IntegrityError:
+            # Created by a concurrent transaction meanwhile
+            model.objects.filter(**key).update(
+                order_count=F("order_count") + 1,
+                revenue=F("revenue") + total_price,
+            )
+
+
+def update_sales(old_contribution, new_contribution):
+    if old_contribution == new_contribution:
+        return
+    if old_contribution is not None:
+        apply_sales_delta(old_contribution, -1)
+    if new_contribution is not None:
+        apply_sales_delta(new_contribution, 1)
+
+
+def get_day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def get_period_totals(querysets, period, batch_size):
+    """
+    {(restaurant id, period, order_type, order_status): [order_count, revenue]}
+    of the orders of querysets, Order or ArchivedOrder ones
+    """
+    totals = {}
+    for queryset in querysets:
+        rows = (
+            queryset.annotate(period=period)
+            .values_list("restaurant_id", "period", "order_type", "order_status")
+            .annotate(order_count=Count("id"), revenue=Sum("total_price"))
+            .order_by()
+        )
+        for *key, order_count, revenue in rows.iterator(chunk_size=batch_size):
+            total = totals.setdefault(tuple(key), [0, Decimal("0")])
+            total[0] += order_count
+            total[1] += revenue
+    return totals
+
+
+def rebuild_sales_rollups(restaurant_ids=None, since=None, batch_size=2000):
+    """
+    Recompute the rollups of the restaurants (all when None) from the orders,
+    hot and archived, created on or after the `since` date (all when None).
+    """
+    querysets = [
+        Order.objects.filter(order_status__in=TERMINAL_ORDER_STATUSES),
+        ArchivedOrder.objects.all(),
+    ]
+    if restaurant_ids is not None:
+        querysets = [qs.filter(restaurant_id__in=restaurant_ids) for qs in querysets]
+    if since is not None:
+        querysets = [
+            qs.filter(created_at__gte=get_day_start(since)) for qs in querysets
+        ]
+
+    grains = (
+        (DailySalesRollup, "date", TruncDate("created_at")),
+        (HourlySalesRollup, "hour", TruncHour("created_at")),
+    )
+    for model, period_field, period in grains:
+        rollups = model.objects.all()
+        if restaurant_ids is not None:
+            rollups = rollups.filter(restaurant_id__in=restaurant_ids)
+        if since is not None:
+            start = since if period_field == "date" else get_day_start(since)
+            rollups = rollups.filter(**{f"{period_field}__gte": start})
+        rollups.delete()
+
+        totals = get_period_totals(querysets, period, batch_size)
+        # Archived orders outlive their restaurant
+        existing = set(
+            Restaurant.objects.filter(
+                pk__in={restaurant_id for restaurant_id, *_ in totals}
+            ).values_list("pk", flat=True)
+        )
+        rollups = []
+        for key, (order_count, revenue) in totals.items():
+            restaurant_id, period_value, order_type, order_status = key
+            if restaurant_id not in existing:
+                continue
+            rollups.append(
+                model(
+                    restaurant_id=restaurant_id,
+                    order_type=order_type,
+                    order_status=order_status,
+                    order_count=order_count,
+                    revenue=revenue,
+                    **{period_field: period_value},
+                )
+            )
+        model.objects.bulk_create(rollups, batch_size=batch_size)
+
+
+def get_sales_report(restaurant, start, end, grain="day", order_type=None):
+    """
+    Sales of the restaurant from the start to the end date (included), per day
+    or hour, read from the rollups only. Revenue and average basket count the
+    completed orders, order_count every terminal one.
+    """
+    if grain == "day":
+        rollups = DailySalesRollup.objects.filter(
+            restaurant=restaurant, date__range=(start, end)
+        ).order_by("date")
+        period_field = "date"
+    else:
+        rollups = HourlySalesRollup.objects.filter(
+            restaurant=restaurant,
+            hour__gte=get_day_start(start),
+            hour__lt=get_day_start(end + datetime.timedelta(days=1)),
+        ).order_by("hour")
+        period_field = "hour"
+    if order_type is not None:
+        rollups = rollups.filter(order_type=order_type)
+
+    periods = defaultdict(list)
+    for rollup in rollups:
+        periods[getattr(rollup, period_field)].append(rollup)
+
+    return {
+        "grain": grain,
+        "start": start,
+        "end": end,
+        "totals": get_sales_summary(
+            [rollup for rollups in periods.values() for rollup in rollups]
+        ),
+        "periods": [
+            {"period": period, **get_sales_summary(rollups)}
+            for period, rollups in periods.items()
+        ],
+    }
+
+
+def get_sales_summary(rollups):
+    by_order_type = defaultdict(lambda: {"order_count": 0, "revenue": Decimal("0")})
+    by_order_status = defaultdict(lambda: {"order_count": 0, "revenue": Decimal("0")})
+    for rollup in rollups:
+        for split in (
+            by_order_type[rollup.order_type],
+            by_order_status[rollup.order_status],
+        ):
+            split["order_count"] += rollup.order_count
+            split["revenue"] += rollup.revenue
+
+    completed = by_order_status.get(
+        OrderStatusChoices.COMPLETED, {"order_count": 0, "revenue": Decimal("0")}
+    )
+    average_basket = (
+        (completed["revenue"] / completed["order_count"]).quantize(Decimal("0.01"))
+        if completed["order_count"]
+        else Decimal("0.00")
+    )
+    return {
+        "order_count": sum(split["order_count"] for split in by_order_status.values()),
+        "completed_order_count": completed["order_count"],
+        "revenue": completed["revenue"],
+        "average_basket": average_basket,
+        "by_order_type": dict(by_order_type),
+        "by_order_status": dict(by_order_status),
+    }
@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from restaurant.models import MenuItem, Restaurant
+from shared.pubsub import get_broker
+
+from .models import CustomerFeedback, Order, Payment
+from .outbox import get_changed_fields, record_events
+from .ratings import (
+    RATED_MODELS,
+    get_feedback_targets,
+    get_rating_contributions,
+    refresh_rating_aggregates,
+    update_ratings,
+)
+from .sales import get_sales_contribution, update_sales
+from .utils import (
+    ORDER_STATUS_FIELDS,
+    get_order_status_payload,
+    get_user_orders_channel,
+)
+
+
+@receiver(pre_save, sender=Order)
+def track_order_status_changes(sender, instance=None, **kwargs):
+    # Dirty fields are compared to the DB state, so this has to run before saving
+    dirty_fields = instance.get_dirty_fields(check_relationship=False)
+    instance._status_changed = any(
+        field in dirty_fields for field in ORDER_STATUS_FIELDS
+    )
+
+
+@receiver(pre_save, sender=Order)
+def track_previous_sales(sender, instance=None, **kwargs):
+    if instance._state.adding:
+        instance._previous_sales_contribution = None
+        return
+
+    instance._previous_sales_contribution = get_sales_contribution(
+        instance, instance.get_dirty_fields(check_relationship=True)
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_sales_on_save(sender, instance=None, **kwargs):
+    # Runs inside the transaction of the save, so rollups never drift
+    update_sales(
+        getattr(instance, "_previous_sales_contribution", None),
+        get_sales_contribution(instance),
+    )
+
+
+@receiver(post_delete, sender=Order)
+def update_sales_on_delete(sender, instance=None, **kwargs):
+    update_sales(get_sales_contribution(instance), None)
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=Payment)
+def track_outbox_changes(sender, instance=None, **kwargs):
+    if not instance._state.adding:
+        instance._outbox_changed_fields = get_changed_fields(instance)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Payment)
+def write_outbox_event_on_save(sender, instance=None, created=False, **kwargs):
+    # Inside the transaction of the save, see order.outbox
+    if created:
+        record_events([instance], "created")
+        return
+
+    changed_fields = getattr(instance, "_outbox_changed_fields", [])
+    if changed_fields:
+        record_events([instance], "updated", changed_fields)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Payment)
+def write_outbox_event_on_delete(sender, instance=None, **kwargs):
+    record_events([instance], "deleted")
+
+
+@receiver(post_save, sender=Order)
+def publish_order_status(sender, instance=None, created=False, **kwargs):
+    if not created and not getattr(instance, "_status_changed", False):
+        return
+
+    channel = get_user_orders_channel(instance.user_id)
+    payload = get_order_status_payload(instance)
+    # Robust: the order is committed already, a broker outage is only logged
+    transaction.on_commit(
+        lambda: get_broker().publish(channel, payload), robust=True
+    )
+
+
+@receiver(pre_save, sender=Restaurant)
+@receiver(pre_save, sender=MenuItem)
+def keep_saved_rating_aggregates(
+    sender, instance=None, update_fields=None, using=None, **kwargs
+):
+    refresh_rating_aggregates(instance, update_fields, using)
+
+
+@receiver(pre_save, sender=CustomerFeedback)
+def track_previous_rating(sender, instance=None, **kwargs):
+    if instance._state.adding:
+        instance._previous_rating_contributions = {}
+        return
+
+    # Saved values of the changed fields, the current ones for the others
+    dirty_fields = instance.get_dirty_fields(check_relationship=True)
+    targets = tuple(
+        dirty_fields.get(field, current)
+        for field, current in zip(
+            RATED_MODELS.values(), get_feedback_targets(instance)
+        )
+    )
+    rating = dirty_fields.get("rating", instance.rating)
+    instance._previous_rating_contributions = get_rating_contributions(targets, rating)
+
+
+@receiver(post_save, sender=CustomerFeedback)
+def update_ratings_on_save(sender, instance=None, **kwargs):
+    # Runs inside the transaction of the save, so aggregates never drift
+    update_ratings(
+        getattr(instance, "_previous_rating_contributions", {}),
+        get_rating_contributions(get_feedback_targets(instance), instance.rating),
+    )
+
+
+@receiver(post_delete, sender=CustomerFeedback)
+def update_ratings_on_delete(sender, instance=None, **kwargs):
+    update_ratings(
+        get_rating_contributions(get_feedback_targets(instance), instance.rating), {}
+    )
@@ -0,0 +1,51 @@
+"""All the helper methods for the order app will be stored here"""
+
+from django.conf import settings
+from django.core import signing
+
+from .choices import OrderStatusChoices
+
+# Order statuses after which an order can not change anymore
+TERMINAL_ORDER_STATUSES = (
+    OrderStatusChoices.COMPLETED,
+    OrderStatusChoices.CANCELLED,
+    OrderStatusChoices.FAILED,
+)
+
+ORDER_STATUS_FIELDS = ("order_status", "delivery_status")
+
+ORDER_STREAM_TOKEN_SALT = "order.stream"
+
+
+def get_user_orders_channel(user_id):
+    """Pub/sub channel receiving the status changes of the orders of a user"""
+    return f"orders.user.{user_id}"
+
+
+def get_order_status_payload(order):
+    return {
+        "uid": str(order.uid),
+        "order_status": order.order_status,
+        "delivery_status": order.delivery_status,
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+def make_order_stream_token(user):
+    """
+    Token opening the order status stream of user, for EventSource which can
+    not send the Authorization header. It is good for nothing else and expires
+    after ORDER_STREAM_TOKEN_MAX_AGE seconds.
+    """
+    return signing.TimestampSigner(salt=ORDER_STREAM_TOKEN_SALT).sign(str(user.uid))
+
+
+def get_order_stream_token_user_uid(token):
+    """uid of the user of a stream token, raises signing.BadSignature if invalid"""
+    return signing.TimestampSigner(salt=ORDER_STREAM_TOKEN_SALT).unsign(
+        token, max_age=get_order_stream_token_max_age()
+    )
+
+
+def get_order_stream_token_max_age():
+    return getattr(settings, "ORDER_STREAM_TOKEN_MAX_AGE", 60)
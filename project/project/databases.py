@@ -0,0 +1,97 @@
+"""
+DATABASES presets, picked in settings by the DATABASE_PRESET environment
+variable:
+
+- dev: SQLite file next to manage.py, tuned for concurrent writers.
+- prod: PostgreSQL when DB_ENGINE=postgresql, tuned SQLite otherwise, with
+  persistent (or, with DB_POOL=1, pooled) health checked connections.
+
+The PostgreSQL connection is read from DB_NAME, DB_USER, DB_PASSWORD, DB_HOST
+and DB_PORT. DB_REPLICA_HOSTS is a comma separated list of read replicas of the
+same database, routed by shared.routers.
+"""
+
+import os
+
+# WAL lets readers run next to the writer, synchronous=NORMAL is still safe
+# in WAL mode and avoids an fsync per commit. mmap and a bigger page cache cut
+# read syscalls. The busy timeout is the `timeout` option below.
+SQLITE_INIT_COMMAND = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA mmap_size=268435456;"
+    "PRAGMA cache_size=-20000;"
+    "PRAGMA temp_store=MEMORY"
+)
+
+
+def get_sqlite_database(name, conn_max_age=0, timeout=20):
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": conn_max_age != 0,
+        "OPTIONS": {
+            "init_command": SQLITE_INIT_COMMAND,
+            # Take the write lock at BEGIN: a transaction that read first can
+            # not fail with "database is locked" when it upgrades to a writer
+            "transaction_mode": "IMMEDIATE",
+            # Seconds to wait for the write lock before giving up
+            "timeout": timeout,
+        },
+    }
+
+
+def get_postgresql_database(host, env, pool=False, conn_max_age=600):
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("DB_NAME", "dineserve"),
+        "USER": env.get("DB_USER", "dineserve"),
+        "PASSWORD": env.get("DB_PASSWORD", ""),
+        "HOST": host,
+        "PORT": env.get("DB_PORT", "5432"),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if pool:
+        # psycopg's pool (psycopg[pool]), persistent connections are then unused
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(env.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(env.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": int(env.get("DB_POOL_TIMEOUT", 10)),
+        }
+    else:
+        config["CONN_MAX_AGE"] = conn_max_age
+    return config
+
+
+def get_databases(preset, base_dir, env=os.environ):
+    """Return (DATABASES, DATABASE_REPLICAS) for the preset"""
+    if preset == "dev":
+        return {"default": get_sqlite_database(base_dir / "db.sqlite3")}, []
+
+    if preset != "prod":
+        raise ValueError(f"Unknown DATABASE_PRESET: {preset}")
+
+    if env.get("DB_ENGINE", "sqlite") != "postgresql":
+        name = env.get("DB_NAME") or base_dir / "db.sqlite3"
+        return {"default": get_sqlite_database(name, conn_max_age=600)}, []
+
+    pool = env.get("DB_POOL") == "1"
+    databases = {
+        "default": get_postgresql_database(
+            env.get("DB_HOST", "localhost"), env, pool=pool
+        )
+    }
+    replicas = []
+    for index, host in enumerate(env.get("DB_REPLICA_HOSTS", "").split(","), 1):
+        if not host.strip():
+            continue
+        alias = f"replica_{index}"
+        databases[alias] = {
+            **get_postgresql_database(host.strip(), env, pool=pool),
+            "TEST": {"MIRROR": "default"},
+        }
+        replicas.append(alias)
+    return databases, replicas
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .databases import get_databases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,6 +54,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "account.User"
 
 MIDDLEWARE = [
+    "shared.profiling.QueryProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,6 +62,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "shared.routers.PrimaryPinningMiddleware",
 ]
 
 ROOT_URLCONF = "project.urls"
@@ -83,19 +88,151 @@ WSGI_APPLICATION = "project.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# Presets and the environment variables they read are in project.databases.
+
+DATABASE_PRESET = os.environ.get("DATABASE_PRESET", "dev")
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Read replicas, see shared.routers. Every alias listed here needs an entry in
+# DATABASES pointing at a replica of default, with "TEST": {"MIRROR": "default"}.
+DATABASES, DATABASE_REPLICAS = get_databases(DATABASE_PRESET, BASE_DIR)
+DATABASE_ROUTERS = [
+    "order.routers.OrderArchiveRouter",
+    "shared.routers.ReadReplicaRouter",
+]
+# Seconds a client keeps reading from the primary after writing
+DATABASE_PRIMARY_PIN_SECONDS = 5
+# Seconds between two `SELECT 1` checks of a replica, per process
+DATABASE_REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Redis is used when REDIS_URL is set, otherwise a per-process LRU memory cache.
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {
+                "MAX_ENTRIES": 10000,
+            },
+        }
+    }
+
+# Token -> user snapshots of CachedTokenAuthentication, see account.authentication.
+# They are dropped on change in TOKEN_AUTH_CACHE only: with Redis every worker
+# sees it at once, with the per-process memory cache the other workers keep
+# serving a deactivated user for up to TOKEN_AUTH_LOCAL_CACHE_TIMEOUT seconds.
+TOKEN_AUTH_CACHE = "default"
+TOKEN_AUTH_CACHE_TIMEOUT = 300
+TOKEN_AUTH_LOCAL_CACHE_TIMEOUT = 10
+
+# Pub/sub feeding the server-sent events streams, see shared.pubsub
+if REDIS_URL:
+    PUBSUB = {
+        "BACKEND": "shared.pubsub.RedisBroker",
+        "OPTIONS": {"url": REDIS_URL},
+    }
+else:
+    PUBSUB = {
+        "BACKEND": "shared.pubsub.InProcessBroker",
+        "OPTIONS": {},
     }
+
+# Storage of the live carts, see order.cart_store. Carts idle for longer than
+# expire_after seconds are written to the database by flush_expired_carts.
+if REDIS_URL:
+    CART_STORE = {
+        "BACKEND": "order.cart_store.RedisCartStore",
+        "OPTIONS": {"url": REDIS_URL, "expire_after": 24 * 60 * 60},
+    }
+else:
+    CART_STORE = {
+        "BACKEND": "order.cart_store.DatabaseCartStore",
+        "OPTIONS": {},
+    }
+
+# Seconds between keep-alive comments on idle order status streams
+ORDER_STREAM_HEARTBEAT = 15
+# Seconds a stream token (see order.utils) can be used to open a stream
+ORDER_STREAM_TOKEN_MAX_AGE = 60
+
+# Seconds a serialized restaurant menu snapshot is kept. Snapshots are versioned
+# by the newest updated_at of the menu, so edits never serve a stale menu.
+MENU_CACHE_TIMEOUT = 60 * 60
+
+# Backend of the menu full-text search, see restaurant.search. Picked from the
+# database vendor when unset: FTS5 on SQLite, LIKE scans otherwise.
+MENU_SEARCH_BACKEND = None
+
+# Days of open slots compiled ahead by restaurant.hours. The rebuild_open_hours
+# command has to run more often than that, daily is the intent.
+OPEN_HOURS_HORIZON_DAYS = 14
+
+# Courier assignment batches, see order.dispatch. Run by the dispatch_deliveries
+# command (with --interval, or from a scheduler every few seconds). "hungarian"
+# requires scipy, numpy is used for the cost matrix when installed.
+DISPATCH = {
+    "MATCHER": "greedy",
+    "BATCH_SIZE": 1000,
+    "MAX_DISTANCE_KM": 15.0,
+    "MAX_ORDERS_PER_COURIER": 1,
+}
+
+# Order / Payment change events, see order.outbox. Readers skip the events of the
+# last SETTLE_SECONDS, compact_outbox keeps acknowledged ones for RETENTION_HOURS.
+OUTBOX = {
+    "BATCH_SIZE": 500,
+    "SETTLE_SECONDS": 2,
+    "RETENTION_HOURS": 24,
+}
+
+# Archival of terminal orders, see order.archive. DATABASE can be another alias
+# of DATABASES holding only the archive table, set up with
+# `migrate order --database <alias>`.
+ORDER_ARCHIVE = {
+    "DATABASE": "default",
+    "MIN_AGE_DAYS": 180,
+    "CHUNK_SIZE": 500,
+}
+
+# Query count / N+1 profiling per request, see shared.profiling. Removed from the
+# middleware stack unless enabled. Tests can set ENFORCE_BUDGETS to fail on
+# views going over their budget.
+QUERY_PROFILING = {
+    "ENABLED": os.environ.get("QUERY_PROFILING") == "1",
+    "DUPLICATE_THRESHOLD": 3,
+    "BUDGETS": {
+        "me.order-list": 3,
+        "me.order-detail": 5,
+        "me.checkout": 12,
+        # On a cache miss: slug, menu version, restaurant and its menu tree
+        "restaurant.menu": 6,
+        "restaurant.nearby": 3,
+        "restaurant.open": 3,
+        "restaurant.menu-item.search": 4,
+        "restaurant.sales": 4,
+    },
+    "ENFORCE_BUDGETS": False,
 }
 
 
 # Settings for DRF
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "account.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -106,7 +243,9 @@ REST_FRAMEWORK = {
         "rest_framework.filters.OrderingFilter",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # Keyset pagination on (created_at, id); small lists can opt in to
+    # shared.pagination.StandardPageNumberPagination instead
+    "DEFAULT_PAGINATION_CLASS": "shared.pagination.KeysetPagination",
     "PAGE_SIZE": 40,
 }
 
@@ -129,6 +268,27 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Batched writing of simple_history rows, see shared.history
+HISTORY_BUFFER = {
+    "ENABLED": os.environ.get("HISTORY_BUFFER_ENABLED") == "1",
+    "DURABLE": True,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_SIZE": 500,
+}
+
+# Days of history kept per model ("app_label.Model") by the prune_history command,
+# see shared.history. Models missing here use "default", None keeps everything.
+HISTORY_RETENTION_DAYS = {
+    "default": 365,
+    "order.Order": 730,
+    "order.Payment": 730,
+}
+
+# Threads verifying passwords for the async login view, and how many
+# verifications (and hash upgrades) may wait for them before logins get a 503
+LOGIN_PASSWORD_VERIFIER_WORKERS = 4
+LOGIN_PASSWORD_VERIFIER_MAX_PENDING = 64
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -147,6 +307,19 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded files (menu and profile images), served by Django only when DEBUG
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Resized variants of the uploaded images, see shared.images. Images whose
+# variants are missing (e.g. older uploads) are processed by process_images.
+IMAGE_VARIANTS = {
+    "SIZES": {"thumbnail": 160, "list": 480, "detail": 1200},
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": 80,
+    "WORKERS": 2,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -12,9 +14,18 @@ urlpatterns = [
     # User related APIs
     # path("api/v1/accounts/", include("account.rest.urls.user")),
     path("api/v1/me/", include("account.rest.urls.me")),
+    # Order related APIs of the logged in user
+    path("api/v1/me/", include("order.rest.urls.me")),
+    # Restaurant related APIs
+    path("api/v1/restaurants/", include("restaurant.rest.urls.restaurant")),
+    # Order reports of a restaurant, for its managers
+    path("api/v1/restaurants/", include("order.rest.urls.restaurant")),
     # Swagger
     path("api/schema", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/docs", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"
     ),
 ]
+
+# Uploaded images, served by the web server in production
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
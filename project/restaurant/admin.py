@@ -1,3 +1,93 @@
 from django.contrib import admin
 
-# Register your models here.
+from shared.admin import ScalableModelAdmin, register_history
+
+from .models import (
+    MenuCategory,
+    MenuItem,
+    Modifier,
+    Restaurant,
+    RestaurantAddress,
+    RestaurantHoursOverride,
+    RestaurantOpeningHours,
+    RestaurantStaff,
+)
+
+
+class RestaurantAddressInline(admin.StackedInline):
+    model = RestaurantAddress
+    extra = 0
+
+
+class RestaurantOpeningHoursInline(admin.TabularInline):
+    model = RestaurantOpeningHours
+    extra = 0
+
+
+class RestaurantHoursOverrideInline(admin.TabularInline):
+    model = RestaurantHoursOverride
+    extra = 0
+
+
+class RestaurantStaffInline(admin.TabularInline):
+    model = RestaurantStaff
+    extra = 0
+    raw_id_fields = ["user"]
+
+
+@admin.register(Restaurant)
+class RestaurantAdmin(ScalableModelAdmin):
+    list_display = ["name", "status", "delivery", "takeaway", "rating_average"]
+    list_filter = ["status", "delivery", "takeaway"]
+    search_fields = ["=uid", "=slug", "name"]
+    readonly_fields = ["uid", "slug", "rating_count", "rating_average"]
+    inlines = [
+        RestaurantAddressInline,
+        RestaurantOpeningHoursInline,
+        RestaurantHoursOverrideInline,
+        RestaurantStaffInline,
+    ]
+
+
+@admin.register(MenuCategory)
+class MenuCategoryAdmin(ScalableModelAdmin):
+    list_display = ["name", "restaurant"]
+    list_select_related = ["restaurant"]
+    search_fields = ["=uid", "=slug"]
+    raw_id_fields = ["restaurant"]
+    readonly_fields = ["uid", "slug"]
+
+
+@admin.register(MenuItem)
+class MenuItemAdmin(ScalableModelAdmin):
+    list_display = ["name", "menu_category", "restaurant", "price", "is_available"]
+    list_filter = ["is_available"]
+    list_select_related = ["menu_category__restaurant"]
+    search_fields = ["=uid", "=slug"]
+    raw_id_fields = ["menu_category"]
+    readonly_fields = ["uid", "slug", "rating_count", "rating_average"]
+
+    @admin.display(ordering="menu_category__restaurant__name")
+    def restaurant(self, obj):
+        return obj.menu_category.restaurant
+
+
+@admin.register(Modifier)
+class ModifierAdmin(ScalableModelAdmin):
+    list_display = ["name", "menu_item", "price"]
+    list_select_related = ["menu_item"]
+    search_fields = ["=uid", "=slug"]
+    raw_id_fields = ["menu_item"]
+    readonly_fields = ["uid", "slug"]
+
+
+register_history(
+    Restaurant,
+    RestaurantStaff,
+    RestaurantAddress,
+    RestaurantOpeningHours,
+    RestaurantHoursOverride,
+    MenuCategory,
+    MenuItem,
+    Modifier,
+)
@@ -0,0 +1,113 @@
+"""
+Grid cell index over RestaurantAddress coordinates.
+
+The world is cut in cells of GRID_CELL_DEGREES x GRID_CELL_DEGREES and every
+address stores the id of its cell (row * GRID_COLUMNS + column) in an indexed
+column. A radius search becomes one indexed range per row of cells covering the
+bounding box, then the exact haversine distance is computed for the few
+candidates left.
+"""
+
+import math
+
+from django.db.models import Q
+
+from shared.choices import StatusChoices
+
+GRID_CELL_DEGREES = 0.01  # ~1.1 km of latitude
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEGREES))
+EARTH_RADIUS_KM = 6371.0088
+# Length of a degree of latitude on the sphere haversine_km measures on
+KM_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM
+
+
+def get_grid_row(latitude):
+    return int(math.floor((float(latitude) + 90) / GRID_CELL_DEGREES))
+
+
+def get_grid_column(longitude):
+    column = int(math.floor((float(longitude) + 180) / GRID_CELL_DEGREES))
+    return min(max(column, 0), GRID_COLUMNS - 1)
+
+
+def get_grid_cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return get_grid_row(latitude) * GRID_COLUMNS + get_grid_column(longitude)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def get_bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) around a point. Does not wrap the antimeridian."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    # Degrees of longitude are shortest at the latitude of the box nearest to
+    # the pole, sizing the box there keeps every point of the circle inside
+    polar_latitude = min(abs(latitude) + lat_delta, 90)
+    cos_lat = max(math.cos(math.radians(polar_latitude)), 1e-6)
+    lng_delta = min(radius_km / (KM_PER_DEGREE * cos_lat), 180)
+    return (
+        max(latitude - lat_delta, -90),
+        min(latitude + lat_delta, 90),
+        max(longitude - lng_delta, -180),
+        min(longitude + lng_delta, 180),
+    )
+
+
+def get_grid_cell_filter(min_lat, max_lat, min_lng, max_lng):
+    """One indexed range of grid_cell per row of cells covering the bounding box"""
+    first_column = get_grid_column(min_lng)
+    last_column = get_grid_column(max_lng)
+    cell_filter = Q()
+    for row in range(get_grid_row(min_lat), get_grid_row(max_lat) + 1):
+        cell_filter |= Q(
+            grid_cell__range=(
+                row * GRID_COLUMNS + first_column,
+                row * GRID_COLUMNS + last_column,
+            )
+        )
+    return cell_filter
+
+
+def find_nearby_restaurants(latitude, longitude, radius_km, limit=50):
+    """
+    Return [(restaurant, distance_km)] of active delivering restaurants within
+    radius_km of the point, closest first.
+    """
+    # Imported here since models use get_grid_cell on save
+    from .models import Restaurant, RestaurantAddress
+
+    min_lat, max_lat, min_lng, max_lng = get_bounding_box(
+        latitude, longitude, radius_km
+    )
+    candidates = (
+        RestaurantAddress.objects.filter(
+            get_grid_cell_filter(min_lat, max_lat, min_lng, max_lng),
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng),
+            restaurant__status=StatusChoices.ACTIVE,
+            restaurant__delivery=True,
+        )
+        .values_list("restaurant_id", "latitude", "longitude")
+        .iterator()
+    )
+
+    # A restaurant with many branches is as close as its closest branch
+    distances = {}
+    for restaurant_id, address_lat, address_lng in candidates:
+        distance = haversine_km(
+            latitude, longitude, float(address_lat), float(address_lng)
+        )
+        if distance <= radius_km and distance < distances.get(restaurant_id, math.inf):
+            distances[restaurant_id] = distance
+
+    closest = sorted(distances.items(), key=lambda item: item[1])[:limit]
+    restaurants = Restaurant.objects.in_bulk([pk for pk, _ in closest])
+    return [(restaurants[pk], distance) for pk, distance in closest if pk in restaurants]
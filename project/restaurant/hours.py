@@ -0,0 +1,168 @@
+"""
+Precomputed "open now" lookups.
+
+The weekly schedule (RestaurantOpeningHours), the holiday overrides
+(RestaurantHoursOverride) and, for restaurants without a weekly schedule, the
+legacy opening_time/closing_time are compiled into RestaurantOpenSlot rows
+covering the next OPEN_HOURS_HORIZON_DAYS days. Each row holds the open minutes
+of a restaurant within one absolute hour, so "open at t" is a single index
+lookup on (hour, start_minute, end_minute).
+
+Slots are recompiled whenever a schedule changes (restaurant.signals) and have
+to be rolled forward daily with `manage.py rebuild_open_hours`.
+
+Schedules are read in the TIME_ZONE of the project.
+"""
+
+import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import (
+    Restaurant,
+    RestaurantHoursOverride,
+    RestaurantOpeningHours,
+    RestaurantOpenSlot,
+)
+
+MINUTES_PER_HOUR = 60
+
+
+def get_open_hours_horizon():
+    return getattr(settings, "OPEN_HOURS_HORIZON_DAYS", 14)
+
+
+def get_epoch_minutes(moment):
+    return int(moment.timestamp() // 60)
+
+
+def get_hour_and_minute(moment):
+    return divmod(get_epoch_minutes(moment), MINUTES_PER_HOUR)
+
+
+def get_day_spans(restaurant, day, weekly_spans, overrides):
+    """(opens_at, closes_at) pairs starting on the given local date"""
+    override = overrides.get(day)
+    if override is not None:
+        if override.is_closed or override.opens_at is None:
+            return []
+        return [(override.opens_at, override.closes_at)]
+    if weekly_spans:
+        return weekly_spans.get(day.weekday(), [])
+    if restaurant.opening_time is not None and restaurant.closing_time is not None:
+        return [(restaurant.opening_time, restaurant.closing_time)]
+    return []
+
+
+def get_open_intervals(restaurant, first_day, days):
+    """Merged [start, end) epoch minute intervals the restaurant is open"""
+    tz = timezone.get_current_timezone()
+    weekly_spans = {}
+    for hours in restaurant.opening_hours.all():
+        weekly_spans.setdefault(hours.weekday, []).append(
+            (hours.opens_at, hours.closes_at)
+        )
+    overrides = {
+        override.date: override for override in restaurant.hours_overrides.all()
+    }
+
+    intervals = []
+    # Start a day early for the spans of yesterday running past midnight
+    for offset in range(-1, days):
+        day = first_day + datetime.timedelta(days=offset)
+        for opens_at, closes_at in get_day_spans(
+            restaurant, day, weekly_spans, overrides
+        ):
+            # Closing at or before the opening time means the next day
+            closing_day = day if closes_at > opens_at else day + datetime.timedelta(1)
+            start = timezone.make_aware(datetime.datetime.combine(day, opens_at), tz)
+            end = timezone.make_aware(
+                datetime.datetime.combine(closing_day, closes_at), tz
+            )
+            intervals.append((get_epoch_minutes(start), get_epoch_minutes(end)))
+
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def get_open_slots(restaurant, first_day, days, from_hour):
+    slots = []
+    for start, end in get_open_intervals(restaurant, first_day, days):
+        start = max(start, from_hour * MINUTES_PER_HOUR)
+        while start < end:
+            hour, start_minute = divmod(start, MINUTES_PER_HOUR)
+            end_minute = min(end - hour * MINUTES_PER_HOUR, MINUTES_PER_HOUR)
+            slots.append(
+                RestaurantOpenSlot(
+                    restaurant=restaurant,
+                    hour=hour,
+                    start_minute=start_minute,
+                    end_minute=end_minute,
+                )
+            )
+            start = (hour + 1) * MINUTES_PER_HOUR
+    return slots
+
+
+def rebuild_open_hours(restaurant_ids=None, now=None, chunk_size=500):
+    """
+    Recompile the open slots of the given restaurants (all when None) from now
+    to the end of the horizon. Returns the number of slots written.
+    """
+    now = now or timezone.now()
+    days = get_open_hours_horizon()
+    first_day = timezone.localdate(now)
+    from_hour = get_hour_and_minute(now)[0]
+
+    restaurants = (
+        Restaurant.objects.only("id", "opening_time", "closing_time")
+        .prefetch_related(
+            Prefetch("opening_hours", queryset=RestaurantOpeningHours.objects.all()),
+            Prefetch(
+                "hours_overrides",
+                queryset=RestaurantHoursOverride.objects.filter(
+                    date__gte=first_day - datetime.timedelta(1),
+                    date__lt=first_day + datetime.timedelta(days),
+                ),
+            ),
+        )
+        .order_by("pk")
+    )
+    if restaurant_ids is not None:
+        restaurants = restaurants.filter(pk__in=restaurant_ids)
+
+    count = 0
+    restaurants = restaurants.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(restaurants, chunk_size)):
+        slots = []
+        for restaurant in chunk:
+            slots += get_open_slots(restaurant, first_day, days, from_hour)
+        with transaction.atomic():
+            RestaurantOpenSlot.objects.filter(restaurant__in=chunk).delete()
+            RestaurantOpenSlot.objects.bulk_create(slots, batch_size=chunk_size)
+        count += len(slots)
+
+    if restaurant_ids is None:
+        # Past hours are never looked up again
+        RestaurantOpenSlot.objects.filter(hour__lt=from_hour).delete()
+    return count
+
+
+def filter_open_restaurants(queryset, moment=None):
+    """Restaurants of the queryset open at the given moment (now by default)"""
+    hour, minute = get_hour_and_minute(moment or timezone.now())
+    # Slots of a restaurant never overlap, so the join yields no duplicates
+    return queryset.filter(
+        open_slots__hour=hour,
+        open_slots__start_minute__lte=minute,
+        open_slots__end_minute__gt=minute,
+    )
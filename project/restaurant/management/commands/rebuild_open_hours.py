@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.hours import get_open_hours_horizon, rebuild_open_hours
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the open slots of every restaurant for the coming days. "
+        "Run it at least daily so the slots keep covering the horizon."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_open_hours(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{count} open slots compiled for the next "
+                f"{get_open_hours_horizon()} days."
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurant.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the menu items from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            get_search_backend().rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,129 @@
+"""Building and caching of the full menu tree of a restaurant"""
+
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, OuterRef, Prefetch, Subquery
+from django.utils import timezone
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import MenuCategory, MenuItem, Modifier, Restaurant
+
+MENU_VERSION_CACHE_KEY = "menu:version:{restaurant_id}"
+MENU_CACHE_KEY = "menu:{restaurant_id}:{version}"
+
+
+def get_menu_cache_timeout():
+    return getattr(settings, "MENU_CACHE_TIMEOUT", 60 * 60)
+
+
+def to_version(timestamp):
+    return int(timestamp.timestamp() * 1_000_000)
+
+
+def get_menu_queryset():
+    """Restaurant queryset with the whole menu tree prefetched in 3 extra queries"""
+    modifiers = Modifier.objects.order_by("name", "id")
+    menu_items = MenuItem.objects.order_by("name", "id").prefetch_related(
+        Prefetch("modifiers", queryset=modifiers)
+    )
+    menu_categories = MenuCategory.objects.order_by("name", "id").prefetch_related(
+        Prefetch("menu_items", queryset=menu_items)
+    )
+    return Restaurant.objects.prefetch_related(
+        Prefetch("menu_categories", queryset=menu_categories)
+    )
+
+
+def compute_menu_version(restaurant_id):
+    """Newest updated_at over the restaurant and its menu, in a single query"""
+
+    def newest(queryset, restaurant_lookup):
+        return Subquery(
+            queryset.filter(**{restaurant_lookup: OuterRef("pk")})
+            .values(restaurant_lookup)
+            .annotate(newest=Max("updated_at"))
+            .values("newest")
+        )
+
+    row = (
+        Restaurant.objects.filter(pk=restaurant_id)
+        .annotate(
+            newest_category=newest(MenuCategory.objects, "restaurant"),
+            newest_item=newest(MenuItem.objects, "menu_category__restaurant"),
+            newest_modifier=newest(
+                Modifier.objects, "menu_item__menu_category__restaurant"
+            ),
+        )
+        .values("updated_at", "newest_category", "newest_item", "newest_modifier")
+        .first()
+    )
+    if row is None:
+        return None
+    return to_version(max(value for value in row.values() if value is not None))
+
+
+def get_menu_version(restaurant_id):
+    version_key = MENU_VERSION_CACHE_KEY.format(restaurant_id=restaurant_id)
+    version = cache.get(version_key)
+    if version is None:
+        version = compute_menu_version(restaurant_id)
+        if version is not None:
+            cache.add(version_key, version, timeout=None)
+    return version
+
+
+def bump_menu_version(restaurant_id, timestamp=None):
+    """Point the restaurant to a new menu version, orphaning the old snapshot"""
+    version = to_version(timestamp or timezone.now())
+    cache.set(
+        MENU_VERSION_CACHE_KEY.format(restaurant_id=restaurant_id),
+        version,
+        timeout=None,
+    )
+
+
+def get_menu(restaurant_id):
+    """
+    Return the serialized menu of a restaurant as a JSON string, building it
+    with a fixed number of queries on a cache miss.
+    """
+    # Imported here since serializers import the models of this app
+    from .rest.serializers.menu import RestaurantMenuSerializer
+
+    version = get_menu_version(restaurant_id)
+    if version is None:
+        return None
+
+    menu_key = MENU_CACHE_KEY.format(restaurant_id=restaurant_id, version=version)
+    menu = cache.get(menu_key)
+    if menu is None:
+        restaurant = get_menu_queryset().filter(pk=restaurant_id).first()
+        if restaurant is None:
+            return None
+        menu = json.dumps(RestaurantMenuSerializer(restaurant).data, cls=JSONEncoder)
+        cache.set(menu_key, menu, timeout=get_menu_cache_timeout())
+    return menu
+
+
+def get_restaurant_id_for_menu_object(instance):
+    """Resolve the restaurant that a menu model instance belongs to"""
+    if isinstance(instance, Restaurant):
+        return instance.pk
+    if isinstance(instance, MenuCategory):
+        return instance.restaurant_id
+    if isinstance(instance, MenuItem):
+        return (
+            MenuCategory.objects.filter(pk=instance.menu_category_id)
+            .values_list("restaurant_id", flat=True)
+            .first()
+        )
+    if isinstance(instance, Modifier):
+        return (
+            MenuItem.objects.filter(pk=instance.menu_item_id)
+            .values_list("menu_category__restaurant_id", flat=True)
+            .first()
+        )
+    return None
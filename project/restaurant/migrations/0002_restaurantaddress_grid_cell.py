@@ -0,0 +1,57 @@
+# Generated by Django 5.1 on 2026-10-18 13:08
+
+import math
+
+from django.db import migrations, models
+
+# Frozen copy of restaurant.geo.get_grid_cell as of this migration, so later
+# changes to the grid can not change what this migration writes
+GRID_CELL_DEGREES = 0.01
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEGREES))
+
+
+def get_grid_cell(latitude, longitude):
+    row = int(math.floor((float(latitude) + 90) / GRID_CELL_DEGREES))
+    column = int(math.floor((float(longitude) + 180) / GRID_CELL_DEGREES))
+    return row * GRID_COLUMNS + min(max(column, 0), GRID_COLUMNS - 1)
+
+
+def backfill_grid_cells(apps, schema_editor):
+    RestaurantAddress = apps.get_model("restaurant", "RestaurantAddress")
+    addresses = RestaurantAddress.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).only("id", "latitude", "longitude")
+
+    batch = []
+    for address in addresses.iterator(chunk_size=2000):
+        address.grid_cell = get_grid_cell(address.latitude, address.longitude)
+        batch.append(address)
+        if len(batch) >= 2000:
+            RestaurantAddress.objects.bulk_update(batch, ["grid_cell"])
+            batch = []
+    RestaurantAddress.objects.bulk_update(batch, ["grid_cell"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalrestaurantaddress',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurantaddress',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantaddress',
+            index=models.Index(fields=['grid_cell', 'latitude', 'longitude', 'restaurant'], name='address_grid_cell_idx'),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+SEARCH_TABLE = "restaurant_menuitem_search"
+SEARCH_VOCAB_TABLE = "restaurant_menuitem_search_vocab"
+
+
+def create_search_index(apps, schema_editor):
+    # The FTS5 index only exists on SQLite, other databases use another backend
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "name, description, category, modifiers, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_VOCAB_TABLE} "
+        f"USING fts5vocab({SEARCH_TABLE}, 'row')"
+    )
+
+    MenuItem = apps.get_model("restaurant", "MenuItem")
+    menu_items = MenuItem.objects.select_related("menu_category").prefetch_related(
+        "modifiers"
+    )
+    rows = (
+        (
+            menu_item.pk,
+            menu_item.name,
+            menu_item.description or "",
+            menu_item.menu_category.name,
+            " ".join(modifier.name for modifier in menu_item.modifiers.all()),
+        )
+        for menu_item in menu_items.iterator(chunk_size=2000)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} "
+            "(rowid, name, description, category, modifiers) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            list(rows),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_VOCAB_TABLE}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurant", "0003_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
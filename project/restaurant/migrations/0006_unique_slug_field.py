@@ -0,0 +1,54 @@
+# Generated by Django 5.1 on 2026-10-18 13:54
+
+import shared.slugs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_open_hours'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicalmenucategory',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name'),
+        ),
+        migrations.AlterField(
+            model_name='historicalmenuitem',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name'),
+        ),
+        migrations.AlterField(
+            model_name='historicalmodifier',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name'),
+        ),
+        migrations.AlterField(
+            model_name='historicalrestaurant',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name'),
+        ),
+        migrations.AlterField(
+            model_name='menucategory',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name', unique=True),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name', unique=True),
+        ),
+        migrations.AlterField(
+            model_name='modifier',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name', unique=True),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='slug',
+            field=shared.slugs.UniqueSlugField(editable=False, populate_from='name', unique=True),
+        ),
+    ]
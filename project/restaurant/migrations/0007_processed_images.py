@@ -0,0 +1,34 @@
+# Generated by Django 5.1 on 2026-10-18 14:00
+
+import shared.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_unique_slug_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='modifier',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='image',
+            field=shared.images.ProcessedImageField(blank=True, null=True, upload_to='menu_items/', variants_field='image_variants'),
+        ),
+        migrations.AlterField(
+            model_name='modifier',
+            name='image',
+            field=shared.images.ProcessedImageField(blank=True, null=True, upload_to='modifiers/', variants_field='image_variants'),
+        ),
+    ]
@@ -1,16 +1,24 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
 from django.contrib.auth import get_user_model
 
 from phonenumber_field.modelfields import PhoneNumberField
 
-from simple_history.models import HistoricalRecords
-
+from shared.history import BufferedHistoricalRecords
+from shared.images import ProcessedImageField
 from shared.models import BaseModelWithUID ,BaseModelWithUidAndSlug
-from shared.choices import StatusChoices, StaffRoleChoices
+from shared.choices import StatusChoices, StaffRoleChoices, WeekdayChoices
+
+from .geo import get_grid_cell
 
 User = get_user_model()
 
+# Denormalized rating aggregates, kept out of the history tables, see order.ratings
+RATING_FIELDS = ["rating_count", "rating_sum", "rating_average"]
+# Generated from the image, see shared.images
+IMAGE_VARIANT_FIELDS = ["image_variants"]
+
 
 class Restaurant(BaseModelWithUidAndSlug):
     CEO_name = models.CharField(max_length=30)
@@ -35,9 +43,20 @@ class Restaurant(BaseModelWithUidAndSlug):
     closing_time = models.TimeField(null=True, blank=True)
     delivery = models.BooleanField(default=False)
     takeaway = models.BooleanField(default=False)
+    # Maintained from CustomerFeedback, see order.ratings
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveBigIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords(excluded_fields=RATING_FIELDS)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "-rating_average"], name="restaurant_top_rated_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -73,7 +92,7 @@ class RestaurantStaff(models.Model):
     )
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
 
     def __str__(self):
         return f"{self.user.get_name()} - {self.role} at {self.restaurant.name}"
@@ -93,19 +112,118 @@ class RestaurantAddress(BaseModelWithUID):
         max_digits=9, decimal_places=6, null=True, blank=True
     )
     country = models.CharField(max_length=100)
+    # Derived from latitude/longitude on save, see restaurant.geo
+    grid_cell = models.BigIntegerField(null=True, blank=True, editable=False)
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
+
+    class Meta:
+        indexes = [
+            # Covers the nearby search: cell ranges + bounding box without table lookups
+            models.Index(
+                fields=["grid_cell", "latitude", "longitude", "restaurant"],
+                name="address_grid_cell_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.street}, {self.city}, {self.country}"
 
+    def save(self, *args, **kwargs):
+        self.grid_cell = get_grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "grid_cell"}
+        super().save(*args, **kwargs)
+
+
+class RestaurantOpeningHours(BaseModelWithUID):
+    """Weekly schedule, a closing time before the opening time spans midnight"""
+
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="opening_hours"
+    )
+    weekday = models.PositiveSmallIntegerField(choices=WeekdayChoices.choices)
+    opens_at = models.TimeField()
+    closes_at = models.TimeField()
+
+    # simple history
+    history = BufferedHistoricalRecords()
+
+    class Meta:
+        ordering = ["weekday", "opens_at"]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.opens_at}-{self.closes_at}"
+
+
+class RestaurantHoursOverride(BaseModelWithUID):
+    """Holiday or special hours, replacing the weekly schedule for one date"""
+
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="hours_overrides"
+    )
+    date = models.DateField()
+    is_closed = models.BooleanField(default=False)
+    opens_at = models.TimeField(null=True, blank=True)
+    closes_at = models.TimeField(null=True, blank=True)
+    note = models.CharField(max_length=255, null=True, blank=True)
+
+    # simple history
+    history = BufferedHistoricalRecords()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "date"], name="unique_hours_override_date"
+            ),
+        ]
+
+    def __str__(self):
+        if self.is_closed:
+            return f"{self.date} closed"
+        return f"{self.date} {self.opens_at}-{self.closes_at}"
+
+    def clean(self):
+        if not self.is_closed and (self.opens_at is None or self.closes_at is None):
+            raise ValidationError(
+                "Opening and closing times are required unless closed all day."
+            )
+
+
+class RestaurantOpenSlot(models.Model):
+    """
+    Minutes a restaurant is open within one hour, compiled from its schedule by
+    restaurant.hours. Checking "open now" is an equality on the hour plus a
+    range on the minute.
+    """
+
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="open_slots"
+    )
+    # Hours since the epoch (UTC), minutes within that hour, end excluded
+    hour = models.IntegerField()
+    start_minute = models.PositiveSmallIntegerField()
+    end_minute = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["hour", "start_minute", "end_minute", "restaurant"],
+                name="open_slot_lookup_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hour}: {self.start_minute}-{self.end_minute}"
+
 
 class MenuCategory(BaseModelWithUidAndSlug):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_categories')
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
 
     def __str__(self):
         return self.name
@@ -116,10 +234,27 @@ class MenuItem(BaseModelWithUidAndSlug):
     description = models.TextField(null=True, blank=True)
     menu_category = models.ForeignKey(MenuCategory, on_delete=models.CASCADE, related_name='menu_items')
     is_available = models.BooleanField(default=True)
-    image = models.ImageField(upload_to='menu_items/', null=True, blank=True)
+    image = ProcessedImageField(
+        upload_to="menu_items/", null=True, blank=True, variants_field="image_variants"
+    )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Maintained from CustomerFeedback, see order.ratings
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveBigIntegerField(default=0, editable=False)
+    rating_average = models.FloatField(default=0, editable=False)
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords(
+        excluded_fields=RATING_FIELDS + IMAGE_VARIANT_FIELDS
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["is_available", "-rating_average"],
+                name="menuitem_top_rated_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -128,10 +263,13 @@ class MenuItem(BaseModelWithUidAndSlug):
 class Modifier(BaseModelWithUidAndSlug):
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='modifiers')
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    image = models.ImageField(upload_to='modifiers/', null=True, blank=True)
+    image = ProcessedImageField(
+        upload_to="modifiers/", null=True, blank=True, variants_field="image_variants"
+    )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # simple history
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords(excluded_fields=IMAGE_VARIANT_FIELDS)
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,24 @@
+from rest_framework.permissions import BasePermission
+
+from shared.choices import StaffRoleChoices, StatusChoices
+
+from .models import RestaurantStaff
+
+MANAGER_ROLES = (StaffRoleChoices.OWNER, StaffRoleChoices.MANAGER)
+
+
+class IsRestaurantManager(BasePermission):
+    """Admin users, or active owners / managers of the restaurant of the `slug`"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff:
+            return True
+        return RestaurantStaff.objects.filter(
+            restaurant__slug=view.kwargs["slug"],
+            user=user,
+            role__in=MANAGER_ROLES,
+            status=StatusChoices.ACTIVE,
+        ).exists()
@@ -0,0 +1,59 @@
+from rest_framework import serializers
+
+from shared.serializers import ImageVariantsField
+
+from ...models import MenuCategory, MenuItem, Modifier, Restaurant
+
+
+class MenuModifierSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = Modifier
+        fields = ["uid", "slug", "name", "price", "image", "image_variants"]
+
+
+class MenuItemSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+    modifiers = MenuModifierSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MenuItem
+        fields = [
+            "uid",
+            "slug",
+            "name",
+            "description",
+            "price",
+            "is_available",
+            "image",
+            "image_variants",
+            "modifiers",
+        ]
+
+
+class MenuCategorySerializer(serializers.ModelSerializer):
+    menu_items = MenuItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MenuCategory
+        fields = ["uid", "slug", "name", "menu_items"]
+
+
+class RestaurantMenuSerializer(serializers.ModelSerializer):
+    """Whole menu tree of a restaurant. Expects the tree to be prefetched."""
+
+    menu_categories = MenuCategorySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Restaurant
+        fields = [
+            "uid",
+            "slug",
+            "name",
+            "opening_time",
+            "closing_time",
+            "delivery",
+            "takeaway",
+            "menu_categories",
+        ]
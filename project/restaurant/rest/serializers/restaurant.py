@@ -0,0 +1,87 @@
+from rest_framework import serializers
+
+from shared.serializers import ImageVariantsField
+
+from ...models import MenuItem, Restaurant
+
+
+class NearbyRestaurantQuerySerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(
+        min_value=0.1, max_value=50, default=5, help_text="Radius in kilometers"
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=50)
+
+
+class RestaurantListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Restaurant
+        fields = [
+            "uid",
+            "slug",
+            "name",
+            "summary",
+            "opening_time",
+            "closing_time",
+            "delivery",
+            "takeaway",
+            "rating_count",
+            "rating_average",
+        ]
+
+
+class NearbyRestaurantSerializer(RestaurantListSerializer):
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(RestaurantListSerializer.Meta):
+        fields = RestaurantListSerializer.Meta.fields + ["distance_km"]
+
+    def get_distance_km(self, obj) -> float:
+        return round(obj.distance_km, 3)
+
+
+class TopRatedQuerySerializer(serializers.Serializer):
+    min_ratings = serializers.IntegerField(min_value=0, default=1)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class TopRatedMenuItemSerializer(serializers.ModelSerializer):
+    restaurant_slug = serializers.CharField(
+        source="menu_category.restaurant.slug", read_only=True
+    )
+    restaurant_name = serializers.CharField(
+        source="menu_category.restaurant.name", read_only=True
+    )
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = MenuItem
+        fields = [
+            "uid",
+            "slug",
+            "name",
+            "price",
+            "image",
+            "image_variants",
+            "restaurant_slug",
+            "restaurant_name",
+            "rating_count",
+            "rating_average",
+        ]
+
+
+class MenuSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+    offset = serializers.IntegerField(min_value=0, max_value=500, default=0)
+
+
+class MenuItemSearchSerializer(TopRatedMenuItemSerializer):
+    class Meta(TopRatedMenuItemSerializer.Meta):
+        fields = TopRatedMenuItemSerializer.Meta.fields + ["description"]
+
+
+class OpenRestaurantQuerySerializer(serializers.Serializer):
+    delivery = serializers.BooleanField(default=None, allow_null=True)
+    takeaway = serializers.BooleanField(default=None, allow_null=True)
@@ -0,0 +1,141 @@
+import math
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from restaurant.geo import (
+    EARTH_RADIUS_KM,
+    KM_PER_DEGREE,
+    find_nearby_restaurants,
+    get_bounding_box,
+    get_grid_cell,
+    haversine_km,
+)
+from restaurant.models import RestaurantAddress
+from shared.choices import StatusChoices
+from shared.tests.factories import make_client, make_restaurant, make_user
+
+
+def destination(latitude, longitude, bearing, distance_km):
+    """Point distance_km away from (latitude, longitude) heading to bearing degrees"""
+    lat, lng, bearing = map(math.radians, (latitude, longitude, bearing))
+    angle = distance_km / EARTH_RADIUS_KM
+    lat2 = math.asin(
+        math.sin(lat) * math.cos(angle)
+        + math.cos(lat) * math.sin(angle) * math.cos(bearing)
+    )
+    lng2 = lng + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat),
+        math.cos(angle) - math.sin(lat) * math.sin(lat2),
+    )
+    return math.degrees(lat2), math.degrees(lng2)
+
+
+class BoundingBoxTests(SimpleTestCase):
+    def test_degree_matches_haversine(self):
+        self.assertAlmostEqual(haversine_km(0, 0, 1, 0), KM_PER_DEGREE, places=9)
+        self.assertAlmostEqual(haversine_km(10, 20, 11, 20), KM_PER_DEGREE, places=9)
+
+    def test_box_contains_the_circle(self):
+        for latitude in (0, 23.8, -45, 60, 75, -80):
+            for radius in (0.5, 5, 50):
+                min_lat, max_lat, min_lng, max_lng = get_bounding_box(
+                    latitude, 90.4, radius
+                )
+                for bearing in range(0, 360, 5):
+                    # A hair inside, the north and south points are the box edges
+                    lat, lng = destination(
+                        latitude, 90.4, bearing, radius * 0.999999
+                    )
+                    with self.subTest(latitude=latitude, bearing=bearing):
+                        self.assertTrue(min_lat <= lat <= max_lat)
+                        self.assertTrue(min_lng <= lng <= max_lng)
+
+    def test_box_is_clamped_at_the_pole(self):
+        min_lat, max_lat, min_lng, max_lng = get_bounding_box(89.99, 0, 50)
+        self.assertEqual(max_lat, 90)
+        self.assertEqual((min_lng, max_lng), (-180, 180))
+
+
+class NearbyRestaurantTests(TestCase):
+    def setUp(self):
+        self.latitude, self.longitude = 23.8103, 90.4125
+
+    def add_restaurant(self, name, bearing, distance_km, **kwargs):
+        kwargs.setdefault("delivery", True)
+        restaurant = make_restaurant(name, **kwargs)
+        self.add_address(restaurant, bearing, distance_km)
+        return restaurant
+
+    def add_address(self, restaurant, bearing, distance_km):
+        latitude, longitude = destination(
+            self.latitude, self.longitude, bearing, distance_km
+        )
+        return RestaurantAddress.objects.create(
+            restaurant=restaurant,
+            country="Bangladesh",
+            latitude=round(latitude, 6),
+            longitude=round(longitude, 6),
+        )
+
+    def test_grid_cell_saved_with_the_address(self):
+        restaurant = self.add_restaurant("Near", 0, 1)
+        address = RestaurantAddress.objects.get(restaurant=restaurant)
+        self.assertEqual(
+            address.grid_cell, get_grid_cell(address.latitude, address.longitude)
+        )
+
+    def test_closest_first_within_radius(self):
+        far = self.add_restaurant("Far", 90, 4)
+        near = self.add_restaurant("Near", 180, 1)
+        self.add_restaurant("Outside", 270, 6)
+
+        found = find_nearby_restaurants(self.latitude, self.longitude, 5)
+        self.assertEqual([restaurant for restaurant, _ in found], [near, far])
+        self.assertAlmostEqual(found[0][1], 1, places=2)
+        self.assertAlmostEqual(found[1][1], 4, places=2)
+
+    def test_edge_of_the_radius_at_high_latitude(self):
+        self.latitude = 70
+        restaurants = [
+            self.add_restaurant(f"Edge {bearing}", bearing, 49.9)
+            for bearing in range(0, 360, 45)
+        ]
+        found = find_nearby_restaurants(self.latitude, self.longitude, 50)
+        self.assertCountEqual([restaurant for restaurant, _ in found], restaurants)
+
+    def test_closest_branch_and_limit(self):
+        chain = self.add_restaurant("Chain", 0, 3)
+        self.add_address(chain, 90, 0.5)
+        self.add_restaurant("Other", 180, 1)
+
+        found = find_nearby_restaurants(self.latitude, self.longitude, 5, limit=1)
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0][0], chain)
+        self.assertAlmostEqual(found[0][1], 0.5, places=2)
+
+    def test_inactive_and_not_delivering_excluded(self):
+        self.add_restaurant("Closed", 0, 1, status=StatusChoices.INACTIVE)
+        self.add_restaurant("Takeaway", 0, 1, delivery=False)
+        self.assertEqual(find_nearby_restaurants(self.latitude, self.longitude, 5), [])
+
+    def test_nearby_endpoint(self):
+        near = self.add_restaurant("Near", 0, 2)
+        self.add_restaurant("Outside", 0, 20)
+        client = make_client(make_user())
+
+        response = client.get(
+            reverse("restaurant.nearby"),
+            {"latitude": self.latitude, "longitude": self.longitude, "radius": 5},
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([row["slug"] for row in body], [near.slug])
+        self.assertAlmostEqual(body[0]["distance_km"], 2, places=2)
+
+    def test_nearby_endpoint_validates_the_point(self):
+        client = make_client(make_user())
+        response = client.get(
+            reverse("restaurant.nearby"), {"latitude": 91, "longitude": 0}
+        )
+        self.assertEqual(response.status_code, 400)
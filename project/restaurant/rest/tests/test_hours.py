@@ -0,0 +1,218 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant.hours import (
+    filter_open_restaurants,
+    get_hour_and_minute,
+    rebuild_open_hours,
+)
+from restaurant.models import (
+    Restaurant,
+    RestaurantHoursOverride,
+    RestaurantOpeningHours,
+    RestaurantOpenSlot,
+)
+from shared.choices import StatusChoices, WeekdayChoices
+from shared.tests.factories import make_client, make_restaurant
+
+# A Monday
+MONDAY = datetime.date(2026, 3, 2)
+
+
+def at(day, hour, minute=0):
+    """Aware datetime of the given local time, days counted from MONDAY"""
+    return timezone.make_aware(
+        datetime.datetime.combine(
+            MONDAY + datetime.timedelta(days=day), datetime.time(hour, minute)
+        )
+    )
+
+
+class OpenHoursTests(TestCase):
+    def setUp(self):
+        self.restaurant = make_restaurant()
+
+    def add_hours(self, weekday, opens_at, closes_at):
+        RestaurantOpeningHours.objects.create(
+            restaurant=self.restaurant,
+            weekday=weekday,
+            opens_at=datetime.time(*opens_at),
+            closes_at=datetime.time(*closes_at),
+        )
+
+    def is_open(self, moment):
+        rebuild_open_hours(now=at(0, 0))
+        restaurants = filter_open_restaurants(Restaurant.objects.all(), moment)
+        return restaurants.filter(pk=self.restaurant.pk).exists()
+
+    def test_legacy_opening_time(self):
+        self.restaurant.opening_time = datetime.time(9)
+        self.restaurant.closing_time = datetime.time(17, 30)
+        self.restaurant.save()
+        self.assertFalse(self.is_open(at(2, 8, 59)))
+        self.assertTrue(self.is_open(at(2, 9)))
+        self.assertTrue(self.is_open(at(2, 17, 29)))
+        self.assertFalse(self.is_open(at(2, 17, 30)))
+
+    def test_no_schedule_never_open(self):
+        self.assertFalse(self.is_open(at(0, 12)))
+        self.assertFalse(RestaurantOpenSlot.objects.exists())
+
+    def test_weekly_schedule_replaces_legacy_time(self):
+        self.restaurant.opening_time = datetime.time(9)
+        self.restaurant.closing_time = datetime.time(17)
+        self.restaurant.save()
+        self.add_hours(WeekdayChoices.MONDAY, (11,), (14,))
+        self.add_hours(WeekdayChoices.MONDAY, (18,), (22,))
+        self.assertFalse(self.is_open(at(0, 10)))
+        self.assertTrue(self.is_open(at(0, 12)))
+        self.assertFalse(self.is_open(at(0, 16)))
+        self.assertTrue(self.is_open(at(0, 21, 59)))
+        # Other days have no hours in the weekly schedule
+        self.assertFalse(self.is_open(at(1, 12)))
+        self.assertTrue(self.is_open(at(7, 12)))
+
+    def test_overnight_span(self):
+        self.add_hours(WeekdayChoices.FRIDAY, (20,), (2,))
+        self.assertFalse(self.is_open(at(4, 1)))
+        self.assertTrue(self.is_open(at(4, 23)))
+        self.assertTrue(self.is_open(at(5, 1, 59)))
+        self.assertFalse(self.is_open(at(5, 2)))
+
+    def test_overlapping_spans_merged(self):
+        self.add_hours(WeekdayChoices.MONDAY, (10,), (14,))
+        self.add_hours(WeekdayChoices.MONDAY, (13,), (15,))
+        self.add_hours(WeekdayChoices.SUNDAY, (22,), (11,))
+        rebuild_open_hours(now=at(0, 0))
+        # One slot per hour at most, so the open query yields no duplicates
+        hour, _ = get_hour_and_minute(at(0, 13))
+        self.assertEqual(RestaurantOpenSlot.objects.filter(hour=hour).count(), 1)
+        self.assertEqual(
+            list(filter_open_restaurants(Restaurant.objects.all(), at(0, 10, 30))),
+            [self.restaurant],
+        )
+
+    def test_holiday_and_special_hours(self):
+        self.add_hours(WeekdayChoices.MONDAY, (9,), (17,))
+        self.add_hours(WeekdayChoices.TUESDAY, (9,), (17,))
+        RestaurantHoursOverride.objects.create(
+            restaurant=self.restaurant, date=MONDAY, is_closed=True
+        )
+        RestaurantHoursOverride.objects.create(
+            restaurant=self.restaurant,
+            date=MONDAY + datetime.timedelta(days=1),
+            opens_at=datetime.time(12),
+            closes_at=datetime.time(14),
+        )
+        self.assertFalse(self.is_open(at(0, 10)))
+        self.assertFalse(self.is_open(at(1, 10)))
+        self.assertTrue(self.is_open(at(1, 13)))
+        self.assertTrue(self.is_open(at(7, 10)))
+
+    def test_override_without_hours_closes(self):
+        self.add_hours(WeekdayChoices.MONDAY, (9,), (17,))
+        RestaurantHoursOverride.objects.create(restaurant=self.restaurant, date=MONDAY)
+        self.assertFalse(self.is_open(at(0, 10)))
+
+    def test_horizon(self):
+        self.add_hours(WeekdayChoices.MONDAY, (9,), (17,))
+        with override_settings(OPEN_HOURS_HORIZON_DAYS=7):
+            rebuild_open_hours(now=at(0, 12))
+        open_restaurants = Restaurant.objects.filter(pk=self.restaurant.pk)
+        self.assertFalse(filter_open_restaurants(open_restaurants, at(0, 11)))
+        self.assertTrue(filter_open_restaurants(open_restaurants, at(0, 12)))
+        self.assertFalse(filter_open_restaurants(open_restaurants, at(7, 12)))
+
+    def test_full_rebuild_drops_past_hours(self):
+        other = make_restaurant()
+        RestaurantOpenSlot.objects.create(
+            restaurant=other, hour=1, start_minute=0, end_minute=60
+        )
+        rebuild_open_hours([self.restaurant.pk], now=at(0, 0))
+        self.assertTrue(RestaurantOpenSlot.objects.filter(hour=1).exists())
+        rebuild_open_hours(now=at(0, 0))
+        self.assertFalse(RestaurantOpenSlot.objects.filter(hour=1).exists())
+
+    @override_settings(TIME_ZONE="Europe/Berlin")
+    def test_daylight_saving_time(self):
+        # Clocks go from 02:00 to 03:00 on 2026-03-29, a Sunday
+        self.add_hours(WeekdayChoices.SUNDAY, (1,), (4,))
+        rebuild_open_hours(now=at(27, 0))
+        restaurants = Restaurant.objects.all()
+        utc = datetime.timezone.utc
+        opened = datetime.datetime(2026, 3, 29, 0, 30, tzinfo=utc)
+        self.assertTrue(filter_open_restaurants(restaurants, opened))
+        # 03:30 local time, after the clocks moved forward
+        self.assertTrue(
+            filter_open_restaurants(restaurants, opened + datetime.timedelta(hours=1))
+        )
+        self.assertFalse(
+            filter_open_restaurants(restaurants, opened + datetime.timedelta(hours=2))
+        )
+
+
+class OpenSlotSignalTests(TestCase):
+    def test_slots_follow_schedule_changes(self):
+        # Open around the clock
+        restaurant = make_restaurant(
+            opening_time=datetime.time(0), closing_time=datetime.time(0)
+        )
+        open_restaurants = Restaurant.objects.filter(pk=restaurant.pk)
+        self.assertTrue(filter_open_restaurants(open_restaurants))
+
+        override = RestaurantHoursOverride.objects.create(
+            restaurant=restaurant, date=timezone.localdate(), is_closed=True
+        )
+        self.assertFalse(filter_open_restaurants(open_restaurants))
+        override.delete()
+        self.assertTrue(filter_open_restaurants(open_restaurants))
+
+        restaurant.opening_time = None
+        restaurant.save()
+        self.assertFalse(filter_open_restaurants(open_restaurants))
+
+    def test_restaurant_deleted_with_its_schedule(self):
+        restaurant = make_restaurant()
+        RestaurantOpeningHours.objects.create(
+            restaurant=restaurant,
+            weekday=WeekdayChoices.MONDAY,
+            opens_at=datetime.time(9),
+            closes_at=datetime.time(17),
+        )
+        restaurant.delete()
+        self.assertFalse(RestaurantOpenSlot.objects.exists())
+
+    def test_command(self):
+        make_restaurant(opening_time=datetime.time(9), closing_time=datetime.time(17))
+        out = StringIO()
+        call_command("rebuild_open_hours", stdout=out)
+        self.assertIn("open slots compiled for the next 14 days", out.getvalue())
+
+
+class OpenRestaurantListTests(TestCase):
+    def test_open_restaurants(self):
+        all_day = {"opening_time": datetime.time(0), "closing_time": datetime.time(0)}
+        delivering = make_restaurant("Pizza", delivery=True, **all_day)
+        make_restaurant("Tacos", takeaway=True, **all_day)
+        make_restaurant("Closed")
+        make_restaurant("Inactive", status=StatusChoices.INACTIVE, **all_day)
+        client = make_client()
+
+        response = client.get(reverse("restaurant.open"))
+        self.assertEqual(response.status_code, 200)
+        names = {row["name"] for row in response.json()["results"]}
+        self.assertEqual(names, {"Pizza", "Tacos"})
+
+        response = client.get(reverse("restaurant.open"), {"delivery": "true"})
+        self.assertEqual(
+            [row["uid"] for row in response.json()["results"]], [str(delivering.uid)]
+        )
+
+    def test_invalid_filter(self):
+        response = make_client().get(reverse("restaurant.open"), {"delivery": "maybe"})
+        self.assertEqual(response.status_code, 400)
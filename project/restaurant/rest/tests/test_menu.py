@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from restaurant.models import MenuCategory, MenuItem, Modifier
+from shared.choices import StatusChoices
+from shared.tests.factories import make_client, make_menu_item, make_restaurant
+
+
+class RestaurantMenuTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = make_restaurant("Burger Hub")
+        self.burger = make_menu_item(self.restaurant, "Burger")
+        Modifier.objects.create(name="Cheese", menu_item=self.burger, price=1)
+        make_menu_item(self.restaurant, "Fries", "2.50")
+        MenuCategory.objects.create(name="Drinks", restaurant=self.restaurant)
+        self.url = reverse("restaurant.menu", args=[self.restaurant.slug])
+        self.client = make_client()
+
+    def get_menu(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_menu_tree(self):
+        menu = self.get_menu()
+        self.assertEqual(menu["slug"], self.restaurant.slug)
+        categories = {category["name"]: category for category in menu["menu_categories"]}
+        self.assertEqual(categories["Drinks"]["menu_items"], [])
+        items = categories["Mains"]["menu_items"]
+        self.assertEqual([item["name"] for item in items], ["Burger", "Fries"])
+        self.assertEqual(items[0]["modifiers"][0]["name"], "Cheese")
+
+    def test_query_count_does_not_grow_with_the_menu(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.get_menu()
+        for index in range(10):
+            make_menu_item(self.restaurant, f"Item {index}")
+        cache.clear()
+        with CaptureQueriesContext(connection) as bigger:
+            self.get_menu()
+        self.assertEqual(len(cold), len(bigger))
+
+    def test_cached_snapshot_costs_one_query(self):
+        self.get_menu()
+        with CaptureQueriesContext(connection) as warm:
+            self.get_menu()
+        self.assertEqual(len(warm), 1)  # the restaurant slug lookup
+
+    def test_edits_are_visible_at_once(self):
+        self.get_menu()
+        # The version is bumped once the change is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.burger.price = Decimal("7.00")
+            self.burger.save()
+            Modifier.objects.filter(menu_item=self.burger).first().delete()
+        items = self.get_menu()["menu_categories"][1]["menu_items"]
+        burger = next(item for item in items if item["name"] == "Burger")
+        self.assertEqual(burger["price"], "7.00")
+        self.assertEqual(burger["modifiers"], [])
+
+    def test_deleted_item_leaves_the_menu(self):
+        self.get_menu()
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.get(name="Fries").delete()
+        names = [
+            item["name"]
+            for category in self.get_menu()["menu_categories"]
+            for item in category["menu_items"]
+        ]
+        self.assertEqual(names, ["Burger"])
+
+    def test_unknown_or_inactive_restaurant_is_not_found(self):
+        response = self.client.get(reverse("restaurant.menu", args=["nope"]))
+        self.assertEqual(response.status_code, 404)
+        self.restaurant.status = StatusChoices.INACTIVE
+        self.restaurant.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,125 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from restaurant.models import MenuCategory, MenuItem, Modifier
+from restaurant.search import (
+    DatabaseSearchBackend,
+    SQLiteFTS5SearchBackend,
+    edit_distance,
+    search_menu_items,
+)
+from shared.choices import StatusChoices
+from shared.tests.factories import make_client, make_menu_item, make_restaurant
+
+
+class EditDistanceTests(TestCase):
+    def test_distance(self):
+        self.assertEqual(edit_distance("burger", "burger", 2), 0)
+        self.assertEqual(edit_distance("burgr", "burger", 2), 1)
+        self.assertEqual(edit_distance("bruger", "burger", 2), 2)
+
+    def test_gives_up_above_limit(self):
+        self.assertEqual(edit_distance("pizza", "burger", 1), 2)
+        self.assertEqual(edit_distance("tea", "teapot", 1), 2)
+
+
+class MenuSearchTests(TestCase):
+    def setUp(self):
+        self.restaurant = make_restaurant()
+        self.burger = make_menu_item(
+            self.restaurant, "Cheese Burger", description="Beef patty"
+        )
+        self.salad = make_menu_item(self.restaurant, "Caesar Salad")
+        Modifier.objects.create(name="Bacon", menu_item=self.salad, price=1)
+        drinks = MenuCategory.objects.create(name="Drinks", restaurant=self.restaurant)
+        self.lemonade = MenuItem.objects.create(
+            name="Lemonade", menu_category=drinks, price=2
+        )
+
+    def search(self, query, **kwargs):
+        return search_menu_items(query, **kwargs)
+
+    def test_ranked_by_column_weights(self):
+        other = make_menu_item(self.restaurant, "Veggie Wrap", description="No burger")
+        self.assertEqual(self.search("burger"), [self.burger, other])
+
+    def test_prefix_and_every_term(self):
+        self.assertEqual(self.search("chee burg"), [self.burger])
+        self.assertEqual(self.search("cheese salad"), [])
+
+    def test_category_and_modifiers_indexed(self):
+        self.assertEqual(self.search("drinks"), [self.lemonade])
+        self.assertEqual(self.search("bacon"), [self.salad])
+
+    def test_index_follows_edits(self):
+        self.burger.name = "Chicken Wings"
+        self.burger.save()
+        self.assertEqual(self.search("burger"), [])
+        self.assertEqual(self.search("wings"), [self.burger])
+
+        self.burger.delete()
+        self.assertEqual(self.search("wings"), [])
+
+    def test_unavailable_and_inactive_excluded(self):
+        self.burger.is_available = False
+        self.burger.save()
+        self.assertEqual(self.search("burger"), [])
+
+        self.restaurant.status = StatusChoices.INACTIVE
+        self.restaurant.save()
+        self.assertEqual(self.search("salad"), [])
+
+    def test_typos(self):
+        self.assertEqual(self.search("lemonad"), [self.lemonade])
+        self.assertEqual(self.search("lemonsde"), [self.lemonade])
+        self.assertEqual(self.search("salxd"), [self.salad])
+        self.assertEqual(self.search("cheeseburgre"), [])
+        # Short terms and typos in the first two characters are not corrected
+        self.assertEqual(self.search("slad"), [])
+        self.assertEqual(self.search("aslad"), [])
+
+    def get_scored_terms(self, term):
+        backend = SQLiteFTS5SearchBackend()
+        with connection.cursor() as cursor, mock.patch(
+            "restaurant.search.edit_distance", wraps=edit_distance
+        ) as scored:
+            candidates = backend.get_typo_candidates(cursor, term)
+        return candidates, [call.args[1] for call in scored.call_args_list]
+
+    def test_typo_candidates_narrowed_in_sql(self):
+        make_menu_item(self.restaurant, "Saladbowl Sa Bsald Saladx")
+        candidates, scored = self.get_scored_terms("salxd")
+        # Only the terms of length 4 to 6 starting with "sa" are compared
+        self.assertCountEqual(scored, ["salad", "saladx"])
+        self.assertEqual(candidates, ["salad"])
+
+    def test_typo_candidates_capped(self):
+        for name in ("Salade", "Saladi", "Salado", "Saladu", "Salady"):
+            make_menu_item(self.restaurant, name)
+        with mock.patch("restaurant.search.MAX_TYPO_CANDIDATES", 3):
+            _, scored = self.get_scored_terms("salxd")
+        self.assertEqual(len(scored), 3)
+
+    def test_alternatives_capped(self):
+        for name in ("Tacos", "Tacoz", "Tacox", "Tacow", "Tacov", "Tacou", "Tacot"):
+            make_menu_item(self.restaurant, name)
+        backend = SQLiteFTS5SearchBackend()
+        with connection.cursor() as cursor:
+            self.assertEqual(len(backend.get_typo_candidates(cursor, "tacoa")), 5)
+
+    def test_search_endpoint(self):
+        response = make_client().get(
+            reverse("restaurant.menu-item.search"), {"q": "lemonade"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["uid"] for row in response.json()], [str(self.lemonade.uid)]
+        )
+
+    def test_database_backend(self):
+        backend = DatabaseSearchBackend()
+        self.assertEqual(backend.search("cheese burger"), [self.burger.pk])
+        self.assertEqual(backend.search("bacon"), [self.salad.pk])
@@ -0,0 +1,27 @@
+from django.urls import path
+
+from restaurant.rest.views.menu import RestaurantMenuDetail
+from restaurant.rest.views.restaurant import (
+    MenuItemSearch,
+    NearbyRestaurantList,
+    OpenRestaurantList,
+    TopRatedMenuItemList,
+    TopRatedRestaurantList,
+)
+
+urlpatterns = [
+    path("nearby", NearbyRestaurantList.as_view(), name="restaurant.nearby"),
+    path("open", OpenRestaurantList.as_view(), name="restaurant.open"),
+    path("top-rated", TopRatedRestaurantList.as_view(), name="restaurant.top-rated"),
+    path(
+        "menu-items/search",
+        MenuItemSearch.as_view(),
+        name="restaurant.menu-item.search",
+    ),
+    path(
+        "menu-items/top-rated",
+        TopRatedMenuItemList.as_view(),
+        name="restaurant.menu-item.top-rated",
+    ),
+    path("<slug:slug>/menu", RestaurantMenuDetail.as_view(), name="restaurant.menu"),
+]
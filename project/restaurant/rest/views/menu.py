@@ -0,0 +1,32 @@
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+
+from drf_spectacular.utils import extend_schema
+
+from rest_framework.views import APIView
+
+from shared.choices import StatusChoices
+
+from ...menu import get_menu
+from ...models import Restaurant
+from ..serializers.menu import RestaurantMenuSerializer
+
+
+class RestaurantMenuDetail(APIView):
+    """Full menu of a restaurant: categories, items and modifiers"""
+
+    @extend_schema(responses=RestaurantMenuSerializer)
+    def get(self, request, slug, *args, **kwargs):
+        restaurant_id = get_object_or_404(
+            Restaurant.objects.filter(status=StatusChoices.ACTIVE).values_list(
+                "id", flat=True
+            ),
+            slug=slug,
+        )
+
+        menu = get_menu(restaurant_id)
+        if menu is None:
+            return HttpResponse(status=404)
+
+        # The snapshot is already serialized, skip the renderer
+        return HttpResponse(menu, content_type="application/json")
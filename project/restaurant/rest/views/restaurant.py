@@ -0,0 +1,133 @@
+from drf_spectacular.utils import extend_schema
+
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from shared.choices import StatusChoices
+
+from ...geo import find_nearby_restaurants
+from ...hours import filter_open_restaurants
+from ...models import MenuItem, Restaurant
+from ...search import search_menu_items
+from ..serializers.restaurant import (
+    MenuItemSearchSerializer,
+    MenuSearchQuerySerializer,
+    NearbyRestaurantQuerySerializer,
+    NearbyRestaurantSerializer,
+    OpenRestaurantQuerySerializer,
+    RestaurantListSerializer,
+    TopRatedMenuItemSerializer,
+    TopRatedQuerySerializer,
+)
+
+
+class NearbyRestaurantList(APIView):
+    """Active restaurants delivering around a point, closest first"""
+
+    @extend_schema(
+        parameters=[NearbyRestaurantQuerySerializer],
+        responses=NearbyRestaurantSerializer(many=True),
+    )
+    def get(self, request, *args, **kwargs):
+        query = NearbyRestaurantQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        restaurants = []
+        for restaurant, distance in find_nearby_restaurants(
+            query.validated_data["latitude"],
+            query.validated_data["longitude"],
+            query.validated_data["radius"],
+            limit=query.validated_data["limit"],
+        ):
+            restaurant.distance_km = distance
+            restaurants.append(restaurant)
+
+        return Response(NearbyRestaurantSerializer(restaurants, many=True).data)
+
+
+class OpenRestaurantList(ListAPIView):
+    """Active restaurants open right now, optionally only delivery / takeaway"""
+
+    serializer_class = RestaurantListSerializer
+
+    @extend_schema(parameters=[OpenRestaurantQuerySerializer])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        query = OpenRestaurantQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+
+        # One lookup on the open_slot_lookup_idx index, see restaurant.hours
+        restaurants = filter_open_restaurants(
+            Restaurant.objects.filter(status=StatusChoices.ACTIVE)
+        )
+        for flag in ("delivery", "takeaway"):
+            if query.validated_data[flag] is not None:
+                restaurants = restaurants.filter(**{flag: query.validated_data[flag]})
+        return restaurants
+
+
+class TopRatedRestaurantList(APIView):
+    """Active restaurants with the best average rating"""
+
+    @extend_schema(
+        parameters=[TopRatedQuerySerializer],
+        responses=RestaurantListSerializer(many=True),
+    )
+    def get(self, request, *args, **kwargs):
+        query = TopRatedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        # Index scan on (status, -rating_average)
+        restaurants = Restaurant.objects.filter(
+            status=StatusChoices.ACTIVE,
+            rating_count__gte=query.validated_data["min_ratings"],
+        ).order_by("-rating_average")[: query.validated_data["limit"]]
+
+        return Response(RestaurantListSerializer(restaurants, many=True).data)
+
+
+class TopRatedMenuItemList(APIView):
+    """Available menu items of active restaurants with the best average rating"""
+
+    @extend_schema(
+        parameters=[TopRatedQuerySerializer],
+        responses=TopRatedMenuItemSerializer(many=True),
+    )
+    def get(self, request, *args, **kwargs):
+        query = TopRatedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        # Index scan on (is_available, -rating_average)
+        menu_items = (
+            MenuItem.objects.filter(
+                is_available=True,
+                menu_category__restaurant__status=StatusChoices.ACTIVE,
+                rating_count__gte=query.validated_data["min_ratings"],
+            )
+            .select_related("menu_category__restaurant")
+            .order_by("-rating_average")[: query.validated_data["limit"]]
+        )
+
+        return Response(TopRatedMenuItemSerializer(menu_items, many=True).data)
+
+
+class MenuItemSearch(APIView):
+    """Ranked full-text search over the available dishes of active restaurants"""
+
+    @extend_schema(
+        parameters=[MenuSearchQuerySerializer],
+        responses=MenuItemSearchSerializer(many=True),
+    )
+    def get(self, request, *args, **kwargs):
+        query = MenuSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        menu_items = search_menu_items(
+            query.validated_data["q"],
+            limit=query.validated_data["limit"],
+            offset=query.validated_data["offset"],
+        )
+        return Response(MenuItemSearchSerializer(menu_items, many=True).data)
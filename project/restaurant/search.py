@@ -0,0 +1,273 @@
+"""
+Full-text search over the menus of all the restaurants.
+
+The search index holds one document per MenuItem made of its name, its
+description, the name of its category and the names of its modifiers. It is
+kept up to date by the signals in restaurant.signals and can be rebuilt with
+`manage.py rebuild_search_index`.
+
+SQLiteFTS5SearchBackend keeps the index in an FTS5 table (created by the
+0004 migration) and ranks with bm25. DatabaseSearchBackend is the fallback for
+databases without FTS5, scanning with LIKE. Another backend can be plugged in
+with the MENU_SEARCH_BACKEND setting.
+"""
+
+import functools
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from shared.choices import StatusChoices
+
+from .models import MenuCategory, MenuItem, Modifier, Restaurant
+
+SEARCH_TABLE = "restaurant_menuitem_search"
+SEARCH_VOCAB_TABLE = "restaurant_menuitem_search_vocab"
+MAX_QUERY_TERMS = 8
+# Indexed terms compared with a misspelled query term, the most frequent first
+MAX_TYPO_CANDIDATES = 200
+# Closest of them added to the query in place of the term
+MAX_TYPO_ALTERNATIVES = 5
+
+
+def get_query_terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+
+def get_menu_item_documents(menu_item_ids):
+    """{menu_item_id: (name, description, category, modifiers)} in two queries"""
+    menu_items = (
+        MenuItem.objects.filter(pk__in=menu_item_ids)
+        .select_related("menu_category")
+        .prefetch_related("modifiers")
+    )
+    return {
+        menu_item.pk: (
+            menu_item.name,
+            menu_item.description or "",
+            menu_item.menu_category.name,
+            " ".join(modifier.name for modifier in menu_item.modifiers.all()),
+        )
+        for menu_item in menu_items
+    }
+
+
+def edit_distance(first, second, limit):
+    """Levenshtein distance, giving up as soon as it is above limit"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (first_char != second_char),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class BaseSearchBackend:
+    def index_menu_items(self, menu_item_ids):
+        raise NotImplementedError
+
+    def remove_menu_items(self, menu_item_ids):
+        raise NotImplementedError
+
+    def rebuild(self, chunk_size=2000):
+        raise NotImplementedError
+
+    def search(self, query, limit=20, offset=0):
+        """Return the ids of the matching menu items, best match first"""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """No index at all, LIKE over the menu tables. For databases without FTS."""
+
+    def index_menu_items(self, menu_item_ids):
+        pass
+
+    def remove_menu_items(self, menu_item_ids):
+        pass
+
+    def rebuild(self, chunk_size=2000):
+        pass
+
+    def search(self, query, limit=20, offset=0):
+        menu_items = MenuItem.objects.filter(
+            is_available=True, menu_category__restaurant__status=StatusChoices.ACTIVE
+        )
+        for term in get_query_terms(query):
+            menu_items = menu_items.filter(
+                Q(name__icontains=term)
+                | Q(description__icontains=term)
+                | Q(menu_category__name__icontains=term)
+                | Q(modifiers__name__icontains=term)
+            )
+        menu_items = menu_items.distinct().order_by("-rating_average", "id")
+        return list(menu_items.values_list("id", flat=True)[offset : offset + limit])
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    """
+    Inverted index in an FTS5 table whose rowid is the MenuItem id.
+    Terms are prefix matched, and a term without any match in the index
+    vocabulary is widened to the indexed terms within a small edit distance.
+    Those are looked up among the terms starting with the same two characters,
+    so typos in the first two characters are not corrected.
+    """
+
+    # bm25 weights of name, description, category and modifiers
+    column_weights = (10.0, 2.0, 4.0, 1.0)
+
+    def index_menu_items(self, menu_item_ids):
+        menu_item_ids = list(menu_item_ids)
+        documents = get_menu_item_documents(menu_item_ids)
+        with connection.cursor() as cursor:
+            self.delete_rows(cursor, menu_item_ids)
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} "
+                "(rowid, name, description, category, modifiers) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(pk, *document) for pk, document in documents.items()],
+            )
+
+    def remove_menu_items(self, menu_item_ids):
+        with connection.cursor() as cursor:
+            self.delete_rows(cursor, list(menu_item_ids))
+
+    def delete_rows(self, cursor, menu_item_ids):
+        if menu_item_ids:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(pk,) for pk in menu_item_ids],
+            )
+
+    def rebuild(self, chunk_size=2000):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        last_id = 0
+        while True:
+            menu_item_ids = list(
+                MenuItem.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not menu_item_ids:
+                break
+            self.index_menu_items(menu_item_ids)
+            last_id = menu_item_ids[-1]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+            )
+
+    def get_typo_candidates(self, cursor, term):
+        if len(term) < 4:
+            return []
+        limit = 1 if len(term) < 8 else 2
+        # Only indexed terms sharing the first two characters and of a length
+        # within the edit distance are compared with the query term
+        cursor.execute(
+            f"SELECT term FROM {SEARCH_VOCAB_TABLE} "
+            "WHERE term >= %s AND term < %s AND length(term) BETWEEN %s AND %s "
+            "ORDER BY doc DESC LIMIT %s",
+            [
+                term[:2],
+                term[:2] + "\uffff",
+                len(term) - limit,
+                len(term) + limit,
+                MAX_TYPO_CANDIDATES,
+            ],
+        )
+        distances = {}
+        for (candidate,) in cursor.fetchall():
+            distance = edit_distance(term, candidate, limit)
+            if distance <= limit:
+                distances[candidate] = distance
+        # Closest first, the most frequent first among equally close ones
+        return sorted(distances, key=distances.get)[:MAX_TYPO_ALTERNATIVES]
+
+    def has_prefix_match(self, cursor, term):
+        cursor.execute(
+            f"SELECT 1 FROM {SEARCH_VOCAB_TABLE} "
+            "WHERE term >= %s AND term < %s LIMIT 1",
+            [term, term + "\uffff"],
+        )
+        return cursor.fetchone() is not None
+
+    def build_match_expression(self, cursor, terms):
+        expressions = []
+        for term in terms:
+            alternatives = [f'"{term}"*']
+            if not self.has_prefix_match(cursor, term):
+                alternatives += [
+                    f'"{candidate}"'
+                    for candidate in self.get_typo_candidates(cursor, term)
+                ]
+            expressions.append(f"({' OR '.join(alternatives)})")
+        return " AND ".join(expressions)
+
+    def search(self, query, limit=20, offset=0):
+        terms = get_query_terms(query)
+        if not terms:
+            return []
+
+        weights = ", ".join(str(weight) for weight in self.column_weights)
+        with connection.cursor() as cursor:
+            match = self.build_match_expression(cursor, terms)
+            cursor.execute(
+                f"SELECT {SEARCH_TABLE}.rowid FROM {SEARCH_TABLE} "
+                f"JOIN {MenuItem._meta.db_table} AS menu_item "
+                f"ON menu_item.id = {SEARCH_TABLE}.rowid "
+                f"JOIN {MenuCategory._meta.db_table} AS menu_category "
+                "ON menu_category.id = menu_item.menu_category_id "
+                f"JOIN {Restaurant._meta.db_table} AS restaurant "
+                "ON restaurant.id = menu_category.restaurant_id "
+                f"WHERE {SEARCH_TABLE} MATCH %s "
+                "AND menu_item.is_available AND restaurant.status = %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s",
+                [match, StatusChoices.ACTIVE, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_backend():
+    backend = getattr(settings, "MENU_SEARCH_BACKEND", None)
+    if backend is None:
+        if connection.vendor == "sqlite":
+            backend = "restaurant.search.SQLiteFTS5SearchBackend"
+        else:
+            backend = "restaurant.search.DatabaseSearchBackend"
+    return import_string(backend)()
+
+
+def search_menu_items(query, limit=20, offset=0):
+    """Matching MenuItems with their category and restaurant, best match first"""
+    menu_item_ids = get_search_backend().search(query, limit=limit, offset=offset)
+    menu_items = MenuItem.objects.select_related("menu_category__restaurant").in_bulk(
+        menu_item_ids
+    )
+    return [menu_items[pk] for pk in menu_item_ids if pk in menu_items]
+
+
+def get_menu_item_ids_for(instance):
+    """Ids of the menu items whose search document contains the instance"""
+    if isinstance(instance, MenuItem):
+        return [instance.pk]
+    if isinstance(instance, Modifier):
+        return [instance.menu_item_id]
+    if isinstance(instance, MenuCategory):
+        return list(instance.menu_items.values_list("pk", flat=True))
+    return []
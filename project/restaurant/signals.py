@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from shared.images import image_variants_ready
+
+from .hours import rebuild_open_hours
+from .menu import bump_menu_version, get_restaurant_id_for_menu_object
+from .models import (
+    MenuCategory,
+    MenuItem,
+    Modifier,
+    Restaurant,
+    RestaurantHoursOverride,
+    RestaurantOpeningHours,
+)
+from .search import get_menu_item_ids_for, get_search_backend
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuCategory)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Modifier)
+@receiver(post_delete, sender=MenuCategory)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=Modifier)
+@receiver(image_variants_ready, sender=MenuItem)
+@receiver(image_variants_ready, sender=Modifier)
+def invalidate_menu_cache(sender, instance=None, **kwargs):
+    restaurant_id = get_restaurant_id_for_menu_object(instance)
+    if restaurant_id is None:
+        return
+
+    # Bump only once the change is visible to the readers that rebuild the menu
+    transaction.on_commit(lambda: bump_menu_version(restaurant_id))
+
+
+@receiver(post_save, sender=MenuCategory)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=Modifier)
+@receiver(post_delete, sender=Modifier)
+def update_search_index(sender, instance=None, **kwargs):
+    # Same database and transaction as the save, a rollback also undoes the index
+    menu_item_ids = get_menu_item_ids_for(instance)
+    if menu_item_ids:
+        get_search_backend().index_menu_items(menu_item_ids)
+
+
+@receiver(post_delete, sender=MenuItem)
+def remove_from_search_index(sender, instance=None, **kwargs):
+    get_search_backend().remove_menu_items([instance.pk])
+
+
+@receiver(pre_save, sender=Restaurant)
+def track_opening_time_changes(sender, instance=None, **kwargs):
+    dirty_fields = instance.get_dirty_fields(check_relationship=False)
+    instance._opening_time_changed = instance._state.adding or any(
+        field in dirty_fields for field in ("opening_time", "closing_time")
+    )
+
+
+@receiver(post_save, sender=Restaurant)
+def update_open_slots_of_restaurant(sender, instance=None, **kwargs):
+    if getattr(instance, "_opening_time_changed", False):
+        rebuild_open_hours([instance.pk])
+
+
+@receiver(post_save, sender=RestaurantOpeningHours)
+@receiver(post_save, sender=RestaurantHoursOverride)
+@receiver(post_delete, sender=RestaurantOpeningHours)
+@receiver(post_delete, sender=RestaurantHoursOverride)
+def update_open_slots(sender, instance=None, origin=None, **kwargs):
+    # Nothing to compile when the whole restaurant is being deleted
+    if isinstance(origin, Restaurant) or getattr(origin, "model", None) is Restaurant:
+        return
+    # In the transaction of the change, like the search index
+    rebuild_open_hours([instance.restaurant_id])
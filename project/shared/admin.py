@@ -1,3 +1,126 @@
+"""
+Admin building blocks for tables too big for the stock changelist.
+
+The stock changelist runs a COUNT(*) over the whole table (twice, with
+show_full_result_count), renders foreign keys through one query per row and
+pages with OFFSET, which all grow with the table. ScalableModelAdmin instead:
+
+- counts with EstimatedCountPaginator: the planner estimate (PostgreSQL) or the
+  highest primary key for an unfiltered list, a count stopping at COUNT_LIMIT
+  rows once filtered;
+- joins what list_display shows through list_select_related and edits foreign
+  keys through raw_id_fields instead of <select>s of every user;
+- lists newest first on the primary key and adds an "Older" link filtering on
+  `pk < last shown pk`, so any depth of the table is one index range away;
+- sets no date_hierarchy: its drill down runs a Min/Max and a DISTINCT of the
+  dates over the whole table on every load. Admins set one only on an indexed
+  field of a bounded table (orders, archived away; history, pruned).
+
+Exact lookups (`=uid`) in search_fields stay on their unique index, where the
+default icontains would scan the table.
+"""
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+
+# Filtered changelists stop counting there, older rows are reached with "Older"
+COUNT_LIMIT = 10000
+
+
+def get_estimated_count(queryset):
+    """Rows of the queryset's table without counting them, or None"""
+    model = queryset.model
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 until the table was first analyzed
+        if row and row[0] >= 0:
+            return row[0]
+        return None
+
+    if isinstance(model._meta.pk, models.AutoField):
+        # Off by the deleted rows only, read from the primary key index
+        return queryset.order_by().aggregate(last=models.Max("pk"))["last"] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = get_estimated_count(queryset)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset[: self.count_limit].count()
+
+
+class KeysetChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Query string of the next (older) page, when sorted on the default
+        self.older_query = None
+        if ORDER_VAR in self.params or len(self.result_list) < self.list_per_page:
+            return
+
+        last = self.result_list[len(self.result_list) - 1]
+        query = request.GET.copy()
+        query.pop(PAGE_VAR, None)
+        query[f"{self.model._meta.pk.name}__lt"] = str(last.pk)
+        self.older_query = query
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/shared/keyset_change_list.html"
+    ordering = ("-pk",)
+    list_per_page = 50
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class HistoricalRecordAdmin(ScalableModelAdmin):
+    """Read only changelist of a Historical* table"""
+
+    # Indexed, and kept to HISTORY_RETENTION_DAYS by prune_history
+    date_hierarchy = "history_date"
+    list_display = ["history_id", "history_date", "history_type", "history_user"]
+    list_filter = ["history_type"]
+    list_select_related = ["history_user"]
+    raw_id_fields = ["history_user"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
-# Register your models here.
+def register_history(*models, admin_class=HistoricalRecordAdmin, **options):
+    """Register the history tables of models, listing `history_id` and `id`"""
+    for model in models:
+        historical_model = model.history.model
+        admin_options = {
+            "list_display": [*admin_class.list_display, "id"],
+            "search_fields": ["=id"],
+            **options,
+        }
+        admin.site.register(
+            historical_model,
+            type(f"{historical_model.__name__}Admin", (admin_class,), admin_options),
+        )
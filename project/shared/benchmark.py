@@ -0,0 +1,689 @@
+"""
+Synthetic dataset generation and API benchmarks.
+
+BenchmarkSeeder bulk inserts a realistic dataset, `scale` times the BASE_COUNTS,
+in batches so millions of rows never sit in memory at once. Rows are inserted
+with bulk_create, so the data maintained by signals (ratings, sales rollups,
+search index, open slots) is rebuilt once at the end.
+
+BenchmarkRunner calls every API endpoint in process with the test client and
+reports latency percentiles and query counts, to be saved as JSON and compared
+between runs. The write endpoints are measured too: the bodies that must change
+on every call (a new email, a filled cart) are built before each request,
+outside of the timing, and the rows they create (users, orders, cart items)
+are deleted at the end so runs stay comparable. The only endpoints left out
+are the order status stream, which holds its connection open, and its token.
+"""
+
+import datetime
+import json
+import random
+import secrets
+import statistics
+import time
+from decimal import Decimal
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from order.choices import (
+    DeliveryStatusChoices,
+    OrderStatusChoices,
+    OrderTypeChoices,
+    PaymentMethodChoices,
+    PaymentStatusChoices,
+)
+from order.cart_store import get_cart_store
+from order.models import Cart, CartItem, CustomerFeedback, Order, OrderItem, Payment
+from order.ratings import rebuild_ratings
+from order.sales import rebuild_sales_rollups
+from restaurant.geo import get_grid_cell
+from restaurant.hours import rebuild_open_hours
+from restaurant.models import (
+    MenuCategory,
+    MenuItem,
+    Modifier,
+    Restaurant,
+    RestaurantAddress,
+    RestaurantStaff,
+)
+from restaurant.search import get_search_backend
+
+from .choices import StaffRoleChoices, StatusChoices
+from .slugs import allocate_slugs
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = "benchmark-password"
+# Users created by the registration endpoint, deleted after the run
+REGISTRATION_EMAIL_PREFIX = "bench-registration-"
+
+# Rows generated at scale 1. Only restaurants and users grow with the scale,
+# the size of the menus and the number of orders per user stay realistic.
+BASE_COUNTS = {
+    "restaurants": 200,
+    "categories_per_restaurant": 5,
+    "items_per_category": 8,
+    "modifiers_per_item": 2,
+    "users": 2000,
+    "orders_per_user": 10,
+    "feedback_ratio": 0.3,
+    "cart_ratio": 0.2,
+}
+
+# Around Dhaka, where the restaurants are generated
+CENTER = (23.78, 90.40)
+
+FIRST_NAMES = ["Amina", "Rahim", "Karim", "Nadia", "Farhan", "Sadia", "Imran", "Lina"]
+LAST_NAMES = ["Hossain", "Rahman", "Ahmed", "Chowdhury", "Islam", "Khan", "Sarkar"]
+CUISINES = ["Biryani", "Burger", "Pizza", "Sushi", "Kebab", "Noodle", "Curry", "Taco"]
+DISHES = ["Chicken", "Beef", "Mutton", "Prawn", "Vegetable", "Paneer", "Fish", "Egg"]
+STYLES = ["Grilled", "Spicy", "Crispy", "Tandoori", "Smoked", "Garlic", "Classic"]
+CATEGORIES = ["Starters", "Mains", "Sides", "Desserts", "Drinks", "Combos", "Soups"]
+MODIFIERS = ["Extra cheese", "Large", "Extra sauce", "No onion", "Double meat"]
+
+
+class BenchmarkSeeder:
+    def __init__(self, scale=1.0, batch_size=2000, seed=None, log=None):
+        self.scale = scale
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+        # Unique per run, so seeding twice never collides on unique fields
+        self.tag = secrets.token_hex(3)
+        self.now = timezone.now()
+        self.counts = {}
+
+    def count(self, name):
+        if name in ("restaurants", "users"):
+            return max(1, int(BASE_COUNTS[name] * self.scale))
+        return BASE_COUNTS[name]
+
+    def slug(self, kind, index):
+        return f"bench-{self.tag}-{kind}-{index}"
+
+    def bulk_create(self, model, objects):
+        # bulk_create skips save(), so updated_at has to be stamped here
+        for obj in objects:
+            if hasattr(obj, "updated_at") and obj.updated_at is None:
+                obj.updated_at = obj.created_at
+        # One query checking the slugs of the batch instead of one per row
+        if any(field.name == "slug" for field in model._meta.concrete_fields):
+            allocate_slugs(objects)
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(
+            created
+        )
+        return created
+
+    def past(self, days=180):
+        seconds = self.random.randint(0, days * 24 * 60 * 60)
+        return self.now - datetime.timedelta(seconds=seconds)
+
+    def run(self):
+        started = time.perf_counter()
+        users = self.seed_users()
+        self.log(f"{len(users)} users")
+        menus = self.seed_restaurants()
+        self.log(f"{len(menus)} restaurants with their menus")
+        self.seed_orders(users, menus)
+        self.log(f"{self.counts.get('Order', 0)} orders")
+        self.seed_carts(users, menus)
+
+        self.log("Rebuilding ratings, sales rollups, search index and open hours")
+        rebuild_ratings()
+        rebuild_sales_rollups()
+        get_search_backend().rebuild()
+        rebuild_open_hours()
+
+        self.counts["seconds"] = round(time.perf_counter() - started, 1)
+        return self.counts
+
+    def seed_users(self):
+        # Hashed once, hashing per user would dominate the seeding time
+        password = make_password(BENCHMARK_PASSWORD)
+        user_ids = []
+        total = self.count("users")
+        for start in range(0, total, self.batch_size):
+            users = []
+            for index in range(start, min(start + self.batch_size, total)):
+                users.append(
+                    User(
+                        first_name=self.random.choice(FIRST_NAMES),
+                        last_name=self.random.choice(LAST_NAMES),
+                        email=f"bench-{self.tag}-{index}@example.com",
+                        slug=self.slug("user", index),
+                        password=password,
+                        address=f"House {index}, Road {index % 50}, Dhaka",
+                        status=StatusChoices.ACTIVE,
+                        created_at=self.past(),
+                    )
+                )
+            users = self.bulk_create(User, users)
+            self.bulk_create(
+                Token, [Token(key=Token.generate_key(), user=user) for user in users]
+            )
+            user_ids += [user.pk for user in users]
+        return user_ids
+
+    def seed_restaurants(self):
+        """Returns {restaurant_id: [(menu_item_id, price, [(modifier_id, price)])]}"""
+        menus = {}
+        total = self.count("restaurants")
+        # Restaurants are few, their menus are batched per chunk of restaurants
+        chunk = max(1, self.batch_size // 50)
+        for start in range(0, total, chunk):
+            restaurants = []
+            for index in range(start, min(start + chunk, total)):
+                opening = self.random.choice([8, 9, 10, 11, 17])
+                restaurants.append(
+                    Restaurant(
+                        name=f"{self.random.choice(CUISINES)} House {index}",
+                        slug=self.slug("restaurant", index),
+                        CEO_name=self.random.choice(FIRST_NAMES),
+                        tax_number=f"BENCH-{self.tag}-TAX-{index}",
+                        registration_no=f"BENCH-{self.tag}-REG-{index}",
+                        summary="Synthetic benchmark restaurant",
+                        status=(
+                            StatusChoices.ACTIVE
+                            if self.random.random() < 0.95
+                            else StatusChoices.INACTIVE
+                        ),
+                        opening_time=datetime.time(opening),
+                        closing_time=datetime.time((opening + 12) % 24),
+                        delivery=self.random.random() < 0.8,
+                        takeaway=self.random.random() < 0.6,
+                        created_at=self.past(365),
+                    )
+                )
+            restaurants = self.bulk_create(Restaurant, restaurants)
+            self.seed_addresses(restaurants)
+            menus.update(self.seed_menus(restaurants))
+        return menus
+
+    def seed_addresses(self, restaurants):
+        addresses = []
+        for restaurant in restaurants:
+            latitude = Decimal(f"{CENTER[0] + self.random.uniform(-0.2, 0.2):.6f}")
+            longitude = Decimal(f"{CENTER[1] + self.random.uniform(-0.2, 0.2):.6f}")
+            addresses.append(
+                RestaurantAddress(
+                    restaurant=restaurant,
+                    street=f"{restaurant.pk} Main Street",
+                    city="Dhaka",
+                    country="Bangladesh",
+                    latitude=latitude,
+                    longitude=longitude,
+                    grid_cell=get_grid_cell(latitude, longitude),
+                    created_at=restaurant.created_at,
+                )
+            )
+        self.bulk_create(RestaurantAddress, addresses)
+
+    def seed_menus(self, restaurants):
+        categories = []
+        for restaurant in restaurants:
+            for index in range(self.count("categories_per_restaurant")):
+                categories.append(
+                    MenuCategory(
+                        restaurant=restaurant,
+                        name=CATEGORIES[index % len(CATEGORIES)],
+                        slug=self.slug("category", f"{restaurant.pk}-{index}"),
+                        created_at=restaurant.created_at,
+                    )
+                )
+        categories = self.bulk_create(MenuCategory, categories)
+
+        menu_items = []
+        for category in categories:
+            for index in range(self.count("items_per_category")):
+                menu_items.append(
+                    MenuItem(
+                        menu_category=category,
+                        name=f"{self.random.choice(STYLES)} "
+                        f"{self.random.choice(DISHES)} {category.name}",
+                        slug=self.slug("item", f"{category.pk}-{index}"),
+                        description="Freshly made, synthetic benchmark dish",
+                        price=Decimal(self.random.randint(150, 1500)) / 10,
+                        is_available=self.random.random() < 0.9,
+                        created_at=category.created_at,
+                    )
+                )
+        menu_items = self.bulk_create(MenuItem, menu_items)
+
+        modifiers = []
+        for menu_item in menu_items:
+            for index in range(self.count("modifiers_per_item")):
+                modifiers.append(
+                    Modifier(
+                        menu_item=menu_item,
+                        name=MODIFIERS[index % len(MODIFIERS)],
+                        slug=self.slug("modifier", f"{menu_item.pk}-{index}"),
+                        price=Decimal(self.random.randint(10, 100)) / 10,
+                        created_at=menu_item.created_at,
+                    )
+                )
+        modifiers = self.bulk_create(Modifier, modifiers)
+
+        item_modifiers = {}
+        for modifier in modifiers:
+            item_modifiers.setdefault(modifier.menu_item_id, []).append(
+                (modifier.pk, modifier.price)
+            )
+        restaurant_ids = {
+            category.pk: category.restaurant_id for category in categories
+        }
+        menus = {restaurant.pk: [] for restaurant in restaurants}
+        for menu_item in menu_items:
+            menus[restaurant_ids[menu_item.menu_category_id]].append(
+                (menu_item.pk, menu_item.price, item_modifiers.get(menu_item.pk, []))
+            )
+        return menus
+
+    def pick_line(self, menu):
+        menu_item_id, price, modifiers = self.random.choice(menu)
+        modifier_id = None
+        if modifiers and self.random.random() < 0.3:
+            modifier_id, modifier_price = self.random.choice(modifiers)
+            price += modifier_price
+        return menu_item_id, modifier_id, price, self.random.randint(1, 3)
+
+    def seed_orders(self, user_ids, menus):
+        restaurant_ids = list(menus)
+        orders_per_user = self.count("orders_per_user")
+        users_per_batch = max(1, self.batch_size // orders_per_user)
+        for start in range(0, len(user_ids), users_per_batch):
+            orders, order_lines = [], []
+            for user_id in user_ids[start : start + users_per_batch]:
+                for _ in range(self.random.randint(0, orders_per_user * 2)):
+                    restaurant_id = self.random.choice(restaurant_ids)
+                    lines = [
+                        self.pick_line(menus[restaurant_id])
+                        for _ in range(self.random.randint(1, 4))
+                    ]
+                    status = self.random.choices(
+                        [
+                            OrderStatusChoices.COMPLETED,
+                            OrderStatusChoices.CANCELLED,
+                            OrderStatusChoices.FAILED,
+                            OrderStatusChoices.PENDING,
+                        ],
+                        weights=[85, 8, 2, 5],
+                    )[0]
+                    orders.append(
+                        Order(
+                            user_id=user_id,
+                            restaurant_id=restaurant_id,
+                            total_price=sum(
+                                price * quantity for _, _, price, quantity in lines
+                            ),
+                            order_status=status,
+                            delivery_status=(
+                                DeliveryStatusChoices.DELIVERED
+                                if status == OrderStatusChoices.COMPLETED
+                                else DeliveryStatusChoices.PENDING
+                            ),
+                            order_type=self.random.choice(OrderTypeChoices.values),
+                            delivery_address="Synthetic address, Dhaka",
+                            created_at=self.past(),
+                        )
+                    )
+                    order_lines.append(lines)
+            orders = self.bulk_create(Order, orders)
+            self.seed_order_children(orders, order_lines)
+
+    def seed_order_children(self, orders, order_lines):
+        order_items, payments, feedbacks = [], [], []
+        for order, lines in zip(orders, order_lines):
+            for menu_item_id, modifier_id, price, quantity in lines:
+                order_items.append(
+                    OrderItem(
+                        order=order,
+                        menu_item_id=menu_item_id,
+                        modifier_id=modifier_id,
+                        quantity=quantity,
+                        price=price,
+                        created_at=order.created_at,
+                    )
+                )
+            payments.append(
+                Payment(
+                    order=order,
+                    amount=order.total_price,
+                    payment_method=self.random.choice(PaymentMethodChoices.values),
+                    payment_status=(
+                        PaymentStatusChoices.COMPLETED
+                        if order.order_status == OrderStatusChoices.COMPLETED
+                        else PaymentStatusChoices.FAILED
+                    ),
+                    created_at=order.created_at,
+                )
+            )
+            if (
+                order.order_status == OrderStatusChoices.COMPLETED
+                and self.random.random() < BASE_COUNTS["feedback_ratio"]
+            ):
+                rating = self.random.choices(
+                    [1, 2, 3, 4, 5], weights=[5, 5, 15, 35, 40]
+                )
+                feedbacks.append(
+                    CustomerFeedback(
+                        title="Benchmark feedback",
+                        slug=self.slug("feedback", f"{order.pk}"),
+                        customer_id=order.user_id,
+                        restaurant_id=order.restaurant_id,
+                        menu_item_id=lines[0][0],
+                        order=order,
+                        rating=rating[0],
+                        comment="Synthetic benchmark feedback",
+                        created_at=order.created_at + datetime.timedelta(hours=2),
+                    )
+                )
+        self.bulk_create(OrderItem, order_items)
+        self.bulk_create(Payment, payments)
+        self.bulk_create(CustomerFeedback, feedbacks)
+
+    def seed_carts(self, user_ids, menus):
+        restaurant_ids = list(menus)
+        cart_user_ids = [
+            user_id
+            for user_id in user_ids
+            if self.random.random() < BASE_COUNTS["cart_ratio"]
+        ]
+        for start in range(0, len(cart_user_ids), self.batch_size):
+            carts = self.bulk_create(
+                Cart,
+                [
+                    Cart(user_id=user_id, created_at=self.past(7))
+                    for user_id in cart_user_ids[start : start + self.batch_size]
+                ],
+            )
+            cart_items = []
+            for cart in carts:
+                menu = menus[self.random.choice(restaurant_ids)]
+                lines = {}
+                for _ in range(self.random.randint(1, 4)):
+                    line = self.pick_line(menu)
+                    lines[line[:2]] = line
+                for menu_item_id, modifier_id, price, quantity in lines.values():
+                    cart_items.append(
+                        CartItem(
+                            cart=cart,
+                            menu_item_id=menu_item_id,
+                            modifier_id=modifier_id,
+                            quantity=quantity,
+                            price=price,
+                            created_at=cart.created_at,
+                        )
+                    )
+            self.bulk_create(CartItem, cart_items)
+
+
+def get_percentile(sorted_values, percentile):
+    """Nearest rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(percentile / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class BenchmarkRunner:
+    """
+    Times every endpoint of BENCHMARK_ENDPOINTS with a user of the seeded
+    dataset. Requests go through the whole middleware stack but not through a
+    network or a web server.
+    """
+
+    def __init__(self, iterations=50, warmup=5, host="localhost"):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.client = Client(HTTP_HOST=host)
+
+    def get_context(self):
+        """Ids used to build the URLs, taken from a seeded user with orders"""
+        order = (
+            Order.objects.filter(user__email__startswith="bench-")
+            .select_related("user")
+            .order_by("-id")
+            .first()
+        )
+        if order is None:
+            raise ValueError("No benchmark data, run `manage.py seed_benchmark`.")
+        restaurant = Restaurant.objects.filter(status=StatusChoices.ACTIVE).first()
+        menu_item = MenuItem.objects.filter(
+            is_available=True, menu_category__restaurant=restaurant
+        ).first()
+        token, created = Token.objects.get_or_create(user=order.user)
+        return {
+            "user": order.user,
+            "token": token.key,
+            "order": order,
+            "restaurant": restaurant,
+            "menu_item": menu_item,
+            "last_order_id": Order.objects.order_by("-id").values_list(
+                "id", flat=True
+            )[0],
+        }
+
+    def add_manager(self, context):
+        """Let the user read the sales report, returns the staff row to delete"""
+        staff, created = RestaurantStaff.objects.get_or_create(
+            restaurant=context["restaurant"],
+            user=context["user"],
+            defaults={"role": StaffRoleChoices.MANAGER},
+        )
+        return staff if created else None
+
+    def get_registration_data(self):
+        return {
+            "email": f"{REGISTRATION_EMAIL_PREFIX}{secrets.token_hex(8)}@example.com",
+            "password": "Bench-password-1!",
+        }
+
+    def get_checkout_data(self, context):
+        """A cart of one item, for every checkout empties it"""
+        menu_item = context["menu_item"]
+        cart_store = get_cart_store()
+        cart_store.clear(context["user"].pk)
+        cart_store.add_item(
+            context["user"].pk,
+            menu_item_id=menu_item.pk,
+            modifier_id=None,
+            quantity=1,
+            unit_price=menu_item.price,
+        )
+        restaurant = context["restaurant"]
+        if restaurant.delivery or not restaurant.takeaway:
+            return {"order_type": OrderTypeChoices.DELIVERY}
+        return {"order_type": OrderTypeChoices.TAKEAWAY}
+
+    def get_endpoints(self, context):
+        """
+        (name, method, url, data, authenticated), data may be a callable
+        returning a new body for every call
+        """
+        search_term = context["menu_item"].name.split()[0]
+        cart_line = {"menu_item": str(context["menu_item"].uid), "quantity": 1}
+        return [
+            (
+                "login",
+                "post",
+                reverse("login"),
+                {"email": context["user"].email, "password": BENCHMARK_PASSWORD},
+                False,
+            ),
+            (
+                "registration",
+                "post",
+                reverse("user.onboarding"),
+                self.get_registration_data,
+                False,
+            ),
+            ("me.orders", "get", reverse("me.order-list"), None, True),
+            (
+                "me.order-detail",
+                "get",
+                reverse("me.order-detail", args=[context["order"].uid]),
+                None,
+                True,
+            ),
+            ("me.payments", "get", reverse("me.payment-list"), None, True),
+            ("me.feedbacks", "get", reverse("me.feedback-list"), None, True),
+            ("me.cart", "get", reverse("me.cart"), None, True),
+            ("me.cart-items.add", "post", reverse("me.cart-items"), cart_line, True),
+            (
+                "me.cart-items.set",
+                "put",
+                reverse("me.cart-items"),
+                {**cart_line, "quantity": 2},
+                True,
+            ),
+            ("me.cart.clear", "delete", reverse("me.cart"), None, True),
+            (
+                "me.checkout",
+                "post",
+                reverse("me.checkout"),
+                lambda: self.get_checkout_data(context),
+                True,
+            ),
+            (
+                "restaurants.nearby",
+                "get",
+                reverse("restaurant.nearby"),
+                {"latitude": CENTER[0], "longitude": CENTER[1], "radius": 5},
+                False,
+            ),
+            ("restaurants.open", "get", reverse("restaurant.open"), None, False),
+            (
+                "restaurants.top-rated",
+                "get",
+                reverse("restaurant.top-rated"),
+                None,
+                False,
+            ),
+            (
+                "restaurants.menu",
+                "get",
+                reverse("restaurant.menu", args=[context["restaurant"].slug]),
+                None,
+                False,
+            ),
+            (
+                "menu-items.search",
+                "get",
+                reverse("restaurant.menu-item.search"),
+                {"q": search_term},
+                False,
+            ),
+            (
+                "menu-items.top-rated",
+                "get",
+                reverse("restaurant.menu-item.top-rated"),
+                None,
+                False,
+            ),
+            (
+                "restaurants.sales",
+                "get",
+                reverse("restaurant.sales", args=[context["restaurant"].slug]),
+                None,
+                True,
+            ),
+        ]
+
+    def call(self, method, url, data, headers):
+        if method == "get":
+            return self.client.get(url, data, headers=headers)
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type="application/json", headers=headers
+        )
+
+    def measure(self, method, url, data, headers):
+        get_data = data if callable(data) else lambda: data
+        for _ in range(self.warmup):
+            self.call(method, url, get_data(), headers)
+
+        timings, queries = [], []
+        status = None
+        for _ in range(self.iterations):
+            body = get_data()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.call(method, url, body, headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            status = response.status_code
+
+        timings.sort()
+        return {
+            "status": status,
+            "p50_ms": round(get_percentile(timings, 50), 3),
+            "p90_ms": round(get_percentile(timings, 90), 3),
+            "p95_ms": round(get_percentile(timings, 95), 3),
+            "p99_ms": round(get_percentile(timings, 99), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(timings[-1], 3),
+            "queries": max(queries),
+        }
+
+    def run(self, only=None):
+        context = self.get_context()
+        context["staff"] = self.add_manager(context)
+        headers = {"authorization": f"Token {context['token']}"}
+        results = {}
+        for name, method, url, data, authenticated in self.get_endpoints(context):
+            if only and name not in only:
+                continue
+            results[name] = self.measure(
+                method, url, data, headers if authenticated else {}
+            )
+        self.clean_up(context)
+
+        return {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "iterations": self.iterations,
+                "rows": {
+                    model.__name__: model.objects.count()
+                    for model in (Restaurant, MenuItem, User, Order, CustomerFeedback)
+                },
+            },
+            "endpoints": results,
+        }
+
+    def clean_up(self, context):
+        """Delete what the write endpoints created, the dataset stays as seeded"""
+        user = context["user"]
+        get_cart_store().clear(user.pk)
+        Order.objects.filter(user=user, pk__gt=context["last_order_id"]).delete()
+        User.objects.filter(email__startswith=REGISTRATION_EMAIL_PREFIX).delete()
+        if context["staff"] is not None:
+            context["staff"].delete()
+
+
+def compare_results(previous, current):
+    """Lines of p50 / p95 / query count changes between two runs"""
+    lines = []
+    for name, result in current["endpoints"].items():
+        before = previous.get("endpoints", {}).get(name)
+        if before is None:
+            lines.append(f"{name}: new")
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms"):
+            delta = result[key] - before[key]
+            ratio = delta / before[key] * 100 if before[key] else 0
+            changes.append(f"{key} {before[key]} -> {result[key]} ({ratio:+.0f}%)")
+        changes.append(f"queries {before['queries']} -> {result['queries']}")
+        lines.append(f"{name}: " + ", ".join(changes))
+    return lines
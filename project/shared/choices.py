@@ -16,3 +16,14 @@ class StaffRoleChoices(models.TextChoices):
     DELIVERY = "DELIVERY", "Delivery Staff"
     ASSISTANT = "ASSISTANT", "Assistant"
     EMPLOYEE = "EMPLOYEE", "Employee" # Default role
+
+
+class WeekdayChoices(models.IntegerChoices):
+    # Same numbering as date.weekday()
+    MONDAY = 0, "Monday"
+    TUESDAY = 1, "Tuesday"
+    WEDNESDAY = 2, "Wednesday"
+    THURSDAY = 3, "Thursday"
+    FRIDAY = 4, "Friday"
+    SATURDAY = 5, "Saturday"
+    SUNDAY = 6, "Sunday"
@@ -0,0 +1,304 @@
+"""
+simple_history integration shared by all the apps.
+
+BufferedHistoricalRecords behaves like HistoricalRecords, except that:
+
+- an update changing none of the tracked fields (BaseModelWithUID.save always
+  bumps updated_at) writes no historical row;
+- when HISTORY_BUFFER["ENABLED"] is set, historical rows are not inserted next
+  to every save anymore: they are queued once the transaction commits and
+  written with bulk_create by HistoryBuffer, at the end of the request
+  (DURABLE), when MAX_SIZE rows are queued, every FLUSH_INTERVAL seconds, and
+  on shutdown. Rows whose insert fails are queued again and dropped, logged,
+  after MAX_FLUSH_ATTEMPTS failed flushes.
+
+prune_history() applies the HISTORY_RETENTION_DAYS policy, see its docstring.
+"""
+
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.signals import pre_save
+from django.utils import timezone
+
+from simple_history.models import HistoricalRecords
+from simple_history.signals import (
+    post_create_historical_record,
+    pre_create_historical_record,
+)
+
+logger = logging.getLogger(__name__)
+
+# Flushes a queued historical row can fail before it is dropped
+MAX_FLUSH_ATTEMPTS = 3
+
+HISTORY_BUFFER_DEFAULTS = {
+    "ENABLED": False,
+    # Flush at the end of every request. When False only the timer flushes,
+    # and up to FLUSH_INTERVAL seconds of history is lost if the process dies.
+    "DURABLE": True,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_SIZE": 500,
+}
+
+
+def get_history_buffer_settings():
+    return {**HISTORY_BUFFER_DEFAULTS, **getattr(settings, "HISTORY_BUFFER", {})}
+
+
+class HistoryBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = []
+        self.timer_pid = None
+
+    def add(self, history_instance, instance, using):
+        config = get_history_buffer_settings()
+        with self.lock:
+            self.rows.append((history_instance, instance, using, 0))
+            full = len(self.rows) >= config["MAX_SIZE"]
+        self.ensure_timer(config["FLUSH_INTERVAL"])
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.rows = self.rows, []
+        if not rows:
+            return
+
+        grouped = defaultdict(list)
+        for history_instance, instance, using, attempts in rows:
+            key = (type(history_instance), using)
+            grouped[key].append((history_instance, instance, attempts))
+
+        failed = []
+        for (model, using), entries in grouped.items():
+            try:
+                with transaction.atomic(using=using):
+                    model.objects.using(using).bulk_create(
+                        [history_instance for history_instance, _, _ in entries],
+                        batch_size=500,
+                    )
+            except Exception:
+                logger.exception(
+                    "Could not write %s %s rows", len(entries), model._meta.label
+                )
+                failed.extend(
+                    (history_instance, instance, using, attempts + 1)
+                    for history_instance, instance, attempts in entries
+                )
+                continue
+
+            for history_instance, instance, _ in entries:
+                try:
+                    post_create_historical_record.send(
+                        sender=model,
+                        instance=instance,
+                        history_instance=history_instance,
+                        history_date=history_instance.history_date,
+                        history_user=history_instance.history_user,
+                        history_change_reason=history_instance.history_change_reason,
+                        using=using,
+                    )
+                except Exception:
+                    logger.exception("post_create_historical_record receiver failed")
+
+        if failed:
+            self.requeue(failed)
+
+    def requeue(self, rows):
+        """Queue rows again ahead of newer ones, drop those tried too many times"""
+        kept = [row for row in rows if row[3] < MAX_FLUSH_ATTEMPTS]
+        dropped = [row for row in rows if row[3] >= MAX_FLUSH_ATTEMPTS]
+        for history_instance, instance, using, attempts in dropped:
+            logger.error(
+                "Dropped the %s row of %s pk=%s after %s failed flushes",
+                type(history_instance)._meta.label,
+                instance._meta.label,
+                instance.pk,
+                attempts,
+            )
+        with self.lock:
+            self.rows[:0] = kept
+
+    def ensure_timer(self, interval):
+        # Threads do not survive a fork, so every worker process starts its own
+        if self.timer_pid == os.getpid():
+            return
+        with self.lock:
+            if self.timer_pid == os.getpid():
+                return
+            self.timer_pid = os.getpid()
+        thread = threading.Thread(
+            target=self.run_timer, args=(interval,), name="history-buffer", daemon=True
+        )
+        thread.start()
+
+    def run_timer(self, interval):
+        try:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("History buffer flush failed")
+                finally:
+                    close_old_connections()
+        finally:
+            # Lets the next add start a new timer
+            with self.lock:
+                if self.timer_pid == os.getpid():
+                    self.timer_pid = None
+
+
+history_buffer = HistoryBuffer()
+
+
+def flush_history():
+    """Write all the queued historical rows now"""
+    history_buffer.flush()
+
+
+atexit.register(flush_history)
+
+
+def flush_history_after_request(sender, **kwargs):
+    config = get_history_buffer_settings()
+    if config["ENABLED"] and config["DURABLE"]:
+        flush_history()
+
+
+request_finished.connect(flush_history_after_request)
+
+
+# Changed by every save, not a change of its own
+UNTRACKED_FIELDS = {"updated_at"}
+
+
+class BufferedHistoricalRecords(HistoricalRecords):
+    def finalize(self, sender, **kwargs):
+        super().finalize(sender, **kwargs)
+        if self.cls is sender or (self.inherit and issubclass(sender, self.cls)):
+            pre_save.connect(self.track_changes, sender=sender, weak=False)
+
+    def track_changes(self, instance, **kwargs):
+        # Dirty fields are compared to the DB state, so this has to run before saving
+        if instance._state.adding or not hasattr(instance, "get_dirty_fields"):
+            instance._history_unchanged = False
+            return
+
+        tracked = {field.name for field in self.fields_included(instance)}
+        dirty_fields = instance.get_dirty_fields(check_relationship=True)
+        instance._history_unchanged = not (
+            (dirty_fields.keys() & tracked) - UNTRACKED_FIELDS
+        )
+
+    def post_save(self, instance, created, using=None, **kwargs):
+        if not created and getattr(instance, "_history_unchanged", False):
+            return
+        super().post_save(instance, created, using=using, **kwargs)
+
+    def create_historical_record(self, instance, history_type, using=None):
+        if not get_history_buffer_settings()["ENABLED"]:
+            return super().create_historical_record(instance, history_type, using)
+
+        using = using if self.use_base_model_db else None
+        history_date = getattr(instance, "_history_date", timezone.now())
+        history_user = self.get_history_user(instance)
+        history_change_reason = self.get_change_reason_for_object(
+            instance, history_type, using
+        )
+        manager = getattr(instance, self.manager_name)
+
+        attrs = {}
+        for field in self.fields_included(instance):
+            attrs[field.attname] = getattr(instance, field.attname)
+
+        relation_field = getattr(manager.model, "history_relation", None)
+        if relation_field is not None:
+            attrs["history_relation"] = instance
+
+        history_instance = manager.model(
+            history_date=history_date,
+            history_type=history_type,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            **attrs,
+        )
+
+        # m2m history needs the primary key of the historical row right away
+        if history_instance._history_m2m_fields:
+            return super().create_historical_record(instance, history_type, using)
+
+        pre_create_historical_record.send(
+            sender=manager.model,
+            instance=instance,
+            history_date=history_date,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            history_instance=history_instance,
+            using=using,
+        )
+
+        # Queued only once committed, so rolled back saves leave no history
+        transaction.on_commit(
+            lambda: history_buffer.add(history_instance, instance, using), using=using
+        )
+
+
+def get_history_retention_days(model):
+    """Days of history kept for model by prune_history, None to keep it all"""
+    retention = getattr(settings, "HISTORY_RETENTION_DAYS", {})
+    return retention.get(model._meta.label, retention.get("default"))
+
+
+def get_historied_models():
+    return [
+        model
+        for model in apps.get_models()
+        if hasattr(model._meta, "simple_history_manager_attribute")
+    ]
+
+
+def prune_history(model, days, chunk_size=5000):
+    """
+    Delete the historical rows of model older than `days`, in chunks, and
+    return how many. The last of those rows of every object is kept as its
+    state at the cutoff, unless it records a deletion. Recent rows are kept.
+    """
+    history_model = getattr(model, model._meta.simple_history_manager_attribute).model
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    newer = history_model.objects.filter(
+        id=OuterRef("id"),
+        history_date__lt=cutoff,
+        history_id__gt=OuterRef("history_id"),
+    )
+    expired = history_model.objects.filter(history_date__lt=cutoff).filter(
+        Q(history_type="-") | Exists(newer)
+    )
+
+    deleted = 0
+    last_id = 0
+    while True:
+        # Walks the primary key, so rows kept are not scanned again
+        ids = list(
+            expired.filter(history_id__gt=last_id)
+            .order_by("history_id")
+            .values_list("history_id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        count, _ = history_model.objects.filter(history_id__in=ids).delete()
+        deleted += count
+        last_id = ids[-1]
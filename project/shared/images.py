@@ -0,0 +1,306 @@
+"""
+Content addressed image uploads and their resized variants.
+
+ProcessedImageField is an ImageField storing every upload under the SHA-256 of
+its content, <upload_to>/<2 first hex digits>/<hash>.<ext>. The upload is hashed
+while read in chunks and streamed to the storage by it, never held in memory,
+and an image already stored is not written again: the same photo uploaded for a
+hundred menu items is one file. Images saved with instance.image.save(name,
+content) are stored and processed the same way.
+
+Resizing is kept out of the request. Once the row is committed, the image is
+handed to the ImageProcessor thread pool (Pillow releases the GIL while decoding,
+resizing and encoding), which writes one file per size and format of
+IMAGE_VARIANTS, at variants/<hash>/<size>.<ext>. Variants of an image already
+processed for another row are reused as they are. Their names are then saved in
+the JSON field named by variants_field, by an UPDATE matching the image the
+variants were made of (so a newer upload is never overwritten with stale
+variants), and image_variants_ready is sent.
+
+variants_field is empty until then, and for images stored before the field was
+used: API responses have the original only. A failure to process an image
+(e.g. a corrupt upload) is logged and leaves the field empty, it never fails the
+request that saved the row. The process_images command produces the missing
+variants, e.g. of uploads whose job was lost with its process or failed.
+"""
+
+import functools
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import close_old_connections, models, transaction
+from django.db.models.fields.files import ImageFieldFile
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from django.utils import timezone
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS_DEFAULTS = {
+    # Longest side in pixels per size, images are never upscaled
+    "SIZES": {"thumbnail": 160, "list": 480, "detail": 1200},
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": 80,
+    # Threads producing variants per process, 0 produces them inline on commit
+    "WORKERS": 2,
+}
+
+# format: (Pillow format, file extension)
+IMAGE_FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp")}
+
+# Sent with the instance once the variants of its image are saved
+image_variants_ready = Signal()
+
+
+def get_image_settings():
+    return {**IMAGE_VARIANTS_DEFAULTS, **getattr(settings, "IMAGE_VARIANTS", {})}
+
+
+def hash_file(file):
+    """SHA-256 hex digest of the content of file, read in chunks"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class ProcessedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        # Stored and processed like an upload assigned to the field
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        self.name = self.field.store_file(self.instance, content, name)
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        self.field.mark_uploaded(self.instance)
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ProcessedImageField(models.ImageField):
+    """
+    ImageField deduplicating uploads by content hash, whose resized variants
+    are produced in the background into the JSONField named variants_field.
+    """
+
+    attr_class = ProcessedImageFieldFile
+
+    def __init__(self, *args, variants_field=None, **kwargs):
+        self.variants_field = variants_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.variants_field:
+            kwargs["variants_field"] = self.variants_field
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        # Like the dimension fields of ImageField, nothing to do on abstract models
+        if self.variants_field and not cls._meta.abstract:
+            post_save.connect(self.schedule_variants, sender=cls, weak=False)
+
+    def pre_save(self, instance, add):
+        file = getattr(instance, self.attname)
+        if file and not file._committed:
+            file.name = self.store_file(instance, file.file, file.name)
+            file._committed = True
+            self.mark_uploaded(instance)
+        elif not file and self.variants_field:
+            setattr(instance, self.variants_field, {})
+        return file
+
+    def store_file(self, instance, content, name):
+        """Store content under its hash, unless already stored. Returns its name."""
+        digest = hash_file(content)
+        extension = posixpath.splitext(name)[1].lower()
+        name = self.generate_filename(instance, f"{digest[:2]}/{digest}{extension}")
+        if not self.storage.exists(name):
+            name = self.storage.save(name, content, max_length=self.max_length)
+        return name
+
+    def mark_uploaded(self, instance):
+        """Empty the variants, produced again once the instance is saved"""
+        if self.variants_field:
+            setattr(instance, self.variants_field, {})
+            instance.__dict__.setdefault("_uploaded_images", set()).add(self.name)
+
+    def schedule_variants(self, sender, instance, created=False, **kwargs):
+        if self.name not in instance.__dict__.get("_uploaded_images", ()):
+            return
+        instance._uploaded_images.discard(self.name)
+        processor = get_image_processor()
+        transaction.on_commit(
+            lambda: processor.submit(sender, instance.pk, self.name),
+            using=kwargs.get("using"),
+        )
+
+
+def make_variant(image, longest_side, image_format, quality):
+    variant = image.copy()
+    variant.thumbnail((longest_side, longest_side))
+    pillow_format, _ = IMAGE_FORMATS[image_format]
+    if pillow_format == "JPEG" and variant.mode not in ("RGB", "L"):
+        # No alpha in JPEG, transparent pixels end up white
+        background = Image.new("RGB", variant.size, "white")
+        background.paste(variant, mask=variant.convert("RGBA").getchannel("A"))
+        variant = background
+    output = io.BytesIO()
+    variant.save(output, pillow_format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def make_variants(storage, name, config=None):
+    """Write the missing variants of the stored image name, return their names"""
+    config = config or get_image_settings()
+    with storage.open(name, "rb") as original:
+        directory = f"variants/{hash_file(original)}"
+        names = {
+            size: {
+                image_format: f"{directory}/{size}.{IMAGE_FORMATS[image_format][1]}"
+                for image_format in config["FORMATS"]
+            }
+            for size in config["SIZES"]
+        }
+        missing = [
+            (size, image_format)
+            for size, formats in names.items()
+            for image_format, variant_name in formats.items()
+            if not storage.exists(variant_name)
+        ]
+        if not missing:
+            return names
+
+        image = Image.open(original)
+        # Decodes JPEGs at a reduced scale straight away when they are large
+        largest = max(config["SIZES"].values())
+        image.draft(image.mode, (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        for size, image_format in missing:
+            content = make_variant(
+                image, config["SIZES"][size], image_format, config["QUALITY"]
+            )
+            names[size][image_format] = storage.save(
+                names[size][image_format], ContentFile(content)
+            )
+    return names
+
+
+def process_image(model, pk, field_name):
+    """Produce and save the variants of the image of one row, or return None"""
+    field = model._meta.get_field(field_name)
+    queryset = model._default_manager.filter(pk=pk)
+    name = queryset.values_list(field.attname, flat=True).first()
+    if not name:
+        return None
+
+    variants = make_variants(field.storage, name)
+    updates = {field.variants_field: variants}
+    if any(model_field.name == "updated_at" for model_field in model._meta.fields):
+        updates["updated_at"] = timezone.now()
+    # Only if the image is still the one the variants were made of
+    if not queryset.filter(**{field.attname: name}).update(**updates):
+        return None
+    image_variants_ready.send(sender=model, instance=queryset.first())
+    return variants
+
+
+def process_image_logged(model, pk, field_name):
+    """process_image, logging a failure and returning False instead of raising"""
+    try:
+        return process_image(model, pk, field_name)
+    except Exception:
+        logger.exception(
+            "Could not process %s.%s pk=%s", model._meta.label, field_name, pk
+        )
+        return False
+
+
+def process_image_in_thread(model, pk, field_name):
+    try:
+        return process_image_logged(model, pk, field_name)
+    finally:
+        close_old_connections()
+
+
+class ImageProcessor:
+    """
+    Produces image variants on a bounded thread pool, or inline without
+    workers. Jobs queued when the process stops are lost, process_images
+    catches up with them.
+    """
+
+    def __init__(self, max_workers):
+        self.executor = None
+        if max_workers:
+            self.executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="image-processor"
+            )
+
+    def submit(self, model, pk, field_name):
+        if self.executor is None:
+            # Runs on commit: the row is saved already, a failure is only logged
+            return process_image_logged(model, pk, field_name)
+        return self.executor.submit(process_image_in_thread, model, pk, field_name)
+
+
+@functools.lru_cache(maxsize=None)
+def get_image_processor():
+    return ImageProcessor(max_workers=get_image_settings()["WORKERS"])
+
+
+def get_processed_image_fields(models_to_scan=None):
+    """[(model, field)] of the ProcessedImageFields with variants"""
+    return [
+        (model, field)
+        for model in models_to_scan or apps.get_models()
+        for field in model._meta.fields
+        if isinstance(field, ProcessedImageField) and field.variants_field
+    ]
+
+
+def process_images(models_to_scan=None, reprocess=False, workers=None):
+    """
+    Produce the variants of the images without any (of every image when
+    reprocess), on workers threads. Images failing are logged and counted.
+    Returns {model label: {"processed": rows, "failed": rows}}.
+    """
+    workers = workers or get_image_settings()["WORKERS"] or 1
+    counts = {}
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="image-processor"
+    ) as executor:
+        for model, field in get_processed_image_fields(models_to_scan):
+            rows = model._default_manager.exclude(
+                **{f"{field.attname}__isnull": True}
+            ).exclude(**{field.attname: ""})
+            if not reprocess:
+                rows = rows.filter(**{field.variants_field: {}})
+            pks = list(rows.order_by("pk").values_list("pk", flat=True))
+            jobs = [
+                executor.submit(process_image_in_thread, model, pk, field.name)
+                for pk in pks
+            ]
+            label_counts = counts.setdefault(
+                model._meta.label, {"processed": 0, "failed": 0}
+            )
+            for job in jobs:
+                result = job.result()
+                if result is False:
+                    label_counts["failed"] += 1
+                elif result is not None:
+                    label_counts["processed"] += 1
+    return counts
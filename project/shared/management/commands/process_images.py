@@ -0,0 +1,47 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.images import process_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Produce the resized variants (IMAGE_VARIANTS) of the stored images "
+        "having none yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="app_label.Model to process, every model with images by default.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            dest="reprocess",
+            help="Also the images having variants, e.g. once sizes were added.",
+        )
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        models = None
+        if options["models"]:
+            try:
+                models = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as error:
+                raise CommandError(error)
+
+        counts = process_images(models, options["reprocess"], options["workers"])
+        for label, count in counts.items():
+            self.stdout.write(
+                f"{label}: {count['processed']} images processed, "
+                f"{count['failed']} failed"
+            )
+        if any(count["failed"] for count in counts.values()):
+            self.stdout.write(
+                self.style.WARNING("Images processed, failures were logged.")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Images processed."))
@@ -0,0 +1,46 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.history import (
+    get_historied_models,
+    get_history_retention_days,
+    prune_history,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the history rows older than the retention of their model "
+        "(HISTORY_RETENTION_DAYS), keeping the state of every object at the cutoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="app_label.Model to prune, all the models with history by default.",
+        )
+        parser.add_argument(
+            "--days", type=int, default=None, help="Overrides the retention."
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options["models"]:
+            try:
+                models = [apps.get_model(label) for label in options["models"]]
+            except (LookupError, ValueError) as error:
+                raise CommandError(error)
+        else:
+            models = get_historied_models()
+
+        for model in models:
+            days = options["days"]
+            if days is None:
+                days = get_history_retention_days(model)
+            if days is None:
+                continue
+            count = prune_history(model, days, options["chunk_size"])
+            self.stdout.write(f"{model._meta.label}: {count} rows deleted")
+        self.stdout.write(self.style.SUCCESS("History pruned."))
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from shared.benchmark import BenchmarkRunner, compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency percentiles and query counts of the API endpoints "
+        "against the seed_benchmark dataset, optionally saving them as JSON "
+        "and comparing them with a previous run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--output", help="File to save the results to")
+        parser.add_argument("--compare", help="Results of a previous run")
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            help="Only run this endpoint, can be repeated",
+        )
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            host=options["host"],
+        )
+        results = runner.run(only=options["endpoints"])
+
+        for name, result in results["endpoints"].items():
+            self.stdout.write(
+                f"{name:<24} {result['status']} p50 {result['p50_ms']:>8.2f}ms "
+                f"p95 {result['p95_ms']:>8.2f}ms p99 {result['p99_ms']:>8.2f}ms "
+                f"queries {result['queries']}"
+            )
+
+        if options["compare"]:
+            with open(options["compare"]) as previous:
+                for line in compare_results(json.load(previous), results):
+                    self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved to {options['output']}"))
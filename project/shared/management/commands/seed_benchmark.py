@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from shared.benchmark import BASE_COUNTS, BenchmarkSeeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk generate a synthetic dataset for benchmarks: restaurants, menus, "
+        "users, carts, orders, payments and feedback. At scale 1 that is "
+        f"{BASE_COUNTS['restaurants']} restaurants and {BASE_COUNTS['users']} users "
+        "with about ten orders each, --scale 100 gives millions of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1.0)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--seed", type=int, default=None, help="Seed of the random generator"
+        )
+
+    def handle(self, *args, **options):
+        seeder = BenchmarkSeeder(
+            scale=options["scale"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            log=self.stdout.write,
+        )
+        counts = seeder.run()
+        for name, count in counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Benchmark dataset created."))
@@ -1,12 +1,12 @@
 import uuid
 
-from autoslug import AutoSlugField
-
 from dirtyfields import DirtyFieldsMixin
 
 from django.db import models
 from django.utils import timezone
 
+from .slugs import UniqueSlugField
+
 
 class BaseModelWithUID(DirtyFieldsMixin, models.Model):
     class Meta:
@@ -24,7 +24,7 @@ class BaseModelWithUID(DirtyFieldsMixin, models.Model):
 
 
 class BaseModelWithUidAndSlug(BaseModelWithUID):
-    slug = AutoSlugField(populate_from='name', unique=True, always_update=False)
+    slug = UniqueSlugField(populate_from='name', unique=True, always_update=False)
     name = models.CharField(max_length=255)
 
     class Meta:
@@ -0,0 +1,197 @@
+"""Pagination classes shared by all the apps"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import filters, pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Keyset (seek) pagination over (created_at, id) of BaseModelWithUID models.
+
+    Instead of COUNT(*) + OFFSET every page is fetched with a
+    `WHERE (created_at, id) < (cursor)` range scan, so page 1000 costs the same
+    as page 1. The cursor is an opaque base64 token of the boundary row.
+
+    Seeking needs the (created_at, id) order, so a view declaring its own
+    `ordering` is paginated by page numbers (StandardPageNumberPagination)
+    instead of having its ordering silently replaced. So is a request asking
+    an OrderingFilter of the view for one of its `ordering_fields`: views opt
+    in to client ordering by declaring them, any other `?ordering=` is ignored
+    and keeps the keyset pages.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    # Newest first. Both fields must share the same direction.
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = _("Invalid cursor")
+    # Paginator of the requests with their own ordering
+    fallback = None
+
+    def has_own_ordering(self, request, queryset, view):
+        if view is None:
+            return False
+        if getattr(view, "ordering", None):
+            return True
+        if not getattr(view, "ordering_fields", None):
+            return False
+        return any(
+            issubclass(backend, filters.OrderingFilter)
+            and backend().get_ordering(request, queryset, view)
+            for backend in getattr(view, "filter_backends", ())
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if self.has_own_ordering(request, queryset, view):
+            self.fallback = StandardPageNumberPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor["r"]
+        descending = self.ordering[0].startswith("-")
+
+        if cursor is not None:
+            # Going backwards means seeking in the opposite direction
+            queryset = queryset.filter(
+                self.get_seek_filter(cursor, descending=descending != reverse)
+            )
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert_ordering(field) for field in ordering]
+
+        results = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_seek_filter(self, cursor, descending):
+        lookup = "lt" if descending else "gt"
+        return Q(**{f"created_at__{lookup}": cursor["c"]}) | Q(
+            created_at=cursor["c"], **{f"id__{lookup}": cursor["i"]}
+        )
+
+    @staticmethod
+    def invert_ordering(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            return {
+                "c": datetime.fromisoformat(data["c"]),
+                "i": int(data["i"]),
+                "r": bool(data["r"]),
+            }
+        except (binascii.Error, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        data = {"c": instance.created_at.isoformat(), "i": instance.pk, "r": reverse}
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        if getattr(view, "ordering", None):
+            return StandardPageNumberPagination().get_schema_operation_parameters(view)
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class StandardPageNumberPagination(pagination.PageNumberPagination):
+    """
+    Page number pagination for small lists that need a total count or page
+    jumps. Views opt in with `pagination_class = StandardPageNumberPagination`.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,241 @@
+"""
+Per-request query profiling.
+
+QueryProfilingMiddleware wraps every database query of a request to record
+the query count and DB time per view, and spots N+1 patterns: the same SQL
+(placeholders, not values) run QUERY_PROFILING["DUPLICATE_THRESHOLD"] times or
+more, reported with the project stack that issued it. Reports are logged on the
+"shared.profiling" logger, summed per view (get_view_stats) and sent back in the
+X-DB-Queries / X-DB-Time headers.
+
+QUERY_PROFILING["BUDGETS"] maps view names to a maximum query count, raising
+QueryBudgetExceeded when ENFORCE_BUDGETS is set (in tests). query_budget() does
+the same around any block of code.
+
+When ENABLED is false the middleware removes itself from the stack at startup
+(MiddlewareNotUsed), so it costs nothing.
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+QUERY_PROFILING_DEFAULTS = {
+    "ENABLED": False,
+    # Runs of the same SQL in one request reported as an N+1 pattern
+    "DUPLICATE_THRESHOLD": 3,
+    # Project frames kept in the stack of a duplicated query
+    "STACK_DEPTH": 6,
+    "RESPONSE_HEADERS": True,
+    # {view name: max queries}
+    "BUDGETS": {},
+    "ENFORCE_BUDGETS": False,
+}
+
+# Frames of the standard library and installed packages are not the code to fix
+LIBRARY_PATH = os.path.dirname(os.__file__)
+
+
+def get_profiling_settings():
+    return {**QUERY_PROFILING_DEFAULTS, **getattr(settings, "QUERY_PROFILING", {})}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def is_project_frame(frame):
+    return not (
+        frame.filename.startswith(LIBRARY_PATH)
+        or "site-packages" in frame.filename
+        or frame.filename == __file__
+    )
+
+
+def get_caller_stack(depth):
+    frames = [frame for frame in traceback.extract_stack() if is_project_frame(frame)]
+    return [
+        f"{frame.filename}:{frame.lineno} in {frame.name}" for frame in frames[-depth:]
+    ]
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries per SQL template"""
+
+    def __init__(self, duplicate_threshold=3, stack_depth=6):
+        self.duplicate_threshold = duplicate_threshold
+        self.stack_depth = stack_depth
+        self.counts = Counter()
+        self.stacks = {}
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            key = (context["connection"].alias, sql)
+            self.counts[key] += 1
+            # Taken once per template, on its first repeat
+            if self.counts[key] == 2:
+                self.stacks[key] = get_caller_stack(self.stack_depth)
+
+    @property
+    def query_count(self):
+        return sum(self.counts.values())
+
+    def get_duplicates(self):
+        duplicates = [
+            {
+                "database": alias,
+                "sql": sql,
+                "count": count,
+                "stack": self.stacks.get((alias, sql), []),
+            }
+            for (alias, sql), count in self.counts.items()
+            if count >= self.duplicate_threshold
+        ]
+        return sorted(duplicates, key=lambda duplicate: -duplicate["count"])
+
+    def get_report(self):
+        return {
+            "queries": self.query_count,
+            "db_time_ms": round(self.duration * 1000, 3),
+            "duplicates": self.get_duplicates(),
+        }
+
+
+def format_report(title, report):
+    lines = [f"{title}: {report['queries']} queries in {report['db_time_ms']}ms"]
+    for duplicate in report["duplicates"]:
+        lines.append(f"  {duplicate['count']}x {duplicate['sql']}")
+        lines += [f"    {frame}" for frame in duplicate["stack"]]
+    return "\n".join(lines)
+
+
+class ViewStats:
+    """Totals per view name since the process started"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def add(self, view_name, report):
+        with self.lock:
+            stats = self.views.setdefault(
+                view_name,
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_time_ms": 0.0,
+                    "n_plus_one": 0,
+                },
+            )
+            stats["requests"] += 1
+            stats["queries"] += report["queries"]
+            stats["max_queries"] = max(stats["max_queries"], report["queries"])
+            stats["db_time_ms"] += report["db_time_ms"]
+            stats["n_plus_one"] += bool(report["duplicates"])
+
+    def get(self):
+        with self.lock:
+            return {name: dict(stats) for name, stats in self.views.items()}
+
+
+view_stats = ViewStats()
+
+
+def get_view_stats():
+    return view_stats.get()
+
+
+@contextlib.contextmanager
+def record_queries(using=None, duplicate_threshold=3, stack_depth=6):
+    """Record the queries of the block, on every database unless `using`"""
+    recorder = QueryRecorder(duplicate_threshold, stack_depth)
+    aliases = [using] if using else list(connections)
+    with contextlib.ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@contextlib.contextmanager
+def query_budget(max_queries, using=DEFAULT_DB_ALIAS, allow_duplicates=True):
+    """
+    Fail with QueryBudgetExceeded when the block runs more than max_queries
+    queries, or any N+1 pattern when allow_duplicates is false:
+
+        with query_budget(3):
+            client.get("/api/v1/me/orders")
+    """
+    config = get_profiling_settings()
+    with record_queries(
+        using, config["DUPLICATE_THRESHOLD"], config["STACK_DEPTH"]
+    ) as recorder:
+        yield recorder
+
+    report = recorder.get_report()
+    if report["queries"] > max_queries:
+        raise QueryBudgetExceeded(
+            format_report(f"Query budget of {max_queries} exceeded", report)
+        )
+    if not allow_duplicates and report["duplicates"]:
+        raise QueryBudgetExceeded(format_report("N+1 queries", report))
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        if not get_profiling_settings()["ENABLED"]:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Read per request so tests can override the budgets
+        config = get_profiling_settings()
+        with record_queries(
+            duplicate_threshold=config["DUPLICATE_THRESHOLD"],
+            stack_depth=config["STACK_DEPTH"],
+        ) as recorder:
+            response = self.get_response(request)
+
+        report = recorder.get_report()
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        view_stats.add(view_name, report)
+
+        if report["duplicates"]:
+            logger.warning(
+                format_report(f"N+1 queries in {request.method} {view_name}", report)
+            )
+        else:
+            logger.debug(format_report(f"{request.method} {view_name}", report))
+
+        if config["RESPONSE_HEADERS"]:
+            response["X-DB-Queries"] = str(report["queries"])
+            response["X-DB-Time"] = f"{report['db_time_ms']}ms"
+
+        budget = config["BUDGETS"].get(view_name)
+        if (
+            config["ENFORCE_BUDGETS"]
+            and budget is not None
+            and report["queries"] > budget
+        ):
+            raise QueryBudgetExceeded(
+                format_report(
+                    f"Query budget of {budget} exceeded by {view_name}", report
+                )
+            )
+        return response
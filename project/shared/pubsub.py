@@ -0,0 +1,196 @@
+"""
+Publish/subscribe used to push events to long lived async connections.
+
+InProcessBroker fans messages out to the subscribers of the current process.
+RedisBroker publishes through Redis, and every process keeps a single Redis
+subscription that it fans out locally, so an idle subscriber costs one small
+asyncio queue and no connection. When Redis fails the subscription is opened
+again, with an exponential backoff, for every channel still subscribed;
+messages published meanwhile are lost.
+"""
+
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Bounded queue of messages for one subscriber, fed from any thread"""
+
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, message)
+        except RuntimeError:
+            # The event loop of the subscriber is already closed
+            pass
+
+    def put_nowait(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer, drop the message rather than growing without bound
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self.dispatch(channel, message)
+
+    def dispatch(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+            first = len(self.subscriptions[channel]) == 1
+        if first:
+            await self.channel_opened(channel)
+
+        try:
+            yield subscription
+        finally:
+            with self.lock:
+                self.subscriptions[channel].discard(subscription)
+                last = not self.subscriptions[channel]
+                if last:
+                    del self.subscriptions[channel]
+            if last:
+                await self.channel_closed(channel)
+
+    async def channel_opened(self, channel):
+        pass
+
+    async def channel_closed(self, channel):
+        pass
+
+
+class RedisBroker(InProcessBroker):
+    def __init__(self, url, queue_size=100, retry_delay=1.0, max_retry_delay=30.0):
+        super().__init__(queue_size=queue_size)
+        self.url = url
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.client = None
+        self.pubsub = None
+        self.listener = None
+
+    def get_client(self):
+        if self.client is None:
+            import redis
+
+            self.client = redis.Redis.from_url(self.url)
+        return self.client
+
+    def publish(self, channel, message):
+        self.get_client().publish(channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    async def get_pubsub(self):
+        if self.pubsub is None:
+            import redis.asyncio
+
+            self.pubsub = redis.asyncio.Redis.from_url(self.url).pubsub()
+        return self.pubsub
+
+    async def close_pubsub(self):
+        pubsub, self.pubsub = self.pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass
+
+    async def resubscribe(self):
+        """New subscription to every channel with subscribers"""
+        pubsub = await self.get_pubsub()
+        with self.lock:
+            channels = list(self.subscriptions)
+        if channels:
+            await pubsub.subscribe(*channels)
+        return pubsub
+
+    async def channel_opened(self, channel):
+        try:
+            pubsub = await self.get_pubsub()
+            await pubsub.subscribe(channel)
+        except Exception:
+            # The listener subscribes to it again once reconnected
+            logger.warning("Could not subscribe to %s", channel, exc_info=True)
+            await self.close_pubsub()
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+    async def channel_closed(self, channel):
+        if self.pubsub is None:
+            return
+        try:
+            await self.pubsub.unsubscribe(channel)
+        except Exception:
+            logger.warning("Could not unsubscribe from %s", channel, exc_info=True)
+            await self.close_pubsub()
+
+    async def listen(self):
+        delay = self.retry_delay
+        pubsub = None
+        while True:
+            try:
+                # A new subscription, after a failure here or in channel_opened
+                if pubsub is None or pubsub is not self.pubsub:
+                    pubsub = await self.resubscribe()
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except Exception:
+                logger.warning(
+                    "Redis subscription lost, reconnecting in %ss", delay, exc_info=True
+                )
+                await self.close_pubsub()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+            delay = self.retry_delay
+
+            if message is None or message["type"] != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                data = json.loads(message["data"])
+            except ValueError:
+                logger.warning("Dropped a malformed message on %s", channel)
+                continue
+            self.dispatch(channel, data)
+
+
+@functools.lru_cache(maxsize=None)
+def get_broker():
+    config = getattr(settings, "PUBSUB", {})
+    backend = import_string(config.get("BACKEND", "shared.pubsub.InProcessBroker"))
+    return backend(**config.get("OPTIONS", {}))
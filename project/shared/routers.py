@@ -0,0 +1,171 @@
+"""
+Primary / read replica routing.
+
+Writes always go to the primary ("default"). Reads go to a healthy replica of
+DATABASE_REPLICAS, except:
+
+- inside a transaction on the primary, and for the rest of a request once it
+  wrote something or when it is not a safe (GET, HEAD, OPTIONS) request;
+- for DATABASE_PRIMARY_PIN_SECONDS after a client wrote, so whatever it just
+  created (an order at checkout...) is never missing from a lagging replica.
+  Clients are told apart by their Authorization header or session cookie.
+
+Writes only pin the reads that follow them inside a request
+(PrimaryPinningMiddleware) or a use_primary() block, which reset the pin when
+they end. Elsewhere (management commands, worker threads) nothing would ever
+reset it, so a write there leaves the reads of the thread alone.
+
+Replicas are checked with a `SELECT 1` at most every
+DATABASE_REPLICA_HEALTH_CHECK_INTERVAL seconds per process. A failing replica is
+skipped until its next check, and reads fall back to the primary when none is
+left. Without replicas everything stays on the primary.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set for the current request / task when reads must see the primary
+primary_pinned = contextvars.ContextVar("primary_pinned", default=False)
+# Set once the current request / task was routed to the primary for a write
+primary_written = contextvars.ContextVar("primary_written", default=False)
+# Set inside a request or a use_primary() block, the scopes of primary_written
+primary_scope = contextvars.ContextVar("primary_scope", default=False)
+
+
+def get_replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Send all the reads of the block to the primary"""
+    pinned_token = primary_pinned.set(True)
+    # Within a request the writes of the block keep pinning the rest of it
+    written_token = None if primary_scope.get() else primary_written.set(False)
+    scope_token = primary_scope.set(True)
+    try:
+        yield
+    finally:
+        primary_scope.reset(scope_token)
+        if written_token is not None:
+            primary_written.reset(written_token)
+        primary_pinned.reset(pinned_token)
+
+
+class ReplicaHealth:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # alias: (healthy, checked at)
+        self.states = {}
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, "DATABASE_REPLICA_HEALTH_CHECK_INTERVAL", 10)
+        healthy, checked_at = self.states.get(alias, (True, None))
+        if checked_at is not None and time.monotonic() - checked_at < interval:
+            return healthy
+
+        healthy = self.check(alias)
+        with self.lock:
+            self.states[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def check(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except Exception:
+            connections[alias].close()
+            return False
+
+
+replica_health = ReplicaHealth()
+
+
+class ReadReplicaRouter:
+    def get_read_database(self):
+        replicas = get_replicas()
+        if not replicas or primary_pinned.get() or primary_written.get():
+            return DEFAULT_DB_ALIAS
+        # Reads of a transaction have to see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        healthy = [alias for alias in replicas if replica_health.is_healthy(alias)]
+        if not healthy:
+            return DEFAULT_DB_ALIAS
+        return random.choice(healthy)
+
+    def db_for_read(self, model, **hints):
+        return self.get_read_database()
+
+    def db_for_write(self, model, **hints):
+        # Reads following a write in the same request go to the primary
+        if primary_scope.get():
+            primary_written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in get_replicas():
+            return False
+        return None
+
+
+def get_client_pin_key(request):
+    identity = request.headers.get("Authorization") or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not identity:
+        return None
+    return "db:pin:" + hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+class PrimaryPinningMiddleware:
+    """Read-your-writes for clients, see the module docstring"""
+
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_key = get_client_pin_key(request)
+        pinned = request.method not in self.safe_methods or (
+            pin_key is not None and cache.get(pin_key) is not None
+        )
+        pinned_token = primary_pinned.set(pinned)
+        written_token = primary_written.set(False)
+        scope_token = primary_scope.set(True)
+        try:
+            response = self.get_response(request)
+            wrote = primary_written.get()
+        finally:
+            primary_scope.reset(scope_token)
+            primary_pinned.reset(pinned_token)
+            primary_written.reset(written_token)
+
+        if wrote and pin_key is not None:
+            cache.set(
+                pin_key,
+                1,
+                timeout=getattr(settings, "DATABASE_PRIMARY_PIN_SECONDS", 5),
+            )
+        return response
@@ -0,0 +1,38 @@
+"""Serializer fields shared by all the apps"""
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+
+from rest_framework import serializers
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class ImageVariantsField(serializers.Field):
+    """
+    {size: {format: url}} of the variants of a ProcessedImageField (see
+    shared.images), null until they are produced.
+    """
+
+    def __init__(self, image_field="image", **kwargs):
+        self.image_field = image_field
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        field = instance._meta.get_field(self.image_field)
+        variants = getattr(instance, field.variants_field)
+        if not variants:
+            return None
+
+        request = self.context.get("request")
+
+        def get_url(name):
+            url = field.storage.url(name)
+            # Absolute like the URL of the original, see serializers.ImageField
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            size: {image_format: get_url(name) for image_format, name in formats.items()}
+            for size, formats in variants.items()
+        }
@@ -0,0 +1,141 @@
+"""
+Unique slugs allocated with one query.
+
+AutoSlugField(unique=True) makes a slug unique by probing `burger`, `burger-2`,
+`burger-3`... with one query each, on every save and for every row of a
+bulk_create, where two rows of the batch can even end up with the same slug.
+UniqueSlugField reads the taken slugs of a base with one query instead
+(slug = base OR slug LIKE 'base-%' AND slug ~ '^base-[0-9]+$') and picks the
+lowest free index in memory, the slug AutoSlugField would have picked. The
+LIKE keeps the lookup on the slug index, the regex keeps longer slugs sharing
+the base (`burger-king-2` for `burger`) out of the result.
+
+allocate_slugs() does it for a whole batch before a bulk_create, with one query
+for every base of the batch, and marks the instances so that saving them keeps
+the allocated slug without querying again. Saves of existing rows whose slug did
+not change do not query at all.
+
+Like AutoSlugField, two transactions allocating the same base at the same time
+can pick the same slug; the unique constraint rejects the second one.
+"""
+
+import re
+
+from autoslug import AutoSlugField
+from autoslug.utils import crop_slug, get_prepopulated_value
+
+from django.db.models import Q
+
+# {field name: slug} set on instances by allocate_slugs
+ALLOCATED_SLUGS_ATTR = "_allocated_slugs"
+
+# Digits of the largest index the taken slugs of a long base are looked up for
+MAX_INDEX_DIGITS = 6
+
+
+def get_slug_base(field, instance):
+    """Slug of the instance before an index is appended, as AutoSlugField makes it"""
+    value = field.value_from_object(instance)
+    if field.always_update or (field.populate_from and not value):
+        value = get_prepopulated_value(field, instance)
+    slug = field.slugify(value) if value else ""
+    return field.slugify(crop_slug(field, slug or instance._meta.model_name))
+
+
+def get_index_pattern(field, base):
+    """Regex of the slugs base-N, with base cropped to fit like get_free_slug"""
+    separator = re.escape(field.index_sep)
+    cropped = base[: field.max_length - len(field.index_sep) - MAX_INDEX_DIGITS]
+    if cropped == base:
+        return rf"^{re.escape(base)}{separator}\d+$"
+    alternatives = "|".join(
+        rf"{re.escape(base[: field.max_length - len(field.index_sep) - digits])}"
+        rf"{separator}\d{{{digits}}}"
+        for digits in range(1, MAX_INDEX_DIGITS + 1)
+    )
+    return rf"^(?:{alternatives})$"
+
+
+def get_taken_slugs(field, bases, exclude_pks=()):
+    """Slugs in the table equal to one of bases or to one of them with an index"""
+    lookup = Q()
+    for base in bases:
+        # A base too long for base-N to fit is cropped to make room for -N
+        prefix = base[: field.max_length - len(field.index_sep) - MAX_INDEX_DIGITS]
+        if prefix == base:
+            prefix = f"{base}{field.index_sep}"
+        lookup |= Q(**{field.name: base}) | Q(
+            **{
+                f"{field.name}__startswith": prefix,
+                f"{field.name}__regex": get_index_pattern(field, base),
+            }
+        )
+    queryset = field.model._default_manager.filter(lookup)
+    if exclude_pks:
+        queryset = queryset.exclude(pk__in=exclude_pks)
+    return set(queryset.values_list(field.name, flat=True))
+
+
+def get_free_slug(field, base, taken):
+    """base, or base-2, base-3... whichever is first not in taken"""
+    slug, index = base, 1
+    while slug in taken:
+        index += 1
+        tail = f"{field.index_sep}{index}"
+        slug = f"{base[: field.max_length - len(tail)]}{tail}"
+    return slug
+
+
+def allocate_slugs(instances, field_name="slug"):
+    """
+    Set a slug not taken in the table nor in the batch on every instance, with
+    one query, and mark it as allocated so that saving keeps it.
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    field = instances[0]._meta.get_field(field_name)
+    bases = {}
+    for instance in instances:
+        bases.setdefault(get_slug_base(field, instance), []).append(instance)
+
+    taken = get_taken_slugs(
+        field,
+        bases,
+        exclude_pks=[instance.pk for instance in instances if instance.pk],
+    )
+    for base, base_instances in bases.items():
+        for instance in base_instances:
+            slug = get_free_slug(field, base, taken)
+            taken.add(slug)
+            setattr(instance, field.attname, slug)
+            instance.__dict__.setdefault(ALLOCATED_SLUGS_ATTR, {})[field.name] = slug
+    return instances
+
+
+class UniqueSlugField(AutoSlugField):
+    """AutoSlugField(unique=True) allocating the slug with one query"""
+
+    def is_allocated(self, instance, add, slug):
+        allocated = instance.__dict__.get(ALLOCATED_SLUGS_ATTR, {})
+        if allocated.get(self.name) == slug:
+            return True
+        # An existing row keeping its slug is unique already
+        if add or self.always_update or not hasattr(instance, "get_dirty_fields"):
+            return False
+        return self.attname not in instance.get_dirty_fields()
+
+    def pre_save(self, instance, add):
+        slug = self.value_from_object(instance)
+        # simple_history copies the field to the historical models without its
+        # unique constraint (AutoSlugField's own `unique` flag is left set, so it
+        # would make history rows unique), history rows keep the slug as it is
+        if not self._unique and slug and not self.always_update:
+            return slug
+        if self.unique_with or not self._unique or self.manager or self.manager_name:
+            return super().pre_save(instance, add)
+
+        if slug and self.is_allocated(instance, add, slug):
+            return slug
+        allocate_slugs([instance], self.name)
+        return self.value_from_object(instance)
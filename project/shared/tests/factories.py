@@ -0,0 +1,60 @@
+"""Minimal model factories for the tests of every app"""
+
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from order.models import Order
+from restaurant.models import MenuCategory, MenuItem, Restaurant
+
+PASSWORD = "Passw0rd!"
+
+sequence = itertools.count(1)
+
+
+def make_user(email=None, first_name="Jo", last_name="Doe", **kwargs):
+    email = email or f"user{next(sequence)}@example.com"
+    return get_user_model().objects.create_user(
+        first_name, last_name, email, PASSWORD, **kwargs
+    )
+
+
+def make_client(user=None):
+    """APIClient authenticated with the token of user, anonymous without one"""
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def make_restaurant(name="Burger Hub", **kwargs):
+    number = next(sequence)
+    kwargs.setdefault("CEO_name", "Ceo")
+    kwargs.setdefault("tax_number", f"tax-{number}")
+    kwargs.setdefault("registration_no", f"reg-{number}")
+    return Restaurant.objects.create(name=name, **kwargs)
+
+
+def make_menu_item(restaurant=None, name="Burger", price="5.00", **kwargs):
+    restaurant = restaurant or make_restaurant()
+    category = restaurant.menu_categories.first()
+    if category is None:
+        category = MenuCategory.objects.create(name="Mains", restaurant=restaurant)
+    return MenuItem.objects.create(
+        name=name, menu_category=category, price=Decimal(price), **kwargs
+    )
+
+
+def make_order(user=None, restaurant=None, total_price="10.00", **kwargs):
+    kwargs.setdefault("delivery_address", "Road 1")
+    return Order.objects.create(
+        user=user or make_user(),
+        restaurant=restaurant or make_restaurant(),
+        total_price=Decimal(total_price),
+        **kwargs,
+    )
@@ -0,0 +1,163 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from order.admin import OrderAdmin
+from order.models import Order, Payment
+from shared.admin import EstimatedCountPaginator, get_estimated_count
+from shared.tests.factories import PASSWORD, make_order, make_restaurant, make_user
+
+
+class AdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = get_user_model().objects.create_superuser(
+            "Ad", "Min", "admin@example.com", PASSWORD
+        )
+        cls.user = make_user()
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+
+class ChangeListTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant = make_restaurant()
+
+    def make_orders(self, count):
+        return [make_order(self.user, self.restaurant) for _ in range(count)]
+
+    def get_changelist(self, model, **params):
+        opts = model._meta
+        url = reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_queries_do_not_grow_with_the_rows(self):
+        self.make_orders(2)
+        _, few = self.get_changelist(Order)
+        other_restaurant = make_restaurant()
+        for _ in range(5):
+            make_order(make_user(), other_restaurant)
+        response, many = self.get_changelist(Order)
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.context["cl"].result_list), 7)
+
+    def test_older_link(self):
+        orders = self.make_orders(5)
+        with mock.patch.object(OrderAdmin, "list_per_page", 2):
+            response, _ = self.get_changelist(Order)
+            cl = response.context["cl"]
+            self.assertEqual(list(cl.result_list), [orders[4], orders[3]])
+            self.assertEqual(cl.older_query["id__lt"], str(orders[3].pk))
+            self.assertContains(response, "Older entries")
+
+            response, _ = self.get_changelist(Order, **cl.older_query)
+            cl = response.context["cl"]
+            self.assertEqual(list(cl.result_list), [orders[2], orders[1]])
+
+            response, _ = self.get_changelist(Order, id__lt=orders[1].pk)
+            self.assertIsNone(response.context["cl"].older_query)
+            self.assertNotContains(response, "Older entries")
+
+    def test_no_older_link_when_sorted(self):
+        self.make_orders(3)
+        with mock.patch.object(OrderAdmin, "list_per_page", 2):
+            response, _ = self.get_changelist(Order, o="4")
+        self.assertIsNone(response.context["cl"].older_query)
+
+    def test_exact_search(self):
+        order, _ = self.make_orders(2)
+        response, _ = self.get_changelist(Order, q=str(order.uid))
+        self.assertEqual(list(response.context["cl"].result_list), [order])
+        response, _ = self.get_changelist(Order, q=str(order.uid)[:8])
+        self.assertEqual(list(response.context["cl"].result_list), [])
+
+    def test_payment_changelist(self):
+        order = self.make_orders(1)[0]
+        Payment.objects.create(order=order, amount=10, payment_method="CASH")
+        response, _ = self.get_changelist(Payment)
+        self.assertContains(response, str(order.uid))
+
+    def test_date_hierarchy_only_on_bounded_tables(self):
+        order = self.make_orders(1)[0]
+        Payment.objects.create(order=order, amount=10, payment_method="CASH")
+        with CaptureQueriesContext(connection) as queries:
+            self.get_changelist(Payment)
+        self.assertFalse(
+            any("DISTINCT" in query["sql"].upper() for query in queries),
+            [query["sql"] for query in queries],
+        )
+        response, _ = self.get_changelist(Order)
+        self.assertIsNotNone(response.context["cl"].date_hierarchy)
+
+    def test_every_changelist_renders(self):
+        order = self.make_orders(1)[0]
+        Payment.objects.create(order=order, amount=10, payment_method="CASH")
+        for model in admin.site._registry:
+            with self.subTest(model=model.__name__):
+                self.get_changelist(model)
+
+    def test_order_change_page(self):
+        order = self.make_orders(1)[0]
+        response = self.client.get(reverse("admin:order_order_change", args=[order.pk]))
+        self.assertEqual(response.status_code, 200)
+        # Foreign keys are raw ids, not a <select> of every user
+        self.assertContains(response, 'name="user" value="')
+        self.assertNotContains(response, '<select name="user"')
+
+
+class HistoryAdminTests(AdminTestCase):
+    def test_read_only(self):
+        order = make_order(self.user)
+        order.order_status = "CANCELLED"
+        order.save()
+        history = order.history.model
+        url = reverse("admin:order_historicalorder_changelist")
+
+        response = self.client.get(url, {"q": order.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cl"].result_list), 2)
+
+        record = history.objects.filter(id=order.pk).first()
+        change_url = reverse(
+            "admin:order_historicalorder_change", args=[record.history_id]
+        )
+        self.assertEqual(self.client.get(change_url).status_code, 200)
+        self.assertEqual(self.client.post(change_url, {}).status_code, 403)
+        add_url = reverse("admin:order_historicalorder_add")
+        self.assertEqual(self.client.get(add_url).status_code, 403)
+
+
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        self.orders = [make_order() for _ in range(3)]
+
+    def test_estimate_from_the_primary_key(self):
+        self.orders[0].delete()
+        self.assertEqual(get_estimated_count(Order.objects.all()), self.orders[-1].pk)
+
+    def test_estimate_used_above_the_limit(self):
+        paginator = EstimatedCountPaginator(Order.objects.order_by("-pk"), 2)
+        paginator.count_limit = 1
+        self.assertEqual(paginator.count, self.orders[-1].pk)
+
+    def test_exact_count_below_the_limit(self):
+        paginator = EstimatedCountPaginator(Order.objects.order_by("-pk"), 2)
+        self.orders[0].delete()
+        self.assertEqual(paginator.count, 2)
+
+    def test_filtered_count_capped(self):
+        queryset = Order.objects.filter(total_price__gt=0).order_by("-pk")
+        paginator = EstimatedCountPaginator(queryset, 2)
+        paginator.count_limit = 2
+        self.assertEqual(paginator.count, 2)
+
@@ -0,0 +1,132 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import SimpleTestCase, TestCase
+
+from order.models import CartItem, DailySalesRollup, HourlySalesRollup, Order
+from order.utils import TERMINAL_ORDER_STATUSES
+from restaurant.models import (
+    MenuItem,
+    Restaurant,
+    RestaurantOpenSlot,
+    RestaurantStaff,
+)
+from restaurant.search import search_menu_items
+from shared.benchmark import (
+    BenchmarkRunner,
+    BenchmarkSeeder,
+    compare_results,
+    get_percentile,
+)
+
+User = get_user_model()
+
+# One restaurant and ten users
+SCALE = 0.005
+# The only host allowed by the test runner
+HOST = "testserver"
+
+
+class BenchmarkSeederTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counts = BenchmarkSeeder(scale=SCALE, batch_size=50, seed=1).run()
+
+    def test_counts(self):
+        self.assertEqual(self.counts["Restaurant"], 1)
+        self.assertEqual(self.counts["User"], 10)
+        self.assertEqual(self.counts["MenuItem"], 40)
+        self.assertEqual(self.counts["Order"], Order.objects.count())
+        self.assertEqual(self.counts["Payment"], self.counts["Order"])
+
+    def test_sales_rollups_rebuilt(self):
+        terminal_orders = Order.objects.filter(
+            order_status__in=TERMINAL_ORDER_STATUSES
+        ).aggregate(order_count=Count("id"), revenue=Sum("total_price"))
+        self.assertGreater(terminal_orders["order_count"], 0)
+        for model in (DailySalesRollup, HourlySalesRollup):
+            rollups = model.objects.aggregate(
+                order_count=Sum("order_count"), revenue=Sum("revenue")
+            )
+            self.assertEqual(rollups, terminal_orders)
+
+    def test_derived_data_rebuilt(self):
+        restaurant = Restaurant.objects.get()
+        self.assertGreater(restaurant.rating_count, 0)
+        self.assertTrue(RestaurantOpenSlot.objects.filter(restaurant=restaurant))
+        menu_item = MenuItem.objects.filter(is_available=True).first()
+        self.assertIn(menu_item, search_menu_items(menu_item.name, limit=100))
+
+    def test_seeding_twice(self):
+        counts = BenchmarkSeeder(scale=SCALE, batch_size=50, seed=1).run()
+        self.assertEqual(counts["Restaurant"], 1)
+        self.assertEqual(Restaurant.objects.count(), 2)
+
+    def test_runner(self):
+        counts = {model: model.objects.count() for model in (Order, User)}
+        results = BenchmarkRunner(iterations=2, warmup=1, host=HOST).run()
+        self.assertEqual(results["meta"]["rows"]["Restaurant"], 1)
+        statuses = {
+            name: result["status"] for name, result in results["endpoints"].items()
+        }
+        self.assertLessEqual(set(statuses.values()), {200, 201, 204}, statuses)
+        self.assertEqual(statuses["me.checkout"], 201)
+        self.assertEqual(statuses["registration"], 201)
+        self.assertEqual(statuses["restaurants.sales"], 200)
+        # What the write endpoints created is deleted
+        self.assertEqual(
+            {model: model.objects.count() for model in (Order, User)}, counts
+        )
+        user = BenchmarkRunner().get_context()["user"]
+        self.assertFalse(CartItem.objects.filter(cart__user=user).exists())
+        self.assertFalse(RestaurantStaff.objects.filter(user=user).exists())
+
+    def test_runner_checkout_only(self):
+        runner = BenchmarkRunner(iterations=2, warmup=0, host=HOST)
+        results = runner.run(only=["me.checkout"])
+        self.assertEqual(results["endpoints"]["me.checkout"]["status"], 201)
+
+    def test_runner_only(self):
+        runner = BenchmarkRunner(iterations=1, warmup=0, host=HOST)
+        results = runner.run(only=["me.orders"])
+        self.assertEqual(list(results["endpoints"]), ["me.orders"])
+        self.assertGreater(results["endpoints"]["me.orders"]["queries"], 0)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_seed_command(self):
+        out = StringIO()
+        call_command("seed_benchmark", scale=SCALE, seed=1, stdout=out)
+        self.assertIn("Restaurant: 1", out.getvalue())
+        self.assertIn("Benchmark dataset created.", out.getvalue())
+
+    def test_runner_without_data(self):
+        with self.assertRaisesMessage(ValueError, "No benchmark data"):
+            BenchmarkRunner().run()
+
+
+class BenchmarkResultTests(SimpleTestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(get_percentile(values, 50), 50)
+        self.assertEqual(get_percentile(values, 99), 99)
+        self.assertEqual(get_percentile([7], 95), 7)
+        self.assertEqual(get_percentile([], 50), 0.0)
+
+    def test_compare_results(self):
+        previous = {"endpoints": {"a": {"p50_ms": 10, "p95_ms": 20, "queries": 3}}}
+        current = {
+            "endpoints": {
+                "a": {"p50_ms": 5, "p95_ms": 30, "queries": 2},
+                "b": {"p50_ms": 1, "p95_ms": 1, "queries": 1},
+            }
+        }
+        self.assertEqual(
+            compare_results(previous, current),
+            [
+                "a: p50_ms 10 -> 5 (-50%), p95_ms 20 -> 30 (+50%), queries 3 -> 2",
+                "b: new",
+            ],
+        )
@@ -0,0 +1,85 @@
+import tempfile
+from pathlib import Path
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from project.databases import get_databases
+
+BASE_DIR = Path("/srv/dineserve")
+POSTGRESQL = {
+    "DB_ENGINE": "postgresql",
+    "DB_NAME": "orders",
+    "DB_USER": "app",
+    "DB_PASSWORD": "secret",
+    "DB_HOST": "primary.internal",
+}
+
+
+class DatabasePresetTests(SimpleTestCase):
+    def test_dev(self):
+        databases, replicas = get_databases("dev", BASE_DIR, env={})
+        default = databases["default"]
+        self.assertEqual(default["NAME"], BASE_DIR / "db.sqlite3")
+        self.assertEqual(default["CONN_MAX_AGE"], 0)
+        self.assertFalse(default["CONN_HEALTH_CHECKS"])
+        self.assertEqual(default["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertEqual(replicas, [])
+
+    def test_prod_sqlite(self):
+        databases, replicas = get_databases(
+            "prod", BASE_DIR, env={"DB_NAME": "/data/db.sqlite3"}
+        )
+        default = databases["default"]
+        self.assertEqual(default["NAME"], "/data/db.sqlite3")
+        self.assertEqual(default["CONN_MAX_AGE"], 600)
+        self.assertTrue(default["CONN_HEALTH_CHECKS"])
+        self.assertEqual(replicas, [])
+
+    def test_prod_postgresql(self):
+        databases, replicas = get_databases("prod", BASE_DIR, env=POSTGRESQL)
+        default = databases["default"]
+        self.assertEqual(default["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(
+            (default["NAME"], default["USER"], default["HOST"], default["PORT"]),
+            ("orders", "app", "primary.internal", "5432"),
+        )
+        self.assertEqual(default["CONN_MAX_AGE"], 600)
+        self.assertNotIn("pool", default["OPTIONS"])
+        self.assertEqual(replicas, [])
+
+    def test_pool(self):
+        env = {**POSTGRESQL, "DB_POOL": "1", "DB_POOL_MAX_SIZE": "20"}
+        default = get_databases("prod", BASE_DIR, env=env)[0]["default"]
+        self.assertEqual(default["CONN_MAX_AGE"], 0)
+        self.assertEqual(
+            default["OPTIONS"]["pool"], {"min_size": 2, "max_size": 20, "timeout": 10}
+        )
+
+    def test_replicas(self):
+        env = {**POSTGRESQL, "DB_REPLICA_HOSTS": "replica-a, ,replica-b"}
+        databases, replicas = get_databases("prod", BASE_DIR, env=env)
+        self.assertEqual(replicas, ["replica_1", "replica_3"])
+        self.assertEqual(databases["replica_1"]["HOST"], "replica-a")
+        self.assertEqual(databases["replica_3"]["HOST"], "replica-b")
+        self.assertEqual(databases["replica_3"]["TEST"], {"MIRROR": "default"})
+
+    def test_unknown_preset(self):
+        with self.assertRaisesMessage(ValueError, "Unknown DATABASE_PRESET: test"):
+            get_databases("test", BASE_DIR, env={})
+
+    def test_sqlite_pragmas_applied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            databases, _ = get_databases("dev", Path(directory), env={})
+            wrapper = ConnectionHandler(databases)["default"]
+            # The raw connection, as the wrapper is not usable in SimpleTestCase
+            connection = wrapper.get_new_connection(wrapper.get_connection_params())
+            try:
+                self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
+                journal_mode = connection.execute("PRAGMA journal_mode").fetchone()
+                self.assertEqual(journal_mode[0], "wal")
+                # 1 is NORMAL
+                synchronous = connection.execute("PRAGMA synchronous").fetchone()
+                self.assertEqual(synchronous[0], 1)
+            finally:
+                connection.close()
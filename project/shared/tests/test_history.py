@@ -0,0 +1,244 @@
+import datetime
+import os
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from order.models import Order
+from restaurant.models import Restaurant
+from shared.choices import StatusChoices
+from shared.history import (
+    MAX_FLUSH_ATTEMPTS,
+    HistoryBuffer,
+    get_history_retention_days,
+    history_buffer,
+    prune_history,
+)
+from shared.tests.factories import make_order, make_restaurant
+
+BUFFERED = {"ENABLED": True, "DURABLE": False, "FLUSH_INTERVAL": 60, "MAX_SIZE": 50}
+
+
+class StopTimer(BaseException):
+    """Ends the timer loop of a test, like an interpreter shutdown would"""
+
+
+class HistoryTests(TestCase):
+    def test_unchanged_save_writes_no_history(self):
+        restaurant = make_restaurant()
+        restaurant.save()
+        self.assertEqual(restaurant.history.count(), 1)
+
+        restaurant.name = "Pizza Place"
+        restaurant.save()
+        self.assertEqual(restaurant.history.count(), 2)
+
+    def test_full_save_of_a_loaded_instance(self):
+        # Admin and serializer saves write every field, changed or not
+        restaurant = make_restaurant()
+        loaded = Restaurant.objects.get(pk=restaurant.pk)
+        loaded.save()
+        loaded.save(update_fields=["name", "updated_at"])
+        self.assertEqual(restaurant.history.count(), 1)
+
+    def test_excluded_fields_write_no_history(self):
+        restaurant = make_restaurant()
+        restaurant.rating_count = 3
+        restaurant.save()
+        self.assertEqual(restaurant.history.count(), 1)
+
+    def test_relationship_changes_recorded(self):
+        order = make_order()
+        order.restaurant = make_restaurant()
+        order.save()
+        self.assertEqual(order.history.count(), 2)
+        self.assertEqual(order.history.first().restaurant, order.restaurant)
+
+    def test_activate_saves_only_changes(self):
+        # save_dirty_fields() never saved an instance without changes, with or
+        # without the history skip
+        restaurant = make_restaurant()
+        with self.assertNumQueries(0):
+            restaurant.activate()
+        restaurant.deactivate()
+        self.assertEqual(restaurant.history.first().status, StatusChoices.INACTIVE)
+        self.assertEqual(restaurant.history.count(), 2)
+
+    def test_deletion_recorded(self):
+        restaurant = make_restaurant()
+        pk = restaurant.pk
+        restaurant.delete()
+        self.assertEqual(
+            list(
+                Restaurant.history.filter(id=pk)
+                .order_by("history_id")
+                .values_list("history_type", flat=True)
+            ),
+            ["+", "-"],
+        )
+
+
+class PruneHistoryTests(TestCase):
+    def setUp(self):
+        self.restaurant = make_restaurant()
+        for name in ("Second", "Third"):
+            self.restaurant.name = name
+            self.restaurant.save()
+        self.deleted = make_restaurant()
+        self.deleted_pk = self.deleted.pk
+        self.deleted.delete()
+        # Every row is 100 days old but the last one of the restaurant
+        old = timezone.now() - datetime.timedelta(days=100)
+        Restaurant.history.exclude(
+            history_id=self.restaurant.history.first().history_id
+        ).update(history_date=old)
+
+    def get_names(self):
+        return list(
+            self.restaurant.history.order_by("history_id").values_list(
+                "name", flat=True
+            )
+        )
+
+    def test_state_at_the_cutoff_kept(self):
+        self.assertEqual(prune_history(Restaurant, days=30, chunk_size=1), 3)
+        self.assertEqual(self.get_names(), ["Second", "Third"])
+        self.assertFalse(Restaurant.history.filter(id=self.deleted_pk).exists())
+
+    def test_recent_rows_kept(self):
+        self.assertEqual(prune_history(Restaurant, days=365), 0)
+        self.assertEqual(len(self.get_names()), 3)
+
+    def test_retention_days(self):
+        with override_settings(
+            HISTORY_RETENTION_DAYS={"default": 10, "order.Order": 20}
+        ):
+            self.assertEqual(get_history_retention_days(Restaurant), 10)
+            self.assertEqual(get_history_retention_days(Order), 20)
+        with override_settings(HISTORY_RETENTION_DAYS={}):
+            self.assertIsNone(get_history_retention_days(Restaurant))
+
+    def test_command(self):
+        out = StringIO()
+        with override_settings(HISTORY_RETENTION_DAYS={"restaurant.Restaurant": 30}):
+            call_command("prune_history", stdout=out)
+        self.assertIn("restaurant.Restaurant: 3 rows deleted", out.getvalue())
+        self.assertNotIn("order.Order", out.getvalue())
+        self.assertIn("History pruned.", out.getvalue())
+
+    def test_command_model_and_days(self):
+        out = StringIO()
+        call_command(
+            "prune_history",
+            "--model",
+            "restaurant.Restaurant",
+            "--days",
+            "365",
+            stdout=out,
+        )
+        self.assertIn("restaurant.Restaurant: 0 rows deleted", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("prune_history", "--model", "restaurant.Nothing")
+
+
+@override_settings(HISTORY_BUFFER=BUFFERED)
+class HistoryBufferTests(TestCase):
+    def setUp(self):
+        # The rows of these tests are flushed by hand, not by a timer thread
+        patcher = mock.patch.object(history_buffer, "ensure_timer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(history_buffer.rows.clear)
+
+    def make_restaurant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_restaurant()
+
+    def test_rows_written_on_flush(self):
+        restaurant = self.make_restaurant()
+        self.assertEqual(restaurant.history.count(), 0)
+        self.assertEqual(len(history_buffer.rows), 1)
+
+        history_buffer.flush()
+        self.assertEqual(restaurant.history.count(), 1)
+        self.assertEqual(history_buffer.rows, [])
+
+    def test_queued_only_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            make_restaurant()
+        self.assertEqual(history_buffer.rows, [])
+
+    def test_failed_rows_queued_again(self):
+        restaurant = self.make_restaurant()
+        with mock.patch.object(
+            QuerySet, "bulk_create", side_effect=DatabaseError("locked")
+        ), self.assertLogs("shared.history", "ERROR"):
+            history_buffer.flush()
+        self.assertEqual(len(history_buffer.rows), 1)
+        self.assertEqual(history_buffer.rows[0][3], 1)
+
+        history_buffer.flush()
+        self.assertEqual(restaurant.history.count(), 1)
+        self.assertEqual(history_buffer.rows, [])
+
+    def test_rows_dropped_after_too_many_failures(self):
+        restaurant = self.make_restaurant()
+        with mock.patch.object(
+            QuerySet, "bulk_create", side_effect=DatabaseError("locked")
+        ), self.assertLogs("shared.history", "ERROR") as logs:
+            for _ in range(MAX_FLUSH_ATTEMPTS):
+                history_buffer.flush()
+        self.assertEqual(history_buffer.rows, [])
+        self.assertIn(f"pk={restaurant.pk}", logs.output[-1])
+        history_buffer.flush()
+        self.assertEqual(restaurant.history.count(), 0)
+
+    def test_failing_receiver_does_not_requeue(self):
+        restaurant = self.make_restaurant()
+        with mock.patch(
+            "shared.history.post_create_historical_record.send",
+            side_effect=RuntimeError,
+        ), self.assertLogs("shared.history", "ERROR"):
+            history_buffer.flush()
+        self.assertEqual(history_buffer.rows, [])
+        self.assertEqual(restaurant.history.count(), 1)
+
+    def test_full_buffer_flushed(self):
+        with override_settings(HISTORY_BUFFER={**BUFFERED, "MAX_SIZE": 2}):
+            self.make_restaurant()
+            self.assertEqual(len(history_buffer.rows), 1)
+            self.make_restaurant()
+        self.assertEqual(history_buffer.rows, [])
+        self.assertEqual(Restaurant.history.count(), 2)
+
+
+class HistoryBufferTimerTests(TestCase):
+    def test_timer_survives_failed_flushes(self):
+        buffer = HistoryBuffer()
+        buffer.timer_pid = os.getpid()
+        with mock.patch.object(
+            buffer, "flush", side_effect=[RuntimeError("boom"), None]
+        ) as flush, mock.patch(
+            "shared.history.time.sleep", side_effect=[None, None, StopTimer]
+        ), self.assertLogs("shared.history", "ERROR"):
+            with self.assertRaises(StopTimer):
+                buffer.run_timer(1)
+        self.assertEqual(flush.call_count, 2)
+
+    def test_timer_restarted_after_it_died(self):
+        buffer = HistoryBuffer()
+        buffer.timer_pid = os.getpid()
+        with mock.patch("shared.history.time.sleep", side_effect=StopTimer):
+            with self.assertRaises(StopTimer):
+                buffer.run_timer(1)
+        self.assertIsNone(buffer.timer_pid)
+
+        with mock.patch("shared.history.threading.Thread") as thread:
+            buffer.ensure_timer(1)
+        thread.return_value.start.assert_called_once_with()
+        self.assertEqual(buffer.timer_pid, os.getpid())
@@ -0,0 +1,184 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from PIL import Image
+
+from restaurant.models import MenuItem
+from shared.images import (
+    ImageProcessor,
+    get_image_processor,
+    hash_file,
+    process_image_logged,
+    process_images,
+)
+from shared.tests.factories import make_menu_item
+
+INLINE = {
+    "SIZES": {"thumbnail": 16},
+    "FORMATS": ["jpeg"],
+    "QUALITY": 80,
+    "WORKERS": 0,
+}
+
+
+def make_png(color="red", size=(64, 32)):
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, "PNG")
+    return output.getvalue()
+
+
+class ImagesTestMixin:
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overridden = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANTS=INLINE)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        get_image_processor.cache_clear()
+        self.addCleanup(get_image_processor.cache_clear)
+
+    def get_variants(self, menu_item):
+        return MenuItem.objects.get(pk=menu_item.pk).image_variants
+
+
+class ImagesTestCase(ImagesTestMixin, TestCase):
+    def make_menu_item(self, content=None, name="photo.PNG"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_menu_item(image=SimpleUploadedFile(name, content or make_png()))
+
+
+class ProcessedImageFieldTests(ImagesTestCase):
+    def get_stored_name(self, digest):
+        return f"menu_items/{digest[:2]}/{digest}.png"
+
+    def test_stored_under_the_content_hash(self):
+        content = make_png()
+        digest = hash_file(ContentFile(content))
+        first = self.make_menu_item(content)
+        second = self.make_menu_item(content, name="copy.png")
+        self.assertEqual(first.image.name, self.get_stored_name(digest))
+        self.assertEqual(second.image.name, first.image.name)
+
+    def test_variants_made_on_commit(self):
+        menu_item = self.make_menu_item()
+        variants = self.get_variants(menu_item)
+        name = variants["thumbnail"]["jpeg"]
+        self.assertTrue(name.endswith("/thumbnail.jpg"))
+        with menu_item.image.storage.open(name) as variant:
+            self.assertEqual(Image.open(variant).size, (16, 8))
+
+    def test_new_upload_clears_the_variants(self):
+        menu_item = self.make_menu_item()
+        menu_item.image = SimpleUploadedFile("blue.png", make_png("blue"))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            menu_item.save()
+        self.assertEqual(self.get_variants(menu_item), {})
+        self.assertEqual(len(callbacks), 2)
+
+    def test_removed_image(self):
+        menu_item = self.make_menu_item()
+        menu_item.image = None
+        menu_item.save()
+        self.assertEqual(self.get_variants(menu_item), {})
+
+    def test_field_file_save(self):
+        menu_item = make_menu_item()
+        content = make_png("green")
+        digest = hash_file(ContentFile(content))
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.image.save("green.png", ContentFile(content))
+        menu_item.refresh_from_db()
+        self.assertEqual(menu_item.image.name, self.get_stored_name(digest))
+        self.assertIn("thumbnail", menu_item.image_variants)
+
+    def test_field_file_save_without_saving_the_row(self):
+        menu_item = self.make_menu_item()
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.image.save("green.png", ContentFile(make_png("green")), False)
+        self.assertEqual(menu_item.image_variants, {})
+        # Nothing saved yet
+        self.assertNotEqual(self.get_variants(menu_item), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.save()
+        variants = self.get_variants(menu_item)
+        with menu_item.image.storage.open(variants["thumbnail"]["jpeg"]) as variant:
+            self.assertEqual(Image.open(variant).getpixel((0, 0))[1], 128)
+
+    def test_broken_image_logged_on_commit(self):
+        with self.assertLogs("shared.images", "ERROR") as logs:
+            menu_item = self.make_menu_item(b"not an image", name="broken.png")
+        self.assertIn(f"MenuItem.image pk={menu_item.pk}", logs.output[0])
+        self.assertEqual(self.get_variants(menu_item), {})
+
+
+# Rows committed, as the threads read them on connections of their own
+class ImageProcessorTests(ImagesTestMixin, TransactionTestCase):
+    def test_failures_logged_in_threads(self):
+        with self.assertLogs("shared.images", "ERROR"):
+            menu_item = make_menu_item(
+                image=SimpleUploadedFile("broken.png", b"not an image")
+            )
+        processor = ImageProcessor(max_workers=1)
+        self.addCleanup(processor.executor.shutdown)
+        with self.assertLogs("shared.images", "ERROR"):
+            job = processor.submit(MenuItem, menu_item.pk, "image")
+            self.assertIs(job.result(), False)
+
+    def test_nothing_to_process(self):
+        menu_item = make_menu_item()
+        self.assertIsNone(process_image_logged(MenuItem, menu_item.pk, "image"))
+
+
+class ProcessImagesTests(ImagesTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.assertLogs("shared.images", "ERROR"):
+            self.good = make_menu_item(image=SimpleUploadedFile("a.png", make_png()))
+            self.broken = make_menu_item(
+                image=SimpleUploadedFile("b.png", b"not an image")
+            )
+            make_menu_item()
+        # As if their jobs were lost
+        MenuItem.objects.update(image_variants={})
+
+    def test_failures_counted(self):
+        with self.assertLogs("shared.images", "ERROR") as logs:
+            counts = process_images([MenuItem], workers=2)
+        self.assertEqual(
+            counts, {"restaurant.MenuItem": {"processed": 1, "failed": 1}}
+        )
+        self.assertIn(f"pk={self.broken.pk}", logs.output[0])
+        self.assertIn("thumbnail", self.get_variants(self.good))
+
+        # Images having variants are skipped, unless reprocessed
+        with self.assertLogs("shared.images", "ERROR"):
+            counts = process_images([MenuItem])
+        self.assertEqual(counts["restaurant.MenuItem"], {"processed": 0, "failed": 1})
+        with self.assertLogs("shared.images", "ERROR"):
+            counts = process_images([MenuItem], reprocess=True)
+        self.assertEqual(counts["restaurant.MenuItem"], {"processed": 1, "failed": 1})
+
+    def call_command(self):
+        out = StringIO()
+        call_command("process_images", "--model", "restaurant.MenuItem", stdout=out)
+        return out.getvalue()
+
+    def test_command(self):
+        with self.assertLogs("shared.images", "ERROR"):
+            output = self.call_command()
+        self.assertIn("restaurant.MenuItem: 1 images processed, 1 failed", output)
+        self.assertIn("failures were logged", output)
+
+        self.broken.image = None
+        self.broken.save()
+        output = self.call_command()
+        self.assertIn("restaurant.MenuItem: 0 images processed, 0 failed", output)
+        self.assertIn("Images processed.", output)
@@ -0,0 +1,159 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from restaurant.models import Restaurant
+from shared.profiling import (
+    QueryBudgetExceeded,
+    QueryProfilingMiddleware,
+    ViewStats,
+    get_view_stats,
+    query_budget,
+    record_queries,
+)
+from shared.tests.factories import make_client, make_menu_item, make_order, make_user
+
+ENABLED = {**settings.QUERY_PROFILING, "ENABLED": True, "ENFORCE_BUDGETS": True}
+
+
+def run_queries(count):
+    for pk in range(count):
+        Restaurant.objects.filter(pk=pk).first()
+
+
+class RecordQueriesTests(TestCase):
+    def test_counts_and_duplicates(self):
+        with record_queries(duplicate_threshold=3) as recorder:
+            run_queries(3)
+            Restaurant.objects.count()
+        report = recorder.get_report()
+        self.assertEqual(report["queries"], 4)
+        self.assertGreaterEqual(report["db_time_ms"], 0)
+        [duplicate] = report["duplicates"]
+        self.assertEqual(duplicate["count"], 3)
+        self.assertEqual(duplicate["database"], "default")
+        self.assertIn("WHERE", duplicate["sql"])
+        # The stack points at the project code running the queries
+        self.assertIn("in run_queries", duplicate["stack"][-1])
+        for frame in duplicate["stack"]:
+            self.assertNotIn("site-packages", frame)
+
+    def test_below_threshold(self):
+        with record_queries(duplicate_threshold=3) as recorder:
+            run_queries(2)
+        self.assertEqual(recorder.get_duplicates(), [])
+
+    def test_stack_depth(self):
+        with record_queries(stack_depth=1) as recorder:
+            run_queries(3)
+        self.assertEqual(len(recorder.get_duplicates()[0]["stack"]), 1)
+
+
+class QueryBudgetTests(TestCase):
+    def test_within_budget(self):
+        with query_budget(3) as recorder:
+            run_queries(3)
+        self.assertEqual(recorder.query_count, 3)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "Query budget of 2"):
+            with query_budget(2):
+                run_queries(3)
+
+    def test_duplicates_not_allowed(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "N+1 queries"):
+            with query_budget(10, allow_duplicates=False):
+                run_queries(3)
+
+
+class ViewStatsTests(TestCase):
+    def test_totals_per_view(self):
+        stats = ViewStats()
+        stats.add("a", {"queries": 2, "db_time_ms": 1.5, "duplicates": []})
+        stats.add("a", {"queries": 5, "db_time_ms": 0.5, "duplicates": [{}]})
+        self.assertEqual(
+            stats.get(),
+            {
+                "a": {
+                    "requests": 2,
+                    "queries": 7,
+                    "max_queries": 5,
+                    "db_time_ms": 2.0,
+                    "n_plus_one": 1,
+                }
+            },
+        )
+
+
+class QueryProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/profiled")
+
+    def make_middleware(self, count):
+        def view(request):
+            run_queries(count)
+            return HttpResponse()
+
+        return QueryProfilingMiddleware(view)
+
+    def test_not_used_when_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryProfilingMiddleware(HttpResponse)
+
+    @override_settings(QUERY_PROFILING=ENABLED)
+    def test_headers_and_stats(self):
+        requests = get_view_stats().get("/profiled", {}).get("requests", 0)
+        with self.assertLogs("shared.profiling", "DEBUG") as logs:
+            response = self.make_middleware(2)(self.request)
+        self.assertEqual(response["X-DB-Queries"], "2")
+        self.assertTrue(response["X-DB-Time"].endswith("ms"))
+        self.assertEqual(logs.records[0].levelname, "DEBUG")
+        self.assertEqual(get_view_stats()["/profiled"]["requests"], requests + 1)
+
+    @override_settings(QUERY_PROFILING={**ENABLED, "RESPONSE_HEADERS": False})
+    def test_n_plus_one_logged(self):
+        with self.assertLogs("shared.profiling", "WARNING") as logs:
+            response = self.make_middleware(3)(self.request)
+        self.assertIn("N+1 queries in GET /profiled", logs.output[0])
+        self.assertNotIn("X-DB-Queries", response)
+
+    @override_settings(QUERY_PROFILING={**ENABLED, "BUDGETS": {"/profiled": 1}})
+    def test_budget_enforced(self):
+        with self.assertLogs("shared.profiling", "DEBUG"):
+            self.make_middleware(1)(self.request)
+        with self.assertLogs("shared.profiling", "DEBUG"), self.assertRaisesMessage(
+            QueryBudgetExceeded, "Query budget of 1 exceeded by /profiled"
+        ):
+            self.make_middleware(2)(self.request)
+
+
+@override_settings(QUERY_PROFILING=ENABLED)
+class EndpointBudgetTests(TestCase):
+    """The endpoints stay within the budgets of the settings"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = make_user()
+        menu_item = make_menu_item(name="Burger")
+        self.restaurant = menu_item.menu_category.restaurant
+        for _ in range(3):
+            make_order(self.user, self.restaurant)
+
+    def get(self, client, name, *args, **data):
+        with self.assertLogs("shared.profiling", "DEBUG") as logs:
+            response = client.get(reverse(name, args=args), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(logs.records[0].levelname, "DEBUG", logs.output)
+        return response
+
+    def test_budgets(self):
+        client = make_client(self.user)
+        self.get(client, "me.order-list")
+        self.get(make_client(), "restaurant.menu", self.restaurant.slug)
+        self.get(make_client(), "restaurant.open")
+        self.get(make_client(), "restaurant.menu-item.search", q="burger")
+        self.get(make_client(), "restaurant.nearby", latitude=23.78, longitude=90.4)
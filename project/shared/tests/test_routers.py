@@ -0,0 +1,157 @@
+import contextvars
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from order.models import Order
+from shared.routers import (
+    PrimaryPinningMiddleware,
+    ReadReplicaRouter,
+    ReplicaHealth,
+    get_client_pin_key,
+    use_primary,
+)
+
+REPLICAS = ["replica_1"]
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        patcher = mock.patch(
+            "shared.routers.replica_health.is_healthy", return_value=True
+        )
+        self.is_healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self):
+        return self.router.db_for_read(Order)
+
+    def run_in_context(self, function):
+        # A fresh context, like the one of a new thread or task
+        return contextvars.Context().run(function)
+
+    def test_reads_go_to_a_healthy_replica(self):
+        self.assertEqual(self.read(), "replica_1")
+        self.is_healthy.return_value = False
+        self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(self.read(), DEFAULT_DB_ALIAS)
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(self.router.db_for_write(Order), DEFAULT_DB_ALIAS)
+
+    def test_write_outside_a_scope_does_not_pin(self):
+        def write_then_read():
+            self.router.db_for_write(Order)
+            return self.read()
+
+        self.assertEqual(self.run_in_context(write_then_read), "replica_1")
+
+    def test_use_primary(self):
+        def read_in_block():
+            with use_primary():
+                inside = self.read()
+            return inside, self.read()
+
+        self.assertEqual(
+            self.run_in_context(read_in_block), (DEFAULT_DB_ALIAS, "replica_1")
+        )
+
+    def test_write_in_use_primary_block_pins_only_the_block(self):
+        def write_in_block():
+            with use_primary():
+                self.router.db_for_write(Order)
+            return self.read()
+
+        self.assertEqual(self.run_in_context(write_in_block), "replica_1")
+
+    def test_allow_migrate(self):
+        self.assertFalse(self.router.allow_migrate("replica_1", "order"))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, "order"))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_PRIMARY_PIN_SECONDS=5)
+class PrimaryPinningMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.router = ReadReplicaRouter()
+        self.factory = RequestFactory(headers={"Authorization": "Token abc"})
+        patcher = mock.patch(
+            "shared.routers.replica_health.is_healthy", return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handle(self, request, write=False):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Order))
+            if write:
+                self.router.db_for_write(Order)
+                databases.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        contextvars.Context().run(PrimaryPinningMiddleware(view), request)
+        return databases
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_not_used_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            PrimaryPinningMiddleware(HttpResponse)
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.handle(self.factory.get("/")), ["replica_1"])
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        self.assertEqual(self.handle(self.factory.post("/")), [DEFAULT_DB_ALIAS])
+
+    def test_write_pins_the_request_and_then_the_client(self):
+        request = self.factory.get("/")
+        self.assertEqual(
+            self.handle(request, write=True), ["replica_1", DEFAULT_DB_ALIAS]
+        )
+        self.assertIsNotNone(cache.get(get_client_pin_key(request)))
+
+        self.assertEqual(self.handle(self.factory.get("/")), [DEFAULT_DB_ALIAS])
+        other_client = RequestFactory(headers={"Authorization": "Token xyz"})
+        self.assertEqual(self.handle(other_client.get("/")), ["replica_1"])
+
+    def test_anonymous_clients_not_pinned(self):
+        request = RequestFactory().get("/")
+        self.assertIsNone(get_client_pin_key(request))
+        self.handle(request, write=True)
+        self.assertEqual(self.handle(RequestFactory().get("/")), ["replica_1"])
+
+    def test_pin_cleared_after_the_request(self):
+        self.handle(self.factory.post("/"), write=True)
+        self.assertEqual(self.router.db_for_read(Order), "replica_1")
+
+
+class ReplicaHealthTests(SimpleTestCase):
+    def test_result_kept_for_the_interval(self):
+        health = ReplicaHealth()
+        with mock.patch.object(health, "check", return_value=False) as check:
+            self.assertFalse(health.is_healthy("replica_1"))
+            self.assertFalse(health.is_healthy("replica_1"))
+        check.assert_called_once_with("replica_1")
+
+        with override_settings(DATABASE_REPLICA_HEALTH_CHECK_INTERVAL=0):
+            with mock.patch.object(health, "check", return_value=True):
+                self.assertTrue(health.is_healthy("replica_1"))
+
+    def test_failing_replica_closed(self):
+        connection = mock.MagicMock()
+        connection.cursor.side_effect = ConnectionError
+        with mock.patch("shared.routers.connections", {"replica_1": connection}):
+            self.assertFalse(ReplicaHealth().check("replica_1"))
+        connection.close.assert_called_once_with()
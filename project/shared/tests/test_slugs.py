@@ -0,0 +1,99 @@
+import re
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from restaurant.models import Restaurant
+from shared.slugs import (
+    MAX_INDEX_DIGITS,
+    allocate_slugs,
+    get_index_pattern,
+    get_taken_slugs,
+)
+from shared.tests.factories import make_restaurant
+
+SLUG_FIELD = Restaurant._meta.get_field("slug")
+
+
+def make_restaurants(*names):
+    return [make_restaurant(name=name) for name in names]
+
+
+class TakenSlugsTests(TestCase):
+    def test_only_the_colliding_slugs(self):
+        make_restaurants("Burger", "Burger", "Burger King", "Burger King", "Burgers")
+        Restaurant.objects.create(name="Other", slug="burger-2x")
+        self.assertEqual(
+            get_taken_slugs(SLUG_FIELD, ["burger"]), {"burger", "burger-2"}
+        )
+        self.assertEqual(
+            get_taken_slugs(SLUG_FIELD, ["burger", "burger-king"]),
+            {"burger", "burger-2", "burger-king", "burger-king-2"},
+        )
+
+    def test_excluded_rows(self):
+        first, _ = make_restaurants("Burger", "Burger")
+        self.assertEqual(
+            get_taken_slugs(SLUG_FIELD, ["burger"], exclude_pks=[first.pk]),
+            {"burger-2"},
+        )
+
+    def test_long_base(self):
+        base = "a" * SLUG_FIELD.max_length
+        pattern = re.compile(get_index_pattern(SLUG_FIELD, base))
+        self.assertTrue(pattern.match(f"{base[:48]}-2"))
+        self.assertTrue(pattern.match(f"{base[:47]}-10"))
+        self.assertFalse(pattern.match(f"{base[:48]}-10"))
+        self.assertFalse(pattern.match(f"{base[:48]}-x"))
+        digits = MAX_INDEX_DIGITS + 1
+        self.assertFalse(pattern.match(f"{base[: 49 - digits]}-{'1' * digits}"))
+
+    def test_short_base(self):
+        pattern = re.compile(get_index_pattern(SLUG_FIELD, "burger"))
+        self.assertTrue(pattern.match("burger-12345678"))
+        self.assertFalse(pattern.match("burger-king-2"))
+        self.assertFalse(pattern.match("burger"))
+
+
+class UniqueSlugFieldTests(TestCase):
+    def test_lowest_free_index(self):
+        first, second, third = make_restaurants("Burger", "Burger", "Burger")
+        self.assertEqual(
+            [first.slug, second.slug, third.slug], ["burger", "burger-2", "burger-3"]
+        )
+        second.delete()
+        self.assertEqual(make_restaurant(name="Burger").slug, "burger-2")
+
+    def test_not_confused_by_longer_slugs(self):
+        make_restaurants("Burger King", "Burger King")
+        self.assertEqual(make_restaurant(name="Burger").slug, "burger")
+
+    def test_long_names_cropped(self):
+        name = "a" * 60
+        first, second = make_restaurants(name, name)
+        self.assertEqual(len(first.slug), SLUG_FIELD.max_length)
+        self.assertEqual(second.slug, f"{first.slug[:48]}-2")
+        restaurants = make_restaurants(*[name] * 9)
+        self.assertEqual(restaurants[-1].slug, f"{first.slug[:47]}-11")
+
+    def test_unchanged_slug_not_queried(self):
+        restaurant = make_restaurant(name="Burger")
+        restaurant.name = "Pizza"
+        with CaptureQueriesContext(connection) as queries:
+            restaurant.save()
+        self.assertEqual(restaurant.slug, "burger")
+        self.assertFalse(any("LIKE" in query["sql"] for query in queries))
+
+    def test_allocate_slugs(self):
+        make_restaurant(name="Burger")
+        restaurants = [Restaurant(name="Burger"), Restaurant(name="Burger")]
+        with self.assertNumQueries(1):
+            allocate_slugs(restaurants)
+        self.assertEqual(
+            [restaurant.slug for restaurant in restaurants], ["burger-2", "burger-3"]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            restaurants[0].save()
+        self.assertFalse(any("LIKE" in query["sql"] for query in queries))
+        self.assertEqual(allocate_slugs([]), [])
@@ -0,0 +1,44 @@
+"""Views shared by all the apps"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines, which DRF 3.14 does not run by
+    itself. Authentication, permissions and throttling (APIView.initial) still
+    run, in a thread since they query the database, then the handler is awaited
+    on the event loop. Sync handlers (APIView.options) are called as they are,
+    so they must not query the database.
+    """
+
+    # Set instead of computed by View, APIView.options being sync
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response